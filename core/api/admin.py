@@ -1,11 +1,21 @@
 from django.contrib import admin
-from .models import Product, Basket, Favorite, BasketItem, Order, OrderItem
+from .models import Product, Basket, Favorite, BasketItem, Order, OrderItem, Category
+
+
+@admin.register(Category)
+class CategoryAdmin(admin.ModelAdmin):
+    list_display = ('id', 'title', 'slug', 'parent', 'depth', 'path')
+    search_fields = ('title', 'slug')
+    prepopulated_fields = {'slug': ('title',)}
+    ordering = ('path',)
 
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
-    list_display = ('id', 'title', 'category', 'new_price', 'old_price', 'is_active', 'created_at')
-    list_filter = ('is_active', 'category', 'created_at')
+    list_display = ('id', 'title', 'category', 'new_price', 'old_price', 'total_stock', 'in_stock', 'is_active',
+                    'created_at')
+    list_filter = ('is_active', 'in_stock', 'category', 'created_at')
+    list_select_related = ('category',)
     search_fields = ('title', 'description')
 
 
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        import core.checks  # noqa: F401  (registriert die System-Checks)
+
+        from . import signals
+        signals.connect()
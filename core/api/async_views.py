@@ -0,0 +1,219 @@
+# api/async_views.py
+"""
+Async-Varianten der Homepage-/Katalog-Blöcke (für den Betrieb unter ASGI).
+
+Jeder Block (Query + Serialisierung) läuft in einem eigenen Worker-Thread
+mit eigener DB-Verbindung; ``asyncio.gather`` führt sie gleichzeitig aus.
+Djangos ``a*``-ORM-Methoden laufen alle im selben thread-sensitiven
+Thread hintereinander – für echte Parallelität daher
+``sync_to_async(thread_sensitive=False)``.
+
+``batch_async`` bündelt beliebige GET-Endpunkte unter /api/ auf dieselbe Weise
+(ein Roundtrip, einmal authentifizieren).
+"""
+import asyncio
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from functools import partial
+from urllib.parse import urlsplit
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import HttpRequest, JsonResponse, QueryDict
+from django.urls import Resolver404, resolve
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+from core import metrics
+from core.db_router import use_primary
+
+from .choices import BannerLocation
+from .home import banners_qs, head_banner_qs, popular_brands_qs, bestsellers_qs, discounts_qs, trending_qs
+from .serializers import BannerSerializer, BrandSerializer, ProductListSerializer
+
+logger = logging.getLogger(__name__)
+
+
+def _block(queryset_fn, serializer_class):
+    def render(request, limit):
+        return serializer_class(queryset_fn(limit), many=True, context={'request': request}).data
+    return render
+
+
+# name -> (render(request, limit), Default-Limit)
+HOME_BLOCKS = {
+    'banner-head': (_block(lambda limit: head_banner_qs(), BannerSerializer), 1),
+    'banner-middle': (_block(lambda limit: banners_qs(BannerLocation.MIDDLE, limit), BannerSerializer), 10),
+    'banner-catalog': (_block(lambda limit: banners_qs(BannerLocation.CATALOG, limit), BannerSerializer), 10),
+    'popular-brands': (_block(popular_brands_qs, BrandSerializer), 4),
+    'bestsellers': (_block(bestsellers_qs, ProductListSerializer), 12),
+    'discounts': (_block(discounts_qs, ProductListSerializer), 12),
+    'trending': (_block(trending_qs, ProductListSerializer), 12),
+}
+
+# Schlüssel in home/index/ -> (Block, Query-Parameter für das Limit)
+INDEX_BLOCKS = {
+    'head_banner': ('banner-head', None),
+    'brands': ('popular-brands', 'brands'),
+    'bestsellers': ('bestsellers', 'best'),
+    'discounts': ('discounts', 'disc'),
+}
+
+
+# Begrenzter Pool: jeder Thread hält höchstens eine (per CONN_MAX_AGE wiederverwendete) DB-Verbindung.
+_executor = ThreadPoolExecutor(max_workers=getattr(settings, 'ASYNC_DB_WORKERS', 8),
+                               thread_name_prefix='async-db')
+
+
+def _in_worker(func, *args):
+    """Sync-Funktion in einem Pool-Thread (eigene DB-Verbindung), danach aufräumen."""
+    def run():
+        close_old_connections()
+        try:
+            return func(*args)
+        finally:
+            close_old_connections()
+    return sync_to_async(run, thread_sensitive=False, executor=_executor)()
+
+
+def _authenticate(request):
+    """DRF-Request mit den Standard-Authentifizierern; ``.user`` wird hier schon aufgelöst."""
+    drf_request = Request(request, authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+    drf_request.user  # Authentifizierung hier (im Worker-Thread) auslösen
+    return drf_request
+
+
+def _json(data, status=200):
+    return JsonResponse(data, status=status, safe=False, encoder=JSONEncoder,
+                        json_dumps_params={'ensure_ascii': False})
+
+
+async def _prepare(request):
+    if request.method != 'GET':
+        return None, _json({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+    try:
+        return await _in_worker(_authenticate, request), None
+    except APIException as exc:
+        return None, _json({'detail': exc.detail}, status=exc.status_code)
+
+
+async def home_index_async(request):
+    """Wie HomeIndexAPIView, die vier Blöcke werden aber parallel geladen."""
+    drf_request, error = await _prepare(request)
+    if error:
+        return error
+    limits = {}
+    try:
+        for key, (block, param) in INDEX_BLOCKS.items():
+            default = HOME_BLOCKS[block][1]
+            limits[key] = int(request.GET.get(param, default)) if param else default
+    except ValueError:
+        return _json({'detail': 'invalid limit'}, status=400)
+    results = await asyncio.gather(*(
+        _in_worker(HOME_BLOCKS[block][0], drf_request, limits[key])
+        for key, (block, _param) in INDEX_BLOCKS.items()
+    ))
+    return _json(dict(zip(INDEX_BLOCKS, results)))
+
+
+async def home_block_async(request, block):
+    """Einzelner Homepage-Block (``?limit=``), async."""
+    if block not in HOME_BLOCKS:
+        return _json({'detail': 'Not found.'}, status=404)
+    drf_request, error = await _prepare(request)
+    if error:
+        return error
+    render, default = HOME_BLOCKS[block]
+    try:
+        limit = int(request.GET.get('limit', default) or default)
+    except ValueError:
+        return _json({'detail': 'invalid limit'}, status=400)
+    return _json(await _in_worker(render, drf_request, limit))
+
+
+# ---------- Batch ----------
+def _sub_request(request, url, user, auth):
+    """GET-Request für ``url`` mit den Headern des Batch-Requests; Auth wird nicht wiederholt."""
+    sub = HttpRequest()
+    sub.method = 'GET'
+    sub.path = sub.path_info = url.path
+    sub.META = {**request.META, 'REQUEST_METHOD': 'GET', 'PATH_INFO': url.path, 'QUERY_STRING': url.query}
+    sub.GET = QueryDict(url.query)
+    sub.COOKIES = request.COOKIES
+    sub.user = user
+    if user.is_authenticated:
+        # DRF nimmt dann ForcedAuthentication statt JWT-Prüfung + User-Lookup
+        sub._force_auth_user, sub._force_auth_token = user, auth
+    return sub
+
+
+def _payload(response):
+    if response.streaming:  # Feeds o. Ä. gehören nicht in eine JSON-Antwort
+        response.close()
+        return 400, {'detail': 'streaming responses are not supported in batch'}
+    if isinstance(response, Response):
+        return response.status_code, response.data  # ungerendert -> nur einmal serialisieren
+    if 'json' in response.get('Content-Type', ''):
+        return response.status_code, json.loads(response.content or b'null')
+    return response.status_code, response.content.decode(response.charset, 'replace')
+
+
+async def _batch_item(request, path, user, auth):
+    url = urlsplit(path)
+    if url.scheme or url.netloc or not url.path.startswith('/api/'):
+        return {'path': path, 'status': 400, 'data': {'detail': 'only /api/ paths are allowed'}}
+    try:
+        match = resolve(url.path)
+    except Resolver404:
+        return {'path': path, 'status': 404, 'data': {'detail': 'Not found.'}}
+    if match.func is batch_async:
+        return {'path': path, 'status': 400, 'data': {'detail': 'nested batch requests are not allowed'}}
+
+    sub = _sub_request(request, url, user, auth)
+    sub.resolver_match = match
+    view = getattr(match.func, 'view_class', None) or getattr(match.func, 'cls', None) or match.func
+    started = time.perf_counter()
+    try:
+        # Jeder Teil-Request läuft als eigener Task -> eigener Kontext für das Replica-Routing
+        with use_primary() if getattr(view, 'db_primary', False) else nullcontext():
+            if asyncio.iscoroutinefunction(match.func):
+                response = await match.func(sub, *match.args, **match.kwargs)
+            else:
+                response = await _in_worker(partial(match.func, sub, *match.args, **match.kwargs))
+        status, data = _payload(response)
+    except Exception:
+        logger.exception('Batch: Teil-Request %s fehlgeschlagen', path)
+        status, data = 500, {'detail': 'internal error'}
+    metrics.observe_batch_item(match, status, time.perf_counter() - started)
+    return {'path': path, 'status': status, 'data': data}
+
+
+async def batch_async(request):
+    """
+    Mehrere GET-Endpunkte in einem Roundtrip, z. B. die Startseite:
+    ``?r=/api/home/banner-head/&r=/api/home/bestsellers/?limit=8&r=/api/favorites/``
+    (``&`` innerhalb eines Teil-Pfads als ``%26``, max. ``BATCH_MAX_REQUESTS``).
+
+    Authentifiziert wird einmal; die Teil-Requests laufen parallel im
+    Worker-Pool (async Views direkt) und liefern ihre Daten ungerendert.
+    Antwort: ``[{"path", "status", "data"}, ...]`` in der angefragten
+    Reihenfolge – Fehler einzelner Teile (401, 404 ...) stehen im jeweiligen Eintrag.
+    """
+    paths = request.GET.getlist('r')
+    if not paths:
+        return _json({'detail': 'at least one "r" parameter required'}, status=400)
+    limit = getattr(settings, 'BATCH_MAX_REQUESTS', 20)
+    if len(paths) > limit:
+        return _json({'detail': f'at most {limit} requests'}, status=400)
+    drf_request, error = await _prepare(request)
+    if error:
+        return error
+    user, auth = drf_request.user, drf_request.auth
+    return _json(await asyncio.gather(*(_batch_item(request, path, user, auth) for path in paths)))
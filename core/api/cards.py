@@ -0,0 +1,193 @@
+# api/cards.py
+"""
+Cache für gerenderte Produktkarten.
+
+``ProductSerializer`` (Felder, Brands, Rabatt) steckt in Listen, Favoriten,
+Warenkorb, Bestellungen, "ähnlichen Produkten" und den Home-Blöcken und
+baut dort immer wieder dieselbe Karte. Die Basiskarte wird deshalb pro
+Produkt unter ``card:<CARD_VERSION>:<pk>`` gecacht:
+
+- Abruf per ``get_many`` für alle Produkte einer Liste, Fehlendes wird
+  gerendert und per ``set_many`` nachgetragen,
+- Bild-URLs liegen relativ im Cache und werden beim Ausliefern mit dem
+  Host des Requests absolut gemacht,
+- Felder von Unterklassen (``is_favorite``, ``gallery``, ``similar`` ...)
+  werden live berechnet; vorher darf der Serializer per
+  ``prepare_live_fields(instances)`` gebündelt vorladen,
+- Product-, Brand-(M2M-) und Bestandsänderungen sowie neue Bild-Varianten
+  von Produkt/Brand löschen die betroffenen Karten (api/signals.py).
+  Galeriebilder (``ProductImage``) stehen nicht in der Karte – ``gallery``
+  wird live berechnet – und lösen deshalb nichts aus.
+  Das Löschen erreicht andere Worker nur über einen gemeinsamen Cache;
+  mit LocMem ist die TTL deshalb auf ``LOCAL_CACHE_MAX_TTL`` gekappt.
+
+``CARD_VERSION`` erhöhen, wenn sich das Kartenformat ändert.
+"""
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models import prefetch_related_objects
+from rest_framework import serializers
+from rest_framework.fields import SkipField
+from rest_framework.relations import PKOnlyObject
+
+from core.cache import invalidated_ttl
+
+from .models import Product
+
+CARD_VERSION = 2
+CARD_CONTEXT = "_render_card"
+CARD_MEMO = "_cards"  # im Serializer-Context: bereits geholte Karten dieses Requests
+
+# Schlüssel in der Karte, deren Werte (relative) Medien-URLs sind
+URL_KEYS = {"image", "logo", "url", "webp", "srcset", "srcset_webp"}
+_RELATIVE_URL_RE = re.compile(r"(^|, )(/[^\s,]+)")
+
+
+def card_key(pk):
+    return f"card:{CARD_VERSION}:{pk}"
+
+
+def _card_serializer():
+    from .serializers import ProductSerializer
+    return ProductSerializer(context={CARD_CONTEXT: True})  # ohne Request -> relative URLs
+
+
+def card_fields():
+    from .serializers import ProductSerializer
+    return ProductSerializer.Meta.fields
+
+
+def get_cards(instances, memo=None):
+    """Basiskarten in Reihenfolge von ``instances`` (1x get_many, Fehlendes wird gerendert)."""
+    keys = [card_key(obj.pk) for obj in instances]
+    cached = {key: memo[key] for key in keys if memo and key in memo}
+    if len(cached) < len(keys):
+        cached.update(cache.get_many([key for key in keys if key not in cached]))
+    misses = [obj for key, obj in zip(keys, instances) if key not in cached]
+    missing = {}
+    if misses:
+        misses = _load_stubs(misses)
+        # Brands nur für die Karten laden, die wirklich gerendert werden (bereits prefetchte werden übersprungen)
+        prefetch_related_objects(misses, "brands")
+        renderer = _card_serializer()
+        missing = {card_key(obj.pk): renderer.to_representation(obj) for obj in misses}
+    if memo is not None:
+        memo.update(cached)
+        memo.update(missing)
+    if missing:
+        cache.set_many(missing, invalidated_ttl(getattr(settings, "PRODUCT_CARD_TTL", 3600)))
+    # None: Platzhalter-Produkt existiert nicht mehr
+    return [cached.get(key) or missing.get(key) for key in keys]
+
+
+def product_stubs(ids):
+    """Platzhalter nur mit PK (z. B. aus dem Katalog-Snapshot) – geladen wird nur bei Cache-Miss."""
+    return [Product(pk=pk) for pk in ids]
+
+
+def _load_stubs(instances):
+    stub_ids = [obj.pk for obj in instances if obj._state.adding]
+    if not stub_ids:
+        return instances
+    loaded = Product.objects.in_bulk(stub_ids)
+    return [loaded[obj.pk] if obj._state.adding else obj
+            for obj in instances if not obj._state.adding or obj.pk in loaded]
+
+
+def _absolute(value, base):
+    if isinstance(value, dict):
+        return {k: (_absolute_url(v, base) if k in URL_KEYS and isinstance(v, str) else _absolute(v, base))
+                for k, v in value.items()}
+    if isinstance(value, list):
+        return [_absolute(v, base) for v in value]
+    return value
+
+
+def _absolute_url(value, base):
+    return _RELATIVE_URL_RE.sub(lambda m: m.group(1) + base + m.group(2), value) if base else value
+
+
+def _live_fields(serializer):
+    cached = set(card_fields())
+    return [f for f in serializer._readable_fields if f.field_name not in cached]
+
+
+def render_cards(serializer, instances):
+    """Karten aus dem Cache + live berechnete Felder des konkreten Serializers."""
+    request = serializer.context.get("request")
+    base = request.build_absolute_uri("/")[:-1] if request is not None else ""
+    live = _live_fields(serializer)
+    if live and hasattr(serializer, "prepare_live_fields"):
+        serializer.prepare_live_fields(instances)
+
+    result = []
+    for obj, card in zip(instances, get_cards(instances, serializer.context.get(CARD_MEMO))):
+        if card is None:
+            continue
+        ret = _absolute(card, base)
+        for field in live:  # wie Serializer.to_representation
+            try:
+                attribute = field.get_attribute(obj)
+            except SkipField:
+                continue
+            check_for_none = attribute.pk if isinstance(attribute, PKOnlyObject) else attribute
+            ret[field.field_name] = None if check_for_none is None else field.to_representation(attribute)
+        result.append(ret)
+    return result
+
+
+class CardCacheMixin:
+    """Für ProductSerializer: ``to_representation`` über den Karten-Cache."""
+
+    def to_representation(self, instance):
+        if self.context.get(CARD_CONTEXT):
+            return super().to_representation(instance)
+        return render_cards(self, [instance])[0]
+
+
+class CardListSerializer(serializers.ListSerializer):
+    """``many=True``: alle Karten einer Liste mit einem ``get_many``."""
+
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, models.manager.BaseManager) else data
+        return render_cards(self.child, list(iterable))
+
+
+class RelatedCardListSerializer(serializers.ListSerializer):
+    """
+    Für Listen mit verschachteltem ``ProductSerializer`` (Warenkorb-/Bestellpositionen):
+    holt vorab alle Karten mit einem ``get_many`` in den Context, die einzelnen
+    Positionen lesen dann nur noch von dort.
+    """
+    product_attr = "product"
+
+    def to_representation(self, data):
+        items = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        memo = self.context.setdefault(CARD_MEMO, {})
+        get_cards([getattr(item, self.product_attr) for item in items], memo)
+        return [self.child.to_representation(item) for item in items]
+
+
+# ---------- Invalidierung ----------
+def invalidate_cards(product_ids):
+    keys = [card_key(pk) for pk in product_ids]
+    if not keys:
+        return
+    cache.delete_many(keys)
+    # nochmal nach dem Commit: ein paralleler Request könnte zwischendurch den alten Stand gecacht haben
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def brand_product_ids(brand_id):
+    return list(Product.brands.through.objects.filter(brand_id=brand_id).values_list("product_id", flat=True))
+
+
+def invalidate_for(model_label, pk):
+    """Nach Änderungen ohne save-Signal (z. B. Bild-Varianten per UPDATE)."""
+    if model_label == "api.Product":
+        invalidate_cards([pk])
+    elif model_label == "api.Brand":
+        invalidate_cards(brand_product_ids(pk))
@@ -0,0 +1,43 @@
+# api/categories.py
+"""
+Produktzahlen je Kategorie (inkl. Teilbaum), gecacht.
+
+Ein gruppierter Query zählt aktive Produkte je Kategorie, die Summen für
+die Vorfahren ergeben sich aus dem Materialized Path (``ancestor_ids``).
+Produkt- und Kategorieänderungen löschen den Cache-Eintrag (api/signals.py).
+"""
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from .models import Category, Product
+
+COUNTS_KEY = "categories:counts"
+
+
+def category_counts():
+    """{category_id: aktive Produkte im Teilbaum}"""
+    counts = cache.get(COUNTS_KEY)
+    if counts is None:
+        direct = dict(Product.objects.filter(is_active=True).order_by()
+                      .values_list("category").annotate(n=Count("id")))
+        totals = Counter()
+        for pk, path in Category.objects.values_list("pk", "path"):
+            n = direct.get(pk)
+            if n:
+                for ancestor in path.split(".")[:-1]:
+                    totals[int(ancestor)] += n
+        counts = dict(totals)
+        cache.set(COUNTS_KEY, counts, getattr(settings, "CATEGORY_COUNTS_TTL", 300))
+    return counts
+
+
+def invalidate_category_counts():
+    cache.delete(COUNTS_KEY)
+
+
+def subtree_path(category_id):
+    """Pfad der Kategorie oder None – Grundlage für ``category__path__startswith``."""
+    return Category.objects.filter(pk=category_id).values_list("path", flat=True).first()
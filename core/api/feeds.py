@@ -0,0 +1,238 @@
+# api/feeds.py
+"""
+Katalog-Feed für Marktplätze / Ads (CSV, JSONL, XML).
+
+Alle Writer arbeiten zeilenweise über einen serverseitigen Cursor
+(``iterator(chunk_size=...)``) – der Speicherbedarf bleibt konstant,
+egal wie groß der Katalog ist.
+
+Bild-URLs sind immer absolut: Basis ist ``FEED_BASE_URL``, beim Streamen
+ohne Einstellung der Host des Requests. Die vorgenerierte gzip-Datei hat
+keinen Request und braucht deshalb ``FEED_BASE_URL`` (bzw. ``--base-url``).
+"""
+import csv
+import gzip
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from xml.sax.saxutils import escape, quoteattr
+
+from django.conf import settings
+from django.db.models import Prefetch
+
+from .models import Product, Size, Storage
+
+FEED_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "jsonl": "application/x-ndjson; charset=utf-8",
+    "xml": "application/xml; charset=utf-8",
+}
+
+DEFAULT_CHUNK_SIZE = 2000
+
+
+class _Echo:
+    """Pseudo-Buffer für csv.writer: gibt die Zeile direkt zurück."""
+
+    def write(self, value):
+        return value
+
+
+def feed_queryset():
+    return (Product.objects.filter(is_active=True)
+            .select_related("category")
+            .prefetch_related(
+                "brands",
+                Prefetch("stocks", queryset=Storage.objects.only("product", "size", "quantity")),
+            )
+            .order_by("id"))
+
+
+def iter_products(chunk_size=DEFAULT_CHUNK_SIZE, queryset=None):
+    qs = feed_queryset() if queryset is None else queryset
+    return qs.iterator(chunk_size=chunk_size)
+
+
+def feed_base_url(request=None):
+    """``FEED_BASE_URL`` (ohne abschließenden Slash), sonst Schema + Host des Requests, sonst ""."""
+    base = getattr(settings, "FEED_BASE_URL", "") or ""
+    if not base and request is not None:
+        base = request.build_absolute_uri("/")
+    return base.rstrip("/")
+
+
+def accepts_gzip(accept_encoding):
+    """True, wenn ``Accept-Encoding`` gzip mit q > 0 erlaubt (sonst gilt ``*``)."""
+    qualities = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        name, _, value = params.partition("=")
+        try:
+            qualities[coding.strip().lower()] = float(value) if name.strip().lower() == "q" else 1.0
+        except ValueError:
+            qualities[coding.strip().lower()] = 0.0
+    return qualities.get("gzip", qualities.get("*", 0)) > 0
+
+
+def _image_url(product, base_url=""):
+    if not product.image:
+        return ""
+    url = product.image.url
+    return base_url + url if url.startswith("/") else url
+
+
+def product_row(product, sizes, base_url=""):
+    """Ein Produkt als flaches Dict (Preise als String, wie in der API)."""
+    stock_map = {s.size_id: s.quantity for s in product.stocks.all()}
+    stock = {size.title: stock_map.get(size.id, 0) for size in sizes}
+    return {
+        "id": product.pk,
+        "title": product.title,
+        "category": product.category.title,
+        "new_price": str(product.new_price),
+        "old_price": str(product.old_price) if product.old_price is not None else "",
+        "image": _image_url(product, base_url),
+        "brands": [b.title for b in product.brands.all()],
+        "stock": stock,
+        "in_stock": product.in_stock,
+    }
+
+
+# ---------- Writer ----------
+def csv_header(sizes):
+    columns = ["id", "title", "category", "new_price", "old_price", "image", "brands", "in_stock"]
+    columns += [f"stock_{size.title}" for size in sizes]
+    return csv.writer(_Echo()).writerow(columns)
+
+
+def csv_line(row):
+    values = [
+        row["id"], row["title"], row["category"], row["new_price"], row["old_price"],
+        row["image"], "|".join(row["brands"]), int(row["in_stock"]),
+    ]
+    values += list(row["stock"].values())
+    return csv.writer(_Echo()).writerow(values)
+
+
+def jsonl_line(row):
+    return json.dumps(row, ensure_ascii=False) + "\n"
+
+
+def xml_header(sizes):
+    return '<?xml version="1.0" encoding="UTF-8"?>\n<catalog>\n'
+
+
+def xml_line(row):
+    brands = "".join(f"<brand>{escape(b)}</brand>" for b in row["brands"])
+    stock = "".join(
+        f"<size title={quoteattr(title)} quantity=\"{qty}\"/>" for title, qty in row["stock"].items()
+    )
+    return (
+        f'  <product id="{row["id"]}">'
+        f"<title>{escape(row['title'])}</title>"
+        f"<category>{escape(row['category'])}</category>"
+        f"<new_price>{row['new_price']}</new_price>"
+        f"<old_price>{row['old_price']}</old_price>"
+        f"<image>{escape(row['image'])}</image>"
+        f"<in_stock>{int(row['in_stock'])}</in_stock>"
+        f"<brands>{brands}</brands><stock>{stock}</stock>"
+        f"</product>\n"
+    )
+
+
+def xml_footer():
+    return "</catalog>\n"
+
+
+_WRITERS = {
+    # fmt: (header(sizes), line(row), footer())
+    "csv": (csv_header, csv_line, None),
+    "jsonl": (None, jsonl_line, None),
+    "xml": (xml_header, xml_line, xml_footer),
+}
+
+
+def feed_parts(fmt, sizes):
+    """Gibt (header, line, footer) für ein Format zurück – header/footer als String."""
+    header, line, footer = _WRITERS[fmt]
+    return (header(sizes) if header else "", line, footer() if footer else "")
+
+
+def stream_feed(fmt, request=None, chunk_size=DEFAULT_CHUNK_SIZE, base_url=None):
+    """Generator über den kompletten Feed als Text-Stücke."""
+    base_url = feed_base_url(request) if base_url is None else base_url.rstrip("/")
+    sizes = list(Size.objects.all())
+    header, line, footer = feed_parts(fmt, sizes)
+    if header:
+        yield header
+    for product in iter_products(chunk_size):
+        yield line(product_row(product, sizes, base_url))
+    if footer:
+        yield footer
+
+
+# ---------- Vorgenerierte gzip-Datei ----------
+def write_gzip_feed(fmt, path, chunk_size=DEFAULT_CHUNK_SIZE, compresslevel=6, base_url=None):
+    """
+    Schreibt den Feed als gzip-Datei, inkrementell.
+
+    Die Produkte werden nach ID-Bereichen (``pk // chunk_size``) in Chunks
+    geteilt, jeder Chunk wird als eigenes gzip-Member in ``<path>.parts/``
+    abgelegt, benannt nach dem Hash seines Inhalts.
+    Beim nächsten Lauf werden nur geänderte Chunks neu komprimiert, die
+    Zieldatei ist die Verkettung aller Member (gültiges gzip) und wird
+    atomar ersetzt.
+
+    Gibt (chunks_gesamt, chunks_neu) zurück.
+    """
+    base_url = feed_base_url() if base_url is None else base_url.rstrip("/")
+    path = Path(path)
+    parts_dir = path.with_name(path.name + ".parts")
+    parts_dir.mkdir(parents=True, exist_ok=True)
+
+    sizes = list(Size.objects.all())
+    header, line, footer = feed_parts(fmt, sizes)
+
+    used, written = [], 0
+
+    def flush(text):
+        nonlocal written
+        data = text.encode("utf-8")
+        part = parts_dir / f"{hashlib.sha1(data).hexdigest()}.gz"
+        if not part.exists():
+            tmp = part.with_suffix(".tmp")
+            tmp.write_bytes(gzip.compress(data, compresslevel=compresslevel, mtime=0))
+            os.replace(tmp, part)
+            written += 1
+        used.append(part)
+
+    if header:
+        flush(header)
+    buf, bucket = [], None
+    for product in iter_products(chunk_size):
+        # ID-Bereiche statt fester Anzahl: ein neues Produkt verschiebt
+        # nicht alle folgenden Chunk-Grenzen.
+        if bucket is not None and product.pk // chunk_size != bucket and buf:
+            flush("".join(buf))
+            buf = []
+        bucket = product.pk // chunk_size
+        buf.append(line(product_row(product, sizes, base_url)))
+    if buf:
+        flush("".join(buf))
+    if footer:
+        flush(footer)
+
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as out:
+        for part in used:
+            with open(part, "rb") as src:
+                shutil.copyfileobj(src, out)
+    os.replace(tmp, path)
+
+    keep = {p.name for p in used}
+    for stale in parts_dir.glob("*.gz"):
+        if stale.name not in keep:
+            stale.unlink(missing_ok=True)
+    return len(used), written
@@ -0,0 +1,15 @@
+# api/fields.py
+from rest_framework import serializers
+
+from .images import variants_to_representation
+
+
+class ImageVariantsField(serializers.Field):
+    """Read-only: gibt die vorberechneten Bild-Varianten inkl. srcset aus."""
+
+    def __init__(self, **kwargs):
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        return variants_to_representation(value, self.context.get("request"))
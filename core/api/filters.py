@@ -1,14 +1,33 @@
 import django_filters
+from rest_framework.filters import OrderingFilter
+from .categories import subtree_path
 from .models import Product
 
 
 class ProductFilter(django_filters.FilterSet):
-    min_price = django_filters.NumberFilter(field_name="price", lookup_expr="gte")
-    max_price = django_filters.NumberFilter(field_name="price", lookup_expr="lte")
-    category = django_filters.NumberFilter(field_name="category__id")
+    min_price = django_filters.NumberFilter(field_name="new_price", lookup_expr="gte")
+    max_price = django_filters.NumberFilter(field_name="new_price", lookup_expr="lte")
+    category = django_filters.NumberFilter(method="filter_category")  # inkl. Unterkategorien
     brand = django_filters.NumberFilter(field_name="brands__id")
     is_active = django_filters.BooleanFilter(field_name="is_active")
+    in_stock = django_filters.BooleanFilter(field_name="in_stock")
 
     class Meta:
         model = Product
-        fields = ["min_price", "max_price", "category", "brand", "is_active"]
\ No newline at end of file
+        fields = ["min_price", "max_price", "category", "brand", "is_active", "in_stock"]
+
+    def filter_category(self, queryset, name, value):
+        path = subtree_path(value)
+        if path is None:
+            return queryset.none()
+        return queryset.filter(category__path__startswith=path)
+
+
+class StableOrderingFilter(OrderingFilter):
+    """Hängt ``id`` als letzte Sortierung an – gleiche Reihenfolge wie im Katalog-Snapshot."""
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if ordering and "id" not in ordering and "-id" not in ordering:
+            ordering = [*ordering, "id"]
+        return ordering
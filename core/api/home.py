@@ -0,0 +1,44 @@
+# api/home.py
+"""Querysets der Homepage-Blöcke – gemeinsam für sync (views.py) und async (async_views.py)."""
+from django.db.models import Count, F
+
+from .cards import product_stubs
+from .choices import BannerLocation
+from .models import Banner, Brand, Product
+from .snapshot import catalog_snapshot
+from .trending import trending_ids
+
+
+def banners_qs(location, limit):
+    return Banner.objects.filter(is_active=True, location=location).order_by('-id')[:limit]
+
+
+def head_banner_qs():
+    return banners_qs(BannerLocation.HEAD, 1)
+
+
+def popular_brands_qs(limit):
+    return (Brand.objects.annotate(product_count=Count('products'))
+            .order_by('-product_count', 'title')[:limit])
+
+
+def bestsellers_qs(limit):
+    ids = catalog_snapshot.top("favs", limit)
+    if ids is not None:
+        return product_stubs(ids)
+    return (Product.objects.filter(is_active=True)
+            .annotate(fav_count=Count('favorited_by'))
+            .order_by('-fav_count', '-created_at')[:limit])
+
+
+def discounts_qs(limit):
+    ids = catalog_snapshot.top("discount", limit, where=lambda p: p["discount"] > 0)
+    if ids is not None:
+        return product_stubs(ids)
+    return (Product.objects.filter(is_active=True, old_price__isnull=False, new_price__lt=F('old_price'))
+            .annotate(discount_amount=F('old_price') - F('new_price'))
+            .order_by('-discount_amount', '-created_at')[:limit])
+
+
+def trending_qs(limit):
+    return product_stubs(trending_ids(limit))
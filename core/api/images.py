@@ -0,0 +1,150 @@
+# api/images.py
+"""
+Bild-Derivate (card / detail / zoom + WebP) für alle Upload-Felder.
+
+Nach einem Upload wird die Erzeugung per ``transaction.on_commit`` in einen
+Thread-Pool gegeben. Das Ergebnis (Dateinamen, Breite, Höhe) landet im
+JSON-Feld ``<feld>_variants`` des Modells, damit beim Rendern keine Datei
+geöffnet werden muss.
+
+Varianten werden wie Uploads nach Inhalts-Hash gespeichert (api/storage.py)
+und können deshalb von mehreren Objekten geteilt sein – alte Varianten
+werden hier nicht gelöscht, das übernimmt ``manage.py gc_media``.
+"""
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+
+from . import cards
+
+logger = logging.getLogger(__name__)
+
+# (app_label.Model, Bildfeld) -> JSON-Feld mit den Varianten ist immer "<feld>_variants"
+IMAGE_FIELDS = [
+    ("api.Product", "image"),
+    ("api.ProductImage", "image"),
+    ("api.Brand", "logo"),
+    ("api.Banner", "cover"),
+    ("user.User", "avatar"),
+]
+
+DEFAULT_VARIANTS = {"card": 400, "detail": 1000, "zoom": 2000}
+
+_executor = None
+
+
+def variant_widths():
+    return getattr(settings, "IMAGE_VARIANTS", DEFAULT_VARIANTS)
+
+
+def variants_field(field_name):
+    return f"{field_name}_variants"
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, "IMAGE_VARIANT_WORKERS", 2),
+            thread_name_prefix="image-variants",
+        )
+    return _executor
+
+
+def _encode(img, fmt):
+    buf = BytesIO()
+    if fmt == "JPEG":
+        img.convert("RGB").save(buf, "JPEG", quality=82, optimize=True, progressive=True)
+    elif fmt == "PNG":
+        img.save(buf, "PNG", optimize=True)
+    else:
+        img.save(buf, "WEBP", quality=80, method=4)
+    return buf.getvalue()
+
+
+def build_variants(name):
+    """
+    Erzeugt alle Varianten für die Datei ``name`` im default_storage.
+    Gibt das Dict für ``<feld>_variants`` zurück.
+    """
+    from PIL import Image, ImageOps
+
+    with default_storage.open(name, "rb") as fh:
+        img = Image.open(fh)
+        img.load()
+    img = ImageOps.exif_transpose(img)
+    width, height = img.size
+    has_alpha = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+    fmt, ext = ("PNG", ".png") if has_alpha else ("JPEG", ".jpg")
+    if img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGBA" if has_alpha else "RGB")
+
+    root = "variants/" + os.path.splitext(name)[0]
+    result = {"source": name, "width": width, "height": height, "variants": {}}
+    for label, max_width in sorted(variant_widths().items(), key=lambda kv: kv[1]):
+        resized = img.copy()
+        resized.thumbnail((max_width, max_width * 10), Image.LANCZOS)  # nie hochskalieren
+        w, h = resized.size
+        src = default_storage.save(f"{root}/{label}{ext}", ContentFile(_encode(resized, fmt)))
+        webp = default_storage.save(f"{root}/{label}.webp", ContentFile(_encode(resized, "WEBP")))
+        result["variants"][label] = {"src": src, "webp": webp, "width": w, "height": h}
+    return result
+
+
+def generate_for_instance(model_label, pk, field_name):
+    """Baut die Varianten für ein Objekt und speichert sie per UPDATE (ohne save-Signale)."""
+    model = apps.get_model(model_label)
+    name = model.objects.filter(pk=pk).values_list(field_name, flat=True).first()
+    if not name:
+        return None
+    data = build_variants(name)
+    # Nur schreiben, wenn das Bild in der Zwischenzeit nicht ersetzt wurde.
+    if model.objects.filter(pk=pk, **{field_name: name}).update(**{variants_field(field_name): data}):
+        cards.invalidate_for(model_label, pk)
+    return data
+
+
+def _run(model_label, pk, field_name):
+    close_old_connections()
+    try:
+        generate_for_instance(model_label, pk, field_name)
+    except Exception:
+        logger.exception("Bild-Varianten für %s#%s.%s fehlgeschlagen", model_label, pk, field_name)
+    finally:
+        close_old_connections()
+
+
+def schedule(model_label, pk, field_name):
+    """Reiht die Erzeugung nach dem Commit in den Worker-Pool ein."""
+    transaction.on_commit(lambda: _get_executor().submit(_run, model_label, pk, field_name))
+
+
+def needs_variants(instance, field_name):
+    file = getattr(instance, field_name)
+    current = getattr(instance, variants_field(field_name)) or {}
+    return bool(file) and current.get("source") != file.name
+
+
+def variants_to_representation(data, request=None):
+    """JSON-Feld -> API-Darstellung mit URLs und srcset-Strings."""
+    if not data or not data.get("variants"):
+        return None
+
+    def url(name):
+        u = default_storage.url(name)
+        return request.build_absolute_uri(u) if request else u
+
+    variants = sorted(data["variants"].items(), key=lambda kv: kv[1]["width"])
+    rep = {"width": data["width"], "height": data["height"]}
+    for label, v in variants:
+        rep[label] = {"url": url(v["src"]), "webp": url(v["webp"]), "width": v["width"], "height": v["height"]}
+    rep["srcset"] = ", ".join(f"{rep[label]['url']} {v['width']}w" for label, v in variants)
+    rep["srcset_webp"] = ", ".join(f"{rep[label]['webp']} {v['width']}w" for label, v in variants)
+    return rep
@@ -0,0 +1,141 @@
+import json
+import os
+import statistics
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api.models import Order, Product
+from api import urls as api_urls
+from user import urls as user_urls
+
+User = get_user_model()
+
+# Beispielwerte für URL-Parameter, die nicht aus der DB kommen
+STATIC_KWARGS = {"fmt": "jsonl", "block": "bestsellers"}
+
+
+class Command(BaseCommand):
+    help = (
+        "Misst Latenz, Durchsatz und Query-Anzahl für alle GET-Endpunkte aus api/urls.py "
+        "und user/urls.py und schlägt fehl, wenn ein Query-Budget überschritten wird."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", "-n", type=int, default=20)
+        parser.add_argument("--warmup", type=int, default=2)
+        parser.add_argument("--budgets", default=str(Path(settings.BASE_DIR) / "bench_budgets.json"),
+                            help="JSON {url-name: max. Queries}")
+        parser.add_argument("--update-budgets", action="store_true",
+                            help="aktuelle Query-Zahlen als neue Budgets speichern")
+        parser.add_argument("--only", action="append", help="nur diese URL-Namen")
+        parser.add_argument("--ci", action="store_true", default=bool(os.environ.get("CI")),
+                            help="fehlende Budget-Datei ist ein Fehler (Standard, wenn $CI gesetzt ist)")
+
+    def handle(self, *args, requests, warmup, budgets, update_budgets, only, ci, **options):
+        user = User.objects.filter(orders__isnull=False).first() or User.objects.first()
+        if user is None:
+            raise CommandError("Keine Daten – zuerst `manage.py seed` ausführen.")
+        kwargs_pool = {
+            "pk": Product.objects.filter(is_active=True).values_list("pk", flat=True).first(),
+            "product_id": Product.objects.filter(is_active=True).values_list("pk", flat=True).first(),
+            **STATIC_KWARGS,
+        }
+        order_pk = Order.objects.filter(user=user).values_list("pk", flat=True).first()
+        token = str(RefreshToken.for_user(user).access_token)
+        client = Client(HTTP_HOST="localhost", HTTP_AUTHORIZATION=f"Bearer {token}")
+
+        results = {}
+        for prefix, module in (("/api/", api_urls), ("/api/user/", user_urls)):
+            for pattern in module.urlpatterns:
+                if not isinstance(pattern, URLPattern) or (only and pattern.name not in only):
+                    continue
+                kwargs = dict(kwargs_pool)
+                if pattern.name == "order-detail":
+                    kwargs["pk"] = order_pk
+                url = self.build_url(prefix, pattern, kwargs)
+                if url is None:
+                    continue
+                result = self.measure(client, url, requests, warmup)
+                if result is None:  # kein GET (z. B. login/logout)
+                    continue
+                results[pattern.name] = result
+                self.stdout.write(
+                    f"{pattern.name:<22} {result['status']} q={result['queries']:<4} "
+                    f"p50={result['p50_ms']:7.2f}ms p95={result['p95_ms']:7.2f}ms "
+                    f"{result['rps']:7.1f} req/s  {url}"
+                )
+
+        self.check_budgets(results, Path(budgets), update_budgets, ci)
+
+    @staticmethod
+    def build_url(prefix, pattern, kwargs):
+        route = str(pattern.pattern)
+        for name in pattern.pattern.converters:
+            if kwargs.get(name) is None:
+                return None
+            route = route.replace(f"<int:{name}>", str(kwargs[name])).replace(f"<str:{name}>", str(kwargs[name]))
+        return prefix + route
+
+    @staticmethod
+    def _get(client, url):
+        response = client.get(url)
+        if response.streaming:
+            b"".join(response.streaming_content)
+        return response
+
+    def measure(self, client, url, requests, warmup):
+        response = self._get(client, url)
+        if response.status_code == 405:
+            return None
+        for _ in range(warmup):
+            self._get(client, url)
+
+        with CaptureQueriesContext(connection) as captured:
+            response = self._get(client, url)
+        # Header der Instrumentierungs-Middleware zählt auch Queries aus Worker-Threads
+        queries = int(response.get("X-Query-Count", len(captured)))
+
+        samples = []
+        started = time.perf_counter()
+        for _ in range(requests):
+            t0 = time.perf_counter()
+            self._get(client, url)
+            samples.append((time.perf_counter() - t0) * 1000)
+        wall = time.perf_counter() - started
+        samples.sort()
+        return {
+            "status": response.status_code,
+            "queries": queries,
+            "p50_ms": statistics.median(samples),
+            "p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+            "rps": len(samples) / wall,
+        }
+
+    def check_budgets(self, results, path, update, ci=False):
+        if update:
+            path.write_text(json.dumps({name: r["queries"] for name, r in sorted(results.items())}, indent=2) + "\n")
+            self.stdout.write(self.style.SUCCESS(f"Budgets gespeichert: {path}"))
+            return
+        if not path.exists():
+            if ci:
+                raise CommandError(f"Keine Budgets ({path}) – mit --update-budgets anlegen und committen.")
+            self.stdout.write(self.style.WARNING(f"Keine Budgets ({path}) – mit --update-budgets anlegen."))
+            return
+        budgets = json.loads(path.read_text())
+        regressions = [
+            f"{name}: {results[name]['queries']} Queries > Budget {limit}"
+            for name, limit in budgets.items()
+            if name in results and results[name]["queries"] > limit
+        ]
+        if regressions:
+            raise CommandError("Query-Budget überschritten:\n  " + "\n  ".join(regressions))
+        self.stdout.write(self.style.SUCCESS("Alle Query-Budgets eingehalten."))
@@ -0,0 +1,62 @@
+import asyncio
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client
+
+
+def _summary(label, samples, wall):
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    return (f"{label:<6} n={len(samples):<5} mean={statistics.mean(samples):7.2f}ms "
+            f"p50={statistics.median(samples):7.2f}ms p95={p95:7.2f}ms "
+            f"durchsatz={len(samples) / wall:7.1f} req/s")
+
+
+class Command(BaseCommand):
+    help = "Vergleicht die Latenz von home/index/ (sync, WSGI) mit home/async/index/ (async, ASGI)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", "-n", type=int, default=200)
+        parser.add_argument("--concurrency", "-c", type=int, default=1,
+                            help="gleichzeitige Requests (async: Tasks, sync: nacheinander)")
+        parser.add_argument("--warmup", type=int, default=10)
+        parser.add_argument("--query", default="", help="z. B. 'best=24&disc=24'")
+
+    def handle(self, *args, requests, concurrency, warmup, query, **options):
+        suffix = f"?{query}" if query else ""
+        sync_url, async_url = f"/api/home/index/{suffix}", f"/api/home/async/index/{suffix}"
+
+        client = Client(HTTP_HOST="localhost")
+        for _ in range(warmup):
+            client.get(sync_url)
+        samples = []
+        started = time.perf_counter()
+        for _ in range(requests):
+            t0 = time.perf_counter()
+            response = client.get(sync_url)
+            samples.append((time.perf_counter() - t0) * 1000)
+            assert response.status_code == 200, response.status_code
+        self.stdout.write(_summary("sync", samples, time.perf_counter() - started))
+
+        samples, wall = asyncio.run(self._run_async(async_url, requests, concurrency, warmup))
+        self.stdout.write(_summary("async", samples, wall))
+
+    async def _run_async(self, url, requests, concurrency, warmup):
+        client = AsyncClient(HTTP_HOST="localhost")
+        for _ in range(warmup):
+            await client.get(url)
+        samples = []
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one():
+            async with semaphore:
+                t0 = time.perf_counter()
+                response = await client.get(url)
+                samples.append((time.perf_counter() - t0) * 1000)
+                assert response.status_code == 200, response.status_code
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        return samples, time.perf_counter() - started
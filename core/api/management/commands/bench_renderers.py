@@ -0,0 +1,49 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+from rest_framework.request import Request
+
+from api.models import Product
+from api.renderers import FastJSONRenderer, MessagePackRenderer, msgpack, orjson
+from api.serializers import ProductListSerializer
+
+
+class Command(BaseCommand):
+    help = "Vergleicht DRF-JSONRenderer, FastJSONRenderer (orjson) und MessagePack auf großen Produktlisten."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=1000, help="Produkte pro Payload")
+        parser.add_argument("--repeat", "-n", type=int, default=20)
+
+    def handle(self, *args, products, repeat, **options):
+        request = Request(APIRequestFactory().get("/api/products/", HTTP_HOST="localhost"))
+        qs = Product.objects.filter(is_active=True)[:products]
+        data = ProductListSerializer(qs, many=True, context={"request": request}).data
+        if not data:
+            raise CommandError("Keine Produkte – zuerst `manage.py seed` ausführen.")
+        self.stdout.write(f"{len(data)} Produkte, {repeat} Durchläufe")
+
+        renderers = [("drf-json", JSONRenderer())]
+        if orjson is not None:
+            renderers.append(("orjson", FastJSONRenderer()))
+        if msgpack is not None:
+            renderers.append(("msgpack", MessagePackRenderer()))
+
+        baseline = None
+        for label, renderer in renderers:
+            samples = []
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                body = renderer.render(data, renderer.media_type, {})
+                samples.append((time.perf_counter() - t0) * 1000)
+            if label == "drf-json":
+                baseline = body
+            elif label == "orjson" and body != baseline:
+                raise CommandError("orjson-Ausgabe weicht von DRF ab (nicht bytegleich)")
+            self.stdout.write(
+                f"{label:<9} p50={statistics.median(samples):8.2f}ms min={min(samples):8.2f}ms "
+                f"größe={len(body) / 1024:8.1f} KiB"
+            )
@@ -0,0 +1,30 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api import snapshot
+
+
+class Command(BaseCommand):
+    help = "Schreibt den NumPy-Katalog-Snapshot (mmap) neu und schaltet ihn atomar um."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--watch", type=int, default=0, metavar="SEKUNDEN",
+                            help="dauerhaft laufen und alle N Sekunden neu bauen, wenn sich etwas geändert hat")
+
+    def handle(self, *args, watch, **options):
+        built_for, built_at = None, 0.0
+        while True:
+            generation = snapshot.current_generation()
+            # auch ohne Änderung rechtzeitig vor CATALOG_SNAPSHOT_MAX_AGE (Favoritenzahlen)
+            if generation != built_for or time.time() - built_at > settings.CATALOG_SNAPSHOT_MAX_AGE / 2:
+                started = time.perf_counter()
+                count = snapshot.build()
+                built_for, built_at = generation, time.time()
+                self.stdout.write(self.style.SUCCESS(
+                    f"{count} Produkte -> {settings.CATALOG_SNAPSHOT_DIR} ({time.perf_counter() - started:.2f}s)"
+                ))
+            if not watch:
+                return
+            time.sleep(watch)
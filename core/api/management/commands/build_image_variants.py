@@ -0,0 +1,50 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.db.models import Q
+
+from api.images import IMAGE_FIELDS, generate_for_instance, variants_field
+
+
+def _build(model_label, pk, field_name):
+    try:
+        return generate_for_instance(model_label, pk, field_name)
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = "Erzeugt fehlende Bild-Varianten (card/detail/zoom + WebP) für vorhandene Medien."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--model", action="append", dest="models",
+                            help="Nur dieses Modell, z. B. api.Product (mehrfach möglich)")
+        parser.add_argument("--force", action="store_true", help="Auch vorhandene Varianten neu erzeugen")
+        parser.add_argument("--workers", type=int, default=4)
+
+    def handle(self, *args, models, force, workers, **options):
+        jobs = []
+        for model_label, field_name in IMAGE_FIELDS:
+            if models and model_label not in models:
+                continue
+            model = apps.get_model(model_label)
+            qs = model.objects.exclude(Q(**{f"{field_name}__isnull": True}) | Q(**{field_name: ""}))
+            if not force:
+                qs = qs.filter(**{variants_field(field_name): {}})
+            jobs += [(model_label, pk, field_name) for pk in qs.values_list("pk", flat=True).iterator()]
+
+        self.stdout.write(f"{len(jobs)} Bilder zu verarbeiten ({workers} Worker)")
+        done = failed = 0
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(_build, *job): job for job in jobs}
+            for future in as_completed(futures):
+                model_label, pk, field_name = futures[future]
+                try:
+                    future.result()
+                    done += 1
+                except Exception as exc:
+                    failed += 1
+                    self.stderr.write(f"{model_label}#{pk}.{field_name}: {exc}")
+        self.stdout.write(self.style.SUCCESS(f"fertig: {done} ok, {failed} Fehler"))
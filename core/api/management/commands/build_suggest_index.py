@@ -0,0 +1,22 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.suggest import suggest_index
+
+
+class Command(BaseCommand):
+    help = "Baut den Prefix-Index für /api/products/suggest/ und speichert ihn als Snapshot (schneller Start)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", "-o", default=None,
+                            help="Zieldatei (Standard: settings.SUGGEST_SNAPSHOT)")
+
+    def handle(self, *args, output, **options):
+        started = time.perf_counter()
+        count = suggest_index.save_snapshot(output)
+        self.stdout.write(self.style.SUCCESS(
+            f"{count} Einträge -> {output or settings.SUGGEST_SNAPSHOT} "
+            f"({time.perf_counter() - started:.2f}s)"
+        ))
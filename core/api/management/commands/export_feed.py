@@ -0,0 +1,48 @@
+import sys
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.feeds import DEFAULT_CHUNK_SIZE, FEED_FORMATS, stream_feed, write_gzip_feed
+
+
+class Command(BaseCommand):
+    help = "Exportiert den Katalog-Feed (csv/jsonl/xml) – gestreamt oder als inkrementelle gzip-Datei."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", dest="fmt", choices=sorted(FEED_FORMATS), default="csv")
+        parser.add_argument("--output", "-o", help="Zieldatei (Default: stdout bzw. FEED_ROOT/catalog.<fmt>.gz)")
+        parser.add_argument("--gzip", dest="use_gzip", action="store_true",
+                            help="gzip-Datei schreiben, nur geänderte Chunks werden neu komprimiert")
+        parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+        parser.add_argument("--base-url", help="Schema + Host für Bild-URLs (Default: FEED_BASE_URL)")
+
+    def handle(self, *args, fmt, output, use_gzip, chunk_size, base_url, **options):
+        if chunk_size <= 0:
+            raise CommandError("--chunk-size muss > 0 sein")
+        base_url = base_url or getattr(settings, "FEED_BASE_URL", "")
+        if use_gzip and not base_url:
+            # die Datei ersetzt den gestreamten Feed (absolute URLs) -> gleiche URL-Form
+            raise CommandError("FEED_BASE_URL setzen oder --base-url angeben (Bild-URLs müssen absolut sein)")
+
+        started = time.perf_counter()
+        if use_gzip:
+            path = Path(output) if output else Path(settings.FEED_ROOT) / f"catalog.{fmt}.gz"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            total, written = write_gzip_feed(fmt, path, chunk_size=chunk_size, base_url=base_url)
+            self.stderr.write(
+                f"{path}: {total} Chunks, {written} neu komprimiert "
+                f"({time.perf_counter() - started:.2f}s)"
+            )
+            return
+
+        out = open(output, "w", encoding="utf-8", newline="") if output else sys.stdout
+        try:
+            for piece in stream_feed(fmt, chunk_size=chunk_size, base_url=base_url):
+                out.write(piece)
+        finally:
+            if output:
+                out.close()
+        self.stderr.write(f"Feed exportiert ({time.perf_counter() - started:.2f}s)")
@@ -0,0 +1,59 @@
+import os
+import time
+
+from django.apps import apps
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import models
+
+from api.images import IMAGE_FIELDS, variants_field
+from api.storage import is_content_addressed
+
+
+def referenced_names():
+    """Alle Dateinamen, auf die noch ein FileField/ImageField oder eine Bild-Variante zeigt."""
+    names = set()
+    for model in apps.get_models():
+        for field in model._meta.concrete_fields:
+            if isinstance(field, models.FileField):
+                qs = model._base_manager.exclude(**{field.name: ""}).exclude(**{f"{field.name}__isnull": True})
+                names.update(qs.values_list(field.name, flat=True).iterator())
+    for model_label, field_name in IMAGE_FIELDS:
+        model = apps.get_model(model_label)
+        qs = model._base_manager.exclude(**{variants_field(field_name): {}})
+        for data in qs.values_list(variants_field(field_name), flat=True).iterator():
+            for variant in (data or {}).get("variants", {}).values():
+                names.update((variant["src"], variant["webp"]))
+    return names
+
+
+class Command(BaseCommand):
+    help = "Löscht content-addressed Mediendateien, auf die kein ImageField mehr verweist."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true")
+        parser.add_argument("--grace-hours", type=float, default=24,
+                            help="Jüngere Dateien nie löschen (Uploads, deren Transaktion noch läuft)")
+
+    def handle(self, *args, dry_run, grace_hours, **options):
+        referenced = referenced_names()
+        root = default_storage.location
+        cutoff = time.time() - grace_hours * 3600
+        removed = freed = 0
+
+        for dirpath, _dirnames, filenames in os.walk(root):
+            for filename in filenames:
+                full = os.path.join(dirpath, filename)
+                name = os.path.relpath(full, root).replace(os.sep, "/")
+                if not is_content_addressed(name) or name in referenced:
+                    continue
+                stat = os.stat(full)
+                if stat.st_mtime > cutoff:
+                    continue
+                removed += 1
+                freed += stat.st_size
+                if not dry_run:
+                    os.remove(full)
+
+        verb = "würde löschen" if dry_run else "gelöscht"
+        self.stdout.write(f"{len(referenced)} referenziert, {removed} Dateien {verb} ({freed / 1024 / 1024:.1f} MB)")
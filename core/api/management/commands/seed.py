@@ -0,0 +1,199 @@
+import io
+import random
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.choices import BannerLocation
+from api.models import (
+    Banner, Basket, BasketItem, Brand, Category, Favorite, Order, OrderItem,
+    Product, ProductImage, Size, Storage,
+)
+from api.stock import refresh_stock
+
+User = get_user_model()
+
+# Oberkategorie -> Unterkategorien
+CATEGORIES = {
+    "shoes": ["sneakers", "boots"],
+    "clothing": ["jackets", "hoodies", "t-shirts", "pants"],
+    "accessories": ["caps", "bags", "socks"],
+}
+SIZES = ["XS", "S", "M", "L", "XL", "XXL"]
+WORDS = ["Air", "Street", "Classic", "Urban", "Pro", "Retro", "Cloud", "Flex", "Trail", "Neo", "Core", "Prime"]
+
+
+def _placeholder_image(name):
+    """Ein gemeinsames Platzhalterbild – dank Content-Hash-Storage nur einmal auf der Platte."""
+    try:
+        from PIL import Image
+    except ImportError:
+        return ""
+    buf = io.BytesIO()
+    Image.new("RGB", (800, 800), (200, 200, 200)).save(buf, "JPEG")
+    return default_storage.save(name, ContentFile(buf.getvalue()))
+
+
+class Command(BaseCommand):
+    help = "Erzeugt Testdaten in Produktionsgröße per bulk_create (Brands, Größen, Produkte, User, Bestellungen ...)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--brands", type=int, default=50)
+        parser.add_argument("--products", type=int, default=5000)
+        parser.add_argument("--images", type=int, default=3, help="Galeriebilder pro Produkt")
+        parser.add_argument("--users", type=int, default=500)
+        parser.add_argument("--favorites", type=int, default=10, help="Favoriten pro User")
+        parser.add_argument("--basket-items", type=int, default=3, help="Positionen pro Warenkorb")
+        parser.add_argument("--orders", type=int, default=2, help="Bestellungen pro User")
+        parser.add_argument("--banners", type=int, default=10)
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--seed", type=int, default=42, help="Zufalls-Seed (reproduzierbar)")
+
+    def handle(self, *args, **opts):
+        self.rng = random.Random(opts["seed"])
+        self.batch = opts["batch_size"]
+        started = time.perf_counter()
+        with transaction.atomic():
+            sizes = self.seed_sizes()
+            brands = self.seed_brands(opts["brands"])
+            categories = self.seed_categories()
+            self.seed_banners(opts["banners"])
+            products = self.seed_products(opts["products"], brands, categories, sizes, opts["images"])
+            users = self.seed_users(opts["users"])
+            self.seed_favorites(users, products, opts["favorites"])
+            self.seed_baskets(users, products, sizes, opts["basket_items"])
+            self.seed_orders(users, products, sizes, opts["orders"])
+        self.stdout.write(self.style.SUCCESS(f"Seed fertig in {time.perf_counter() - started:.1f}s"))
+
+    def log(self, label, count):
+        self.stdout.write(f"  {label:<14} {count:>8}")
+
+    # ---------- Stammdaten ----------
+    def seed_sizes(self):
+        Size.objects.bulk_create([Size(title=t, order=i) for i, t in enumerate(SIZES)], ignore_conflicts=True)
+        sizes = list(Size.objects.all())
+        self.log("sizes", len(sizes))
+        return sizes
+
+    def seed_brands(self, count):
+        logo = _placeholder_image("brands/seed/logo.jpg")
+        Brand.objects.bulk_create(
+            [Brand(title=f"Brand {i:04d}", logo=logo) for i in range(count)],
+            ignore_conflicts=True, batch_size=self.batch,
+        )
+        brands = list(Brand.objects.values_list("id", flat=True))
+        self.log("brands", len(brands))
+        return brands
+
+    def seed_categories(self):
+        """Wenige Zeilen -> einzeln per save(), damit der Pfad gesetzt wird. Gibt die Blätter zurück."""
+        leaves = []
+        for root_title, children in CATEGORIES.items():
+            root, _ = Category.objects.get_or_create(parent=None, slug=root_title, defaults={"title": root_title})
+            for title in children:
+                leaf, _ = Category.objects.get_or_create(parent=root, slug=title, defaults={"title": title})
+                leaves.append(leaf.pk)
+        self.log("categories", Category.objects.count())
+        return leaves
+
+    def seed_banners(self, count):
+        cover = _placeholder_image("banners/seed/cover.jpg")
+        locations = [loc for loc, _label in BannerLocation.CHOICES]
+        Banner.objects.bulk_create([
+            Banner(title=f"Banner {i}", cover=cover, location=locations[i % len(locations)])
+            for i in range(count)
+        ], batch_size=self.batch)
+        self.log("banners", count)
+
+    def seed_products(self, count, brands, categories, sizes, images_per_product):
+        rng = self.rng
+        image = _placeholder_image("products/seed/product.jpg")
+        products = []
+        for i in range(count):
+            price = Decimal(rng.randrange(999, 29999)) / 100
+            old_price = (price * Decimal(rng.choice(["1.10", "1.25", "1.50"]))).quantize(Decimal("0.01")) \
+                if rng.random() < 0.3 else None
+            products.append(Product(
+                title=f"{rng.choice(WORDS)} {rng.choice(WORDS)} {i}",
+                category_id=rng.choice(categories),
+                new_price=price,
+                old_price=old_price,
+                description="Seed-Produkt",
+                image=image,
+                is_active=rng.random() < 0.95,
+            ))
+        products = Product.objects.bulk_create(products, batch_size=self.batch)
+        ids = [p.pk for p in products]
+        self.log("products", len(ids))
+
+        through = Product.brands.through
+        links = [through(product_id=pid, brand_id=bid)
+                 for pid in ids for bid in rng.sample(brands, k=min(len(brands), rng.randint(1, 2)))]
+        through.objects.bulk_create(links, batch_size=self.batch, ignore_conflicts=True)
+        self.log("brand links", len(links))
+
+        ProductImage.objects.bulk_create(
+            [ProductImage(product_id=pid, image=image, order=n) for pid in ids for n in range(images_per_product)],
+            batch_size=self.batch,
+        )
+        self.log("images", len(ids) * images_per_product)
+
+        stocks = [Storage(product_id=pid, size=size, quantity=rng.choice([0, 0, 1, 3, 10, 25]))
+                  for pid in ids for size in rng.sample(sizes, k=rng.randint(1, len(sizes)))]
+        Storage.objects.bulk_create(stocks, batch_size=self.batch)
+        refresh_stock(ids)  # bulk_create löst keine Signale aus
+        self.log("stock rows", len(stocks))
+        return ids
+
+    # ---------- User-Daten ----------
+    def seed_users(self, count):
+        password = make_password("seed-password")  # einmal hashen, nicht pro User
+        offset = User.objects.count()
+        users = User.objects.bulk_create([
+            User(email=f"seed{offset + i}@example.com", username=f"seed{offset + i}", password=password)
+            for i in range(count)
+        ], batch_size=self.batch)
+        self.log("users", len(users))
+        return [u.pk for u in users]
+
+    def seed_favorites(self, users, products, per_user):
+        favs = [Favorite(user_id=uid, product_id=pid)
+                for uid in users for pid in self.rng.sample(products, k=min(per_user, len(products)))]
+        Favorite.objects.bulk_create(favs, batch_size=self.batch, ignore_conflicts=True)
+        self.log("favorites", len(favs))
+
+    def seed_baskets(self, users, products, sizes, per_basket):
+        baskets = Basket.objects.bulk_create([Basket(user_id=uid) for uid in users], batch_size=self.batch)
+        items = [BasketItem(basket_id=b.pk, product_id=pid, size=self.rng.choice(sizes),
+                            quantity=self.rng.randint(1, 3))
+                 for b in baskets for pid in self.rng.sample(products, k=min(per_basket, len(products)))]
+        BasketItem.objects.bulk_create(items, batch_size=self.batch, ignore_conflicts=True)
+        self.log("basket items", len(items))
+
+    def seed_orders(self, users, products, sizes, per_user):
+        prices = dict(Product.objects.filter(pk__in=products).values_list("pk", "new_price"))
+        statuses = [key for key, _label in Order.STATUS_CHOICES]
+        orders = Order.objects.bulk_create(
+            [Order(user_id=uid, status=self.rng.choice(statuses)) for uid in users for _ in range(per_user)],
+            batch_size=self.batch,
+        )
+        items, totals = [], []
+        for order in orders:
+            total = Decimal("0")
+            for pid in self.rng.sample(products, k=min(self.rng.randint(1, 4), len(products))):
+                qty = self.rng.randint(1, 2)
+                items.append(OrderItem(order_id=order.pk, product_id=pid, size=self.rng.choice(sizes),
+                                       quantity=qty, price=prices[pid]))
+                total += qty * prices[pid]
+            order.total_price = total
+            totals.append(order)
+        OrderItem.objects.bulk_create(items, batch_size=self.batch)
+        Order.objects.bulk_update(totals, ["total_price"], batch_size=self.batch)
+        self.log("orders", len(orders))
+        self.log("order items", len(items))
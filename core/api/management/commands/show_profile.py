@@ -0,0 +1,38 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.profiling import profile_dir
+
+
+class Command(BaseCommand):
+    help = "Zeigt ein mit X-Profile aufgenommenes Profil: teuerste Funktionen und langsamste SQL-Queries."
+
+    def add_arguments(self, parser):
+        parser.add_argument("profile_id", nargs="?", help="ID aus X-Profile-Id (ohne: Liste der letzten Profile)")
+        parser.add_argument("--limit", "-n", type=int, default=20)
+
+    def handle(self, *args, profile_id, limit, **options):
+        root = profile_dir()
+        if not profile_id:
+            for path in sorted(root.glob("*.json"), reverse=True)[:limit]:
+                record = json.loads(path.read_text())
+                self.stdout.write(f"{record['id']}  {record['status']} {record['duration_ms']:>9.2f}ms  "
+                                  f"{len(record['queries']):>4}q  {record['method']} {record['path']}")
+            return
+        path = root / f"{profile_id}.json"
+        if not path.is_file():
+            raise CommandError(f"Profil {profile_id} nicht gefunden ({root})")
+        record = json.loads(path.read_text())
+        self.stdout.write(f"{record['method']} {record['path']} -> {record['status']}  "
+                          f"{record['duration_ms']:.2f}ms gesamt, {record['db_ms']:.2f}ms DB "
+                          f"({len(record['queries'])} Queries)  Spans: {record['spans']}")
+
+        self.stdout.write(self.style.MIGRATE_HEADING("\nFunktionen (kumuliert):"))
+        for fn in record["functions"][:limit]:
+            self.stdout.write(f"  {fn['cumtime_ms']:>9.2f}ms {fn['tottime_ms']:>9.2f}ms {fn['calls']:>7}x  {fn['function']}")
+
+        self.stdout.write(self.style.MIGRATE_HEADING("\nLangsamste Queries:"))
+        for query in sorted(record["queries"], key=lambda q: q["ms"], reverse=True)[:limit]:
+            self.stdout.write(f"  {query['ms']:>9.3f}ms  {query['sql'][:200]}")
+        self.stdout.write(f"\npstats: {root / (profile_id + '.prof')}")
@@ -0,0 +1,29 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.warmup import warm_up
+
+
+class Command(BaseCommand):
+    help = "Wärmt URLconf, Serializer, JWT und App-Caches auf und gibt die Dauer pro Schritt aus (wie beim Worker-Start)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--no-db", action="store_true", help="Schritte mit DB/Cache-Zugriff auslassen")
+        parser.add_argument("--json", action="store_true", dest="as_json", help="Ergebnis als JSON (z. B. für CI-Vergleiche)")
+
+    def handle(self, *args, no_db, as_json, **options):
+        started = time.perf_counter()
+        timings = warm_up(database=not no_db)
+        total = round((time.perf_counter() - started) * 1000, 2)
+        errors = timings.pop("errors", {})
+        if as_json:
+            self.stdout.write(json.dumps({"total_ms": total, "steps": timings, "errors": errors}))
+            return
+        for name, ms in timings.items():
+            line = f"  {name:<18} {ms:>9.2f}ms"
+            self.stdout.write(self.style.ERROR(f"{line}  {errors[name]}") if name in errors else line)
+        style = self.style.WARNING if errors else self.style.SUCCESS
+        self.stdout.write(style(f"Warm-up fertig in {total:.2f}ms" + (f", {len(errors)} Fehler" if errors else "")))
+
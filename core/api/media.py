@@ -0,0 +1,168 @@
+# api/media.py
+"""
+Auslieferung von MEDIA_ROOT aus der App (auch ohne DEBUG).
+
+- ETag / Last-Modified + bedingte Requests (304 / 412)
+- Byte-Ranges (``Range: bytes=a-b``, ``If-Range``) -> 206 / 416
+- FileResponse: unter gunicorn & Co. geht die Datei per wsgi.file_wrapper
+  (sendfile) ohne Kopie in den Socket
+- optional ``X-Accel-Redirect`` (nginx) bzw. ``X-Sendfile``: die App prüft
+  nur, der Proxy überträgt
+"""
+import mimetypes
+import os
+import posixpath
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotAllowed
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+from .storage import is_content_addressed
+
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def media_cache_control(response, name):
+    """Hash-Namen sind unveränderlich -> 1 Jahr + immutable, sonst kurzer max-age."""
+    if is_content_addressed(name):
+        patch_cache_control(response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+    else:
+        patch_cache_control(response, public=True, max_age=getattr(settings, "MEDIA_CACHE_MAX_AGE", 3600))
+    return response
+
+
+def _etag(name, stat):
+    if is_content_addressed(name):
+        # Der Dateiname ist bereits der Inhalts-Hash.
+        return quote_etag(os.path.splitext(posixpath.basename(name))[0])
+    return quote_etag(f"{stat.st_size:x}-{stat.st_mtime_ns:x}")
+
+
+def _parse_range(header, size):
+    """
+    Gibt (start, end) inkl. zurück, None für "ganze Datei" (kein/ungültiger
+    oder Multi-Range-Header) bzw. False für nicht erfüllbar (-> 416).
+    """
+    match = _RANGE_RE.match(header.replace(" ", ""))
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:  # Suffix: die letzten N Bytes
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+class _RangeFile:
+    """
+    Datei-Ausschnitt für FileResponse. ``fileno()``/``tell()`` zeigen auf den
+    Range-Anfang, damit sendfile (gunicorn) zusammen mit Content-Length
+    genau den Ausschnitt überträgt; ohne file_wrapper begrenzt ``read()``.
+    """
+
+    def __init__(self, fh, start, length):
+        fh.seek(start)
+        self._fh = fh
+        self._remaining = length
+
+    def read(self, size=-1):
+        if self._remaining <= 0:
+            return b""
+        if size is None or size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._fh.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self._fh.fileno()
+
+    def tell(self):
+        return self._fh.tell()
+
+    def seekable(self):
+        return False
+
+    def close(self):
+        self._fh.close()
+
+
+def _offload(response, header, name, fullpath):
+    if header.lower() == "x-sendfile":
+        response[header] = fullpath
+    else:
+        response[header] = getattr(settings, "MEDIA_OFFLOAD_PREFIX", "/protected-media/").rstrip("/") + "/" + name
+    return response
+
+
+def serve_media(request, path, document_root=None):
+    if request.method not in ("GET", "HEAD"):
+        return HttpResponseNotAllowed(["GET", "HEAD"])
+
+    name = posixpath.normpath(path).lstrip("/")
+    try:
+        fullpath = safe_join(document_root or settings.MEDIA_ROOT, name)
+    except SuspiciousFileOperation:  # Pfad außerhalb von MEDIA_ROOT
+        raise Http404
+    try:
+        stat = os.stat(fullpath)
+    except OSError:
+        raise Http404
+    if not os.path.isfile(fullpath):
+        raise Http404
+
+    etag = _etag(name, stat)
+    last_modified = int(stat.st_mtime)
+    content_type = mimetypes.guess_type(fullpath)[0] or "application/octet-stream"
+
+    def finish(response):
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        response["Accept-Ranges"] = "bytes"
+        return media_cache_control(response, name)
+
+    conditional = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if conditional is not None:
+        return finish(conditional)
+
+    offload_header = getattr(settings, "MEDIA_OFFLOAD_HEADER", None)
+    if offload_header:
+        # Proxy übernimmt die Übertragung inkl. Range
+        return finish(_offload(HttpResponse(content_type=content_type), offload_header, name, fullpath))
+
+    size = stat.st_size
+    byte_range = None
+    range_header = request.META.get("HTTP_RANGE")
+    if range_header and size:
+        if_range = request.META.get("HTTP_IF_RANGE")
+        if not if_range or if_range == etag or parse_http_date_safe(if_range) == last_modified:
+            byte_range = _parse_range(range_header, size)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return finish(response)
+
+    fh = open(fullpath, "rb")
+    if byte_range is None:
+        response = FileResponse(fh, content_type=content_type)
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = FileResponse(_RangeFile(fh, start, length), content_type=content_type, status=206)
+        response["Content-Length"] = str(length)
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return finish(response)
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:12
+#
+# Umstellung Product.category (Text) -> FK auf Category in drei Migrationen:
+# 0007 Schema anlegen, 0007b Daten übertragen, 0007c alte Spalte ersetzen.
+# Getrennt, damit die Daten-UPDATEs committet sind, bevor ALTER TABLE läuft
+# (PostgreSQL: "cannot ALTER TABLE ... because it has pending trigger events").
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Category',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=100)),
+                ('slug', models.SlugField(max_length=100)),
+                ('path', models.CharField(default='', editable=False, max_length=255)),
+                ('depth', models.PositiveSmallIntegerField(default=0, editable=False)),
+                ('parent', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT,
+                                             related_name='children', to='api.category')),
+            ],
+            options={
+                'ordering': ('path',),
+                'indexes': [models.Index(fields=['path'], name='category_path_idx', opclasses=['varchar_pattern_ops'])],
+                'constraints': [models.UniqueConstraint(fields=('parent', 'slug'), name='category_unique_slug_per_parent')],
+            },
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='category_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT,
+                                    related_name='+', to='api.category'),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='category',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=100),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:12
+#
+# Datenteil der Kategorie-Umstellung (s. 0007_category_tree).
+
+from django.db import migrations
+from django.utils.text import slugify
+
+PATH_STEP = 6
+FALLBACK = "Sonstiges"
+
+
+def strings_to_categories(apps, schema_editor):
+    Category = apps.get_model("api", "Category")
+    Product = apps.get_model("api", "Product")
+    # Rohwert -> Titel; " Shoes " und "Shoes" landen in derselben Kategorie
+    raw_titles = {raw: (raw or "").strip() or FALLBACK
+                  for raw in Product.objects.values_list("category", flat=True).distinct()}
+    by_title = {}
+    for title in sorted(set(raw_titles.values())):
+        slug = slugify(title)[:100] or f"category-{len(by_title) + 1}"
+        category = Category.objects.create(title=title, slug=slug)
+        # historisches Modell ohne eigenes save() -> Pfad hier setzen
+        category.path = f"{category.pk:0{PATH_STEP}d}."
+        category.save(update_fields=["path"])
+        by_title[title] = category.pk
+    for raw, title in raw_titles.items():
+        qs = Product.objects.filter(category__isnull=True) if raw is None else Product.objects.filter(category=raw)
+        qs.update(category_ref=by_title[title])
+
+
+def categories_to_strings(apps, schema_editor):
+    Product = apps.get_model("api", "Product")
+    Category = apps.get_model("api", "Category")
+    for pk, title in Category.objects.values_list("pk", "title"):
+        Product.objects.filter(category_ref=pk).update(category=title)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_category_tree'),
+    ]
+
+    operations = [
+        migrations.RunPython(strings_to_categories, categories_to_strings),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:12
+#
+# Alte Textspalte durch den FK ersetzen (s. 0007_category_tree).
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007b_category_tree_data'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='product',
+            name='category',
+        ),
+        migrations.RenameField(
+            model_name='product',
+            old_name='category_ref',
+            new_name='category',
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='category',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT,
+                                    related_name='products', to='api.category'),
+        ),
+    ]
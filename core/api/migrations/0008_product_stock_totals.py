@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:40
+
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill(apps, schema_editor):
+    Product = apps.get_model("api", "Product")
+    Storage = apps.get_model("api", "Storage")
+    total = (Storage.objects.filter(product=OuterRef("pk")).order_by()
+             .values("product").annotate(total=Sum("quantity")).values("total"))
+    Product.objects.update(
+        total_stock=Coalesce(Subquery(total), 0),
+        in_stock=Exists(Storage.objects.filter(product=OuterRef("pk"), quantity__gt=0)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007c_category_tree_swap'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='total_stock',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='in_stock',
+            field=models.BooleanField(db_index=True, default=False, editable=False),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
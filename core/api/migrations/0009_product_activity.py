@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_product_stock_totals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField(db_index=True)),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('basket_adds', models.PositiveIntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity', to='api.product')),
+            ],
+            options={
+                'unique_together': {('product', 'hour')},
+            },
+        ),
+    ]
@@ -1,4 +1,7 @@
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Concat, Substr
 from django.contrib.auth import get_user_model
 from .choices import BannerLocation
 
@@ -8,6 +11,7 @@ User = get_user_model()
 class Brand(models.Model):
     title = models.CharField(max_length=120, unique=True, db_index=True)
     logo = models.ImageField(upload_to='brands/%Y/%m/', blank=True, null=True)
+    logo_variants = models.JSONField(default=dict, blank=True, editable=False)  # s. api/images.py
 
     def __str__(self):
         return self.title
@@ -25,15 +29,82 @@ class Size(models.Model):
         return self.title
 
 
+class Category(models.Model):
+    """
+    Kategoriebaum als Materialized Path: ``path`` = PKs aller Vorfahren und
+    der eigene, je 6-stellig mit Punkt ("000001.000004."). Ein Teilbaum ist
+    damit ein einziger Bereichs-Query ``path__startswith=<path>``.
+    """
+    PATH_STEP = 6
+
+    title = models.CharField(max_length=100)
+    slug = models.SlugField(max_length=100)
+    parent = models.ForeignKey('self', on_delete=models.PROTECT, null=True, blank=True, related_name='children')
+    path = models.CharField(max_length=255, default='', editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+
+    class Meta:
+        ordering = ("path",)
+        constraints = [
+            models.UniqueConstraint(fields=["parent", "slug"], name="category_unique_slug_per_parent"),
+        ]
+        indexes = [
+            # varchar_pattern_ops: LIKE 'prefix%' nutzt den Index auch bei nicht-C-Collation (PostgreSQL)
+            models.Index(fields=["path"], name="category_path_idx", opclasses=["varchar_pattern_ops"]),
+        ]
+
+    def __str__(self):
+        return self.title
+
+    @property
+    def ancestor_ids(self):
+        """PKs der Vorfahren (Wurzel zuerst) – direkt aus dem Pfad, ohne Query."""
+        return [int(seg) for seg in self.path.split(".")[:-2]]
+
+    def get_descendants(self, include_self=True):
+        qs = Category.objects.filter(path__startswith=self.path)
+        return qs if include_self else qs.exclude(pk=self.pk)
+
+    def clean(self):
+        if self.pk and self.parent_id and (self.parent_id == self.pk or self.pk in self.parent.ancestor_ids):
+            raise ValidationError({"parent": "Kategorie kann nicht unter sich selbst hängen."})
+
+    def _build_path(self):
+        prefix = self.parent.path if self.parent_id else ""
+        return f"{prefix}{self.pk:0{self.PATH_STEP}d}."
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            if self.pk is None:
+                super().save(*args, **kwargs)  # PK wird für den Pfad gebraucht
+                args, kwargs = (), {}
+            old_path, old_depth = self.path, self.depth
+            self.path = self._build_path()
+            if old_path and self.path != old_path and self.path.startswith(old_path):
+                raise ValueError("Kategorie kann nicht in ihren eigenen Teilbaum verschoben werden.")
+            self.depth = self.path.count(".") - 1
+            super().save(*args, **kwargs)
+            if old_path and self.path != old_path:
+                # Teilbaum umhängen: Präfix in allen Nachfahren ersetzen
+                Category.objects.filter(path__startswith=old_path).exclude(pk=self.pk).update(
+                    path=Concat(Value(self.path), Substr("path", len(old_path) + 1)),
+                    depth=F("depth") + (self.depth - old_depth),
+                )
+
+
 class Product(models.Model):
     image = models.ImageField(upload_to='products/%Y/%m/', blank=True, null=True)  # Hauptbild
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)  # s. api/images.py
     title = models.CharField(max_length=200, db_index=True)
-    category = models.CharField(max_length=100, db_index=True)
+    category = models.ForeignKey(Category, on_delete=models.PROTECT, related_name='products')
     old_price = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
     new_price = models.DecimalField(max_digits=10, decimal_places=2)
     description = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     is_active = models.BooleanField(default=True, db_index=True)
+    # Summe aus Storage, gepflegt von api/stock.py (Storage-Signale)
+    total_stock = models.PositiveIntegerField(default=0, editable=False)
+    in_stock = models.BooleanField(default=False, db_index=True, editable=False)
 
     brands = models.ManyToManyField(Brand, blank=True, related_name='products')
 
@@ -49,6 +120,7 @@ class ProductImage(models.Model):
     """Zusätzliche Bilder fürs Carousel."""
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="images")
     image = models.ImageField(upload_to="products/%Y/%m/")
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)  # s. api/images.py
     order = models.PositiveIntegerField(default=0)
 
     class Meta:
@@ -108,11 +180,26 @@ class Favorite(models.Model):
         return f'{self.user} likes {self.product}'
 
 
+class ProductActivity(models.Model):
+    """Stündliche Aufrufe/Warenkorb-Adds pro Produkt (Write-Behind aus api/trending.py)."""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='activity')
+    hour = models.DateTimeField(db_index=True)  # auf volle Stunde abgeschnitten (UTC)
+    views = models.PositiveIntegerField(default=0)
+    basket_adds = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('product', 'hour')
+
+    def __str__(self):
+        return f'{self.product_id} @ {self.hour:%Y-%m-%d %H}h: {self.views} views, {self.basket_adds} adds'
+
+
 class Banner(models.Model):
     """Werbebanner an verschiedenen Positionen."""
     title = models.CharField(max_length=255)
     description = models.TextField(blank=True)
     cover = models.ImageField(upload_to='banners/%Y/%m/', blank=True, null=True)
+    cover_variants = models.JSONField(default=dict, blank=True, editable=False)  # s. api/images.py
     location = models.CharField(
         max_length=20,
         choices=BannerLocation.CHOICES,
@@ -0,0 +1,101 @@
+# api/renderers.py
+"""
+Schnelle Renderer/Parser für die API.
+
+- ``FastJSONRenderer`` / ``FastJSONParser``: orjson statt stdlib-``json``.
+  Strings, Integer, Decimal/Datum/Zeit (über DRFs ``JSONEncoder.default``)
+  und Struktur sind bytegleich zu DRFs ``JSONRenderer``; *Floats* nicht
+  immer (orjson ``1e16`` statt ``1e+16``, ``NaN``/``Infinity`` werden zu
+  ``null`` statt eines Fehlers). Ohne orjson bzw. für ``indent=`` (Browsable
+  API) wird auf DRF zurückgefallen. Der Parser gibt Bodies mit Zahlen über
+  64 Bit an die stdlib weiter – orjson würde daraus Floats machen.
+- ``MessagePackRenderer`` / ``MessagePackParser``: optional (``msgpack``),
+  per ``Accept: application/msgpack`` oder ``?format=msgpack``.
+"""
+import io
+import re
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional
+    msgpack = None
+
+_encoder = JSONEncoder()
+
+if orjson is not None:
+    # Datum/Zeit nicht nativ, damit das Format (``...Z``, Millisekunden) wie bei DRF bleibt
+    ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+
+# 20+ Ziffern am Stück können über 64 Bit liegen (auch in Strings -> nur langsamer)
+_LONG_NUMBER_RE = re.compile(rb'\d{20,}')
+
+
+def _default(obj):
+    return _encoder.default(obj)
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if orjson is None or self.ensure_ascii or not self.compact or \
+                self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=_default, option=ORJSON_OPTIONS)
+        except TypeError:  # z. B. Integer > 64 Bit – stdlib kann das
+            return super().render(data, accepted_media_type, renderer_context)
+        # wie DRF: JSON als striktes JavaScript-Subset
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class FastJSONParser(JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', 'utf-8')
+        if orjson is None or encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+        body = stream.read()
+        if _LONG_NUMBER_RE.search(body):
+            return super().parse(io.BytesIO(body), media_type, parser_context)
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_default, use_bin_type=True, datetime=False)
+
+
+class MessagePackParser(BaseParser):
+    media_type = 'application/msgpack'
+    renderer_class = MessagePackRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False, strict_map_key=False)
+        except (ValueError, msgpack.ExtraData, msgpack.FormatError, msgpack.StackError) as exc:
+            raise ParseError('MessagePack parse error - %s' % str(exc))
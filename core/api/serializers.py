@@ -1,38 +1,60 @@
 # api/serializers.py
 from rest_framework import serializers
 from .models import (
-    Product, Basket, BasketItem, Favorite, Brand, Banner,
-    ProductImage, Size, Storage, Order, OrderItem
+    Product, Basket, BasketItem, Favorite, Brand, Banner, Category,
+    ProductImage, Order, OrderItem
 )
+from .fields import ImageVariantsField
+from .cards import CardCacheMixin, CardListSerializer, RelatedCardListSerializer
+from .stock import all_sizes, size_stock
+from core.instrumentation import TimedSerializerMixin
 
 # --- Brands ---
-class BrandSerializer(serializers.ModelSerializer):
+class BrandSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    logo_variants = ImageVariantsField()
+
     class Meta:
         model = Brand
-        fields = ['id', 'title', 'logo']
+        fields = ['id', 'title', 'logo', 'logo_variants']
+
+
+# --- Categories ---
+class CategorySerializer(serializers.ModelSerializer):
+    product_count = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Category
+        fields = ['id', 'title', 'slug', 'parent', 'depth', 'product_count']
+
+    def get_product_count(self, obj):
+        return self.context.get('counts', {}).get(obj.pk, 0)
 
 
 # --- Product images (Galerie) ---
-class ProductImageSerializer(serializers.ModelSerializer):
+class ProductImageSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    image_variants = ImageVariantsField()
+
     class Meta:
         model = ProductImage
-        fields = ["id", "image", "order"]
+        fields = ["id", "image", "image_variants", "order"]
 
 
-# --- Product base ---
-class ProductSerializer(serializers.ModelSerializer):
+# --- Product base (= gecachte Produktkarte, s. api/cards.py) ---
+class ProductSerializer(TimedSerializerMixin, CardCacheMixin, serializers.ModelSerializer):
     brands = BrandSerializer(many=True, read_only=True)
+    image_variants = ImageVariantsField()
     has_discount = serializers.SerializerMethodField()
     discount_amount = serializers.SerializerMethodField()
 
     class Meta:
         model = Product
         fields = [
-            'id', 'image', 'title', 'category',
+            'id', 'image', 'image_variants', 'title', 'category',
             'old_price', 'new_price', 'description',
-            'created_at', 'is_active',
+            'created_at', 'is_active', 'in_stock',
             'brands', 'has_discount', 'discount_amount',
         ]
+        list_serializer_class = CardListSerializer
 
     def get_has_discount(self, obj):
         return obj.old_price is not None and obj.new_price < obj.old_price
@@ -50,7 +72,20 @@ class ProductListSerializer(ProductSerializer):
     class Meta(ProductSerializer.Meta):
         fields = ProductSerializer.Meta.fields + ['is_favorite']
 
+    def prepare_live_fields(self, instances):
+        """Favoriten des Users für alle Karten mit einer Query."""
+        request = self.context.get('request')
+        user = getattr(request, 'user', None)
+        if not user or not user.is_authenticated:
+            self._favorite_ids = set()
+            return
+        self._favorite_ids = set(Favorite.objects.filter(user=user, product__in=[p.pk for p in instances])
+                                 .values_list('product_id', flat=True))
+
     def get_is_favorite(self, obj):
+        favorite_ids = getattr(self, '_favorite_ids', None)
+        if favorite_ids is not None:
+            return obj.pk in favorite_ids
         request = self.context.get('request')
         user = getattr(request, 'user', None)
         if not user or not user.is_authenticated:
@@ -77,11 +112,10 @@ class ProductDetailSerializer(ProductSerializer):
         }
         """
         result = {}
-        sizes = Size.objects.all().order_by("order", "title")
-        stock_map = {s.size_id: s.quantity for s in Storage.objects.filter(product=obj)}
-        for size in sizes:
-            qty = stock_map.get(size.id, 0)
-            result[size.title] = {"available": qty > 0, "quantity": qty}
+        stock_map = size_stock([obj.pk]).get(obj.pk, {})  # gecacht, s. api/stock.py
+        for size_id, title in all_sizes():
+            qty = stock_map.get(size_id, 0)
+            result[title] = {"available": qty > 0, "quantity": qty}
         return result
 
     def get_similar(self, obj):
@@ -94,7 +128,7 @@ class ProductDetailSerializer(ProductSerializer):
                     limit = max(1, int(q))
             except Exception:
                 pass
-        qs = (Product.objects.filter(is_active=True, category=obj.category)
+        qs = (Product.objects.filter(is_active=True, category_id=obj.category_id)
               .exclude(pk=obj.pk)
               .order_by('-created_at')
               .prefetch_related("brands"))[:limit]
@@ -102,7 +136,7 @@ class ProductDetailSerializer(ProductSerializer):
 
 
 # ========== BASKET ==========
-class BasketItemSerializer(serializers.ModelSerializer):
+class BasketItemSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     product = ProductSerializer(read_only=True)
     size = serializers.SlugRelatedField(read_only=True, slug_field="title")
     line_total = serializers.SerializerMethodField()
@@ -110,13 +144,14 @@ class BasketItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = BasketItem
         fields = ["id", "product", "size", "quantity", "line_total"]
+        list_serializer_class = RelatedCardListSerializer
 
     def get_line_total(self, obj):
         # Preis aus aktuellem Produktpreis
         return obj.quantity * obj.product.new_price
 
 
-class BasketSerializer(serializers.ModelSerializer):
+class BasketSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     items = BasketItemSerializer(many=True, read_only=True)
     total_items = serializers.SerializerMethodField()
     subtotal = serializers.SerializerMethodField()
@@ -134,7 +169,7 @@ class BasketSerializer(serializers.ModelSerializer):
 
 
 # --- Favorite ---
-class FavoriteSerializer(serializers.ModelSerializer):
+class FavoriteSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Favorite
         fields = ['id', 'user', 'product', 'created_at']
@@ -142,18 +177,20 @@ class FavoriteSerializer(serializers.ModelSerializer):
 
 
 # --- Banners ---
-class BannerSerializer(serializers.ModelSerializer):
+class BannerSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    cover_variants = ImageVariantsField()
+
     class Meta:
         model = Banner
         fields = [
             'id', 'title', 'description',
-            'cover', 'location', 'is_active',
+            'cover', 'cover_variants', 'location', 'is_active',
             'created_at'
         ]
 
 
 # ========== ORDERS ==========
-class OrderItemSerializer(serializers.ModelSerializer):
+class OrderItemSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     product = ProductSerializer(read_only=True)
     size = serializers.SlugRelatedField(read_only=True, slug_field="title")
     line_total = serializers.SerializerMethodField()
@@ -161,12 +198,13 @@ class OrderItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = OrderItem
         fields = ["id", "product", "size", "quantity", "price", "line_total"]
+        list_serializer_class = RelatedCardListSerializer
 
     def get_line_total(self, obj):
         return obj.quantity * obj.price
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """
     Für Order-Liste und Erstellen (POST).
     - Beim POST werden Items aus dem Warenkorb übernommen (in View).
@@ -180,7 +218,7 @@ class OrderSerializer(serializers.ModelSerializer):
         read_only_fields = ["id", "status", "total_price", "created_at", "items"]
 
 
-class OrderDetailSerializer(serializers.ModelSerializer):
+class OrderDetailSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """
     Detailansicht mit Positionen und fertigen Summen.
     """
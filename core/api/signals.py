@@ -0,0 +1,135 @@
+# api/signals.py
+from django.apps import apps
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+
+from . import cards, images, snapshot
+from .models import Product
+from .stock import invalidate_size_stock, invalidate_sizes, refresh_stock
+from .categories import invalidate_category_counts
+from .suggest import suggest_index
+
+
+def _image_saved_handler(model_label, field_name):
+    def handler(sender, instance, raw=False, **kwargs):
+        if raw:
+            return
+        if images.needs_variants(instance, field_name):
+            images.schedule(model_label, instance.pk, field_name)
+        elif not getattr(instance, field_name) and getattr(instance, images.variants_field(field_name)):
+            # Bild entfernt -> Varianten zurücksetzen
+            sender.objects.filter(pk=instance.pk).update(**{images.variants_field(field_name): {}})
+    return handler
+
+
+def _product_pre_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or instance.pk is None:
+        return
+    if snapshot.touches_snapshot(update_fields):
+        instance._snapshot_before = snapshot.stored_values(instance.pk)
+
+
+def _product_saved(sender, instance, created=False, raw=False, update_fields=None, **kwargs):
+    invalidate_category_counts()
+    invalidate_size_stock(instance.pk)  # z. B. deaktiviert
+    before = instance.__dict__.pop("_snapshot_before", None)
+    if snapshot.product_changed(instance, created, update_fields, before):
+        snapshot.mark_stale()
+    cards.invalidate_cards([instance.pk])
+    if not raw:
+        transaction.on_commit(lambda: suggest_index.update_product(instance))
+
+
+def _product_deleted(sender, instance, **kwargs):
+    invalidate_category_counts()
+    snapshot.mark_stale()
+    cards.invalidate_cards([instance.pk])
+    transaction.on_commit(lambda: suggest_index.update_product(instance, deleted=True))
+
+
+def _product_brands_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear", "pre_clear"):
+        return
+    snapshot.mark_stale()
+    if not reverse:
+        cards.invalidate_cards([instance.pk])
+    elif action == "pre_clear":  # brand.products.clear(): pk_set ist leer
+        cards.invalidate_cards(cards.brand_product_ids(instance.pk))
+    elif pk_set:
+        cards.invalidate_cards(pk_set)
+
+
+def _stock_changed(sender, instance, raw=False, **kwargs):
+    product = Product.objects.filter(pk=instance.product_id)
+    was_in_stock = product.values_list("in_stock", flat=True).first()
+    refresh_stock([instance.product_id])
+    invalidate_size_stock(instance.product_id)
+    cards.invalidate_cards([instance.product_id])  # in_stock steht in der Karte
+    if product.values_list("in_stock", flat=True).first() != was_in_stock:
+        snapshot.mark_stale()  # Mengen stehen nicht im Snapshot, nur der Wechsel von in_stock
+
+
+def _size_changed(sender, instance, raw=False, **kwargs):
+    invalidate_sizes()
+
+
+def _category_saved(sender, instance, raw=False, **kwargs):
+    invalidate_category_counts()
+    snapshot.mark_stale()
+    if not raw:
+        transaction.on_commit(lambda: suggest_index.update_category(instance))
+
+
+def _category_deleted(sender, instance, **kwargs):
+    invalidate_category_counts()
+    snapshot.mark_stale()
+    transaction.on_commit(lambda: suggest_index.update_category(instance, deleted=True))
+
+
+def _brand_saved(sender, instance, raw=False, **kwargs):
+    cards.invalidate_cards(cards.brand_product_ids(instance.pk))
+    if not raw:
+        transaction.on_commit(lambda: suggest_index.update_brand(instance))
+
+
+def _brand_pre_delete(sender, instance, **kwargs):
+    # nach dem Löschen sind die M2M-Zeilen weg -> Produkte vorher merken
+    instance._card_product_ids = cards.brand_product_ids(instance.pk)
+
+
+def _brand_deleted(sender, instance, **kwargs):
+    cards.invalidate_cards(getattr(instance, "_card_product_ids", ()))
+    transaction.on_commit(lambda: suggest_index.update_brand(instance, deleted=True))
+
+
+_handlers = []
+
+
+def connect():
+    """Wird in ApiConfig.ready() aufgerufen."""
+    for model_label, field_name in images.IMAGE_FIELDS:
+        handler = _image_saved_handler(model_label, field_name)
+        _handlers.append(handler)  # starke Referenz halten
+        post_save.connect(handler, sender=apps.get_model(model_label),
+                          dispatch_uid=f"image-variants:{model_label}.{field_name}")
+
+    Product, Brand = apps.get_model("api.Product"), apps.get_model("api.Brand")
+    pre_save.connect(_product_pre_save, sender=Product, dispatch_uid="snapshot:product-pre-save")
+    post_save.connect(_product_saved, sender=Product, dispatch_uid="suggest:product-save")
+    post_delete.connect(_product_deleted, sender=Product, dispatch_uid="suggest:product-delete")
+    post_save.connect(_brand_saved, sender=Brand, dispatch_uid="suggest:brand-save")
+    post_delete.connect(_brand_deleted, sender=Brand, dispatch_uid="suggest:brand-delete")
+    pre_delete.connect(_brand_pre_delete, sender=Brand, dispatch_uid="cards:brand-pre-delete")
+    m2m_changed.connect(_product_brands_changed, sender=Product.brands.through, dispatch_uid="cards:product-brands")
+
+    Size = apps.get_model("api.Size")
+    post_save.connect(_size_changed, sender=Size, dispatch_uid="stock:size-save")
+    post_delete.connect(_size_changed, sender=Size, dispatch_uid="stock:size-delete")
+
+    Storage = apps.get_model("api.Storage")
+    post_save.connect(_stock_changed, sender=Storage, dispatch_uid="snapshot:stock-save")
+    post_delete.connect(_stock_changed, sender=Storage, dispatch_uid="snapshot:stock-delete")
+
+    Category = apps.get_model("api.Category")
+    post_save.connect(_category_saved, sender=Category, dispatch_uid="category:save")
+    post_delete.connect(_category_deleted, sender=Category, dispatch_uid="category:delete")
@@ -0,0 +1,325 @@
+# api/snapshot.py
+"""
+Spaltenweiser Katalog-Snapshot (NumPy, per mmap geteilt).
+
+``build()`` schreibt alle aktiven Produkte als ein strukturiertes Array
+(``products.npy``: id, Preise in Cent, Rabatt, Kategorie, Favoriten,
+Bestand, Anlagedatum) plus Produkt-Brand-Paare (``brands.npy``) und
+``meta.json`` in ein neues Verzeichnis und hängt den Symlink ``current``
+per ``os.replace`` atomar um. Alle Worker öffnen die Dateien mit
+``mmap_mode="r"`` – die Seiten liegen nur einmal im Page-Cache.
+
+Filtern, Sortieren und Top-N laufen vektorisiert. Ist der Snapshot
+veraltet (Generation weicht ab oder er ist älter als
+``CATALOG_SNAPSHOT_MAX_AGE``), liefern die Abfragen ``None`` – der Aufrufer
+nimmt dann den ORM-Weg – und ein Neuaufbau wird im Hintergrund angestoßen
+(ein Worker pro ``CATALOG_SNAPSHOT_REBUILD_INTERVAL`` dank Cache-Lock).
+Favoritenzahlen dürfen bis zu ``MAX_AGE`` alt sein.
+
+Die Generation wird nur erhöht, wenn sich gespeicherte Spalten ändern
+(``SNAPSHOT_FIELDS``, Bestand nur beim Wechsel von ``in_stock``). Sie liegt
+unter ``catalog:gen`` im gemeinsamen Cache; ohne gemeinsamen Cache (LocMem,
+kein ``REDIS_URL``) ist sie die mtime der Datei ``stale`` im Snapshot-
+Verzeichnis – sonst sähe jeder Worker eine andere Generation und baute
+ständig neu.
+"""
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+from django.db.models import Count
+
+from core.cache import is_shared
+
+from .models import Category, Product
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional
+    np = None
+
+logger = logging.getLogger(__name__)
+
+GENERATION_KEY = "catalog:gen"
+REBUILD_LOCK_KEY = "catalog:rebuild-lock"
+STALE_FILE = "stale"
+
+# Product-Felder, die im Snapshot stehen (Marken kommen über m2m_changed)
+SNAPSHOT_FIELDS = ("new_price", "old_price", "category", "is_active", "in_stock", "created_at")
+
+PRODUCT_DTYPE = [
+    ("id", "i8"),
+    ("price", "i8"),  # new_price in Cent
+    ("old_price", "i8"),  # Cent, -1 = keiner
+    ("discount", "i8"),  # old - new in Cent, 0 = kein Rabatt
+    ("category", "i8"),
+    ("favs", "i4"),
+    ("in_stock", "?"),
+    ("created", "i8"),  # Unix-Zeit in Mikrosekunden (gleiche Reihenfolge wie created_at)
+]
+BRAND_DTYPE = [("row", "i4"), ("brand", "i8")]
+
+# API-Sortierung -> (Spalte, absteigend)
+ORDERINGS = {
+    "new_price": ("price", False),
+    "-new_price": ("price", True),
+    "created_at": ("created", False),
+    "-created_at": ("created", True),
+    "in_stock": ("in_stock", False),
+    "-in_stock": ("in_stock", True),
+}
+
+
+def _cents(value):
+    return int((value * 100).to_integral_value())
+
+
+def current_generation():
+    if is_shared():
+        return cache.get(GENERATION_KEY, 0)
+    try:
+        return (snapshot_dir() / STALE_FILE).stat().st_mtime_ns
+    except OSError:
+        return 0
+
+
+def mark_stale():
+    """Von den Signalen aufgerufen, wenn sich katalogrelevante Daten ändern."""
+    if not is_shared():
+        root = snapshot_dir()
+        root.mkdir(parents=True, exist_ok=True)
+        (root / STALE_FILE).touch()
+        return
+    cache.add(GENERATION_KEY, 0, timeout=None)
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, 1, timeout=None)
+
+
+def _attnames():
+    return [Product._meta.get_field(name).attname for name in SNAPSHOT_FIELDS]
+
+
+def stored_values(product_id):
+    """Snapshot-relevante Spalten aus der DB (für den Vergleich vor dem Speichern)."""
+    return Product.objects.filter(pk=product_id).values_list(*_attnames()).first()
+
+
+def touches_snapshot(update_fields):
+    return update_fields is None or bool(set(update_fields) & {*SNAPSHOT_FIELDS, *_attnames()})
+
+
+def product_changed(instance, created, update_fields, before):
+    """True, wenn ein Speichern Spalten geändert hat, die im Snapshot stehen."""
+    if not created and not touches_snapshot(update_fields):
+        return False
+    if created or before is None:
+        return True
+    return tuple(before) != tuple(getattr(instance, name) for name in _attnames())
+
+
+def snapshot_dir():
+    return Path(settings.CATALOG_SNAPSHOT_DIR)
+
+
+# ---------- Aufbau ----------
+def build():
+    """Schreibt einen neuen Snapshot und schaltet ``current`` atomar um. Gibt die Anzahl Produkte zurück."""
+    if np is None:
+        raise RuntimeError("NumPy ist nicht installiert")
+    generation = current_generation()  # vorher lesen: Änderungen während des Aufbaus machen ihn wieder stale
+    rows = list(
+        Product.objects.filter(is_active=True)
+        .annotate(favs=Count("favorited_by"))
+        .order_by("id")
+        .values_list("id", "new_price", "old_price", "category_id", "favs", "in_stock", "created_at")
+    )
+    products = np.empty(len(rows), dtype=PRODUCT_DTYPE)
+    for i, (pk, new, old, category, favs, stocked, created) in enumerate(rows):
+        price, old_price = _cents(new), (_cents(old) if old is not None else -1)
+        products[i] = (pk, price, old_price, max(old_price - price, 0), category, favs, stocked,
+                       round(created.timestamp() * 1_000_000))
+
+    row_of = {pk: i for i, pk in enumerate(products["id"].tolist())}
+    pairs = [(row_of[p], b) for p, b in Product.brands.through.objects.values_list("product_id", "brand_id")
+             if p in row_of]
+    brands = np.array(pairs, dtype=BRAND_DTYPE)
+    meta = {
+        "generation": generation,
+        "built_at": time.time(),
+        "count": len(rows),
+        "categories": dict(Category.objects.values_list("id", "path")),
+    }
+
+    root = snapshot_dir()
+    root.mkdir(parents=True, exist_ok=True)
+    target = root / f"v{int(meta['built_at'] * 1000)}-{os.getpid()}"
+    target.mkdir()
+    np.save(target / "products.npy", products)
+    np.save(target / "brands.npy", brands)
+    (target / "meta.json").write_text(json.dumps(meta))
+
+    link = root / "current"
+    tmp_link = root / f".current-{os.getpid()}"
+    if tmp_link.is_symlink():
+        tmp_link.unlink()
+    tmp_link.symlink_to(target.name)
+    os.replace(tmp_link, link)
+    _cleanup(root, keep=target.name)
+    return len(rows)
+
+
+def _cleanup(root, keep, older_than=300):
+    # Alte Versionen erst nach ein paar Minuten löschen; bereits gemappte Dateien bleiben ohnehin gültig.
+    now = time.time()
+    for path in root.glob("v*"):  # "stale" bleibt
+        if path.name != keep and now - path.stat().st_mtime > older_than:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def schedule_rebuild():
+    if not getattr(settings, "CATALOG_SNAPSHOT_AUTO_REBUILD", True):
+        return
+    if not cache.add(REBUILD_LOCK_KEY, 1, timeout=getattr(settings, "CATALOG_SNAPSHOT_REBUILD_INTERVAL", 30)):
+        return  # anderer Worker baut gerade bzw. hat gerade gebaut
+
+    def run():
+        close_old_connections()
+        try:
+            build()
+        except Exception:
+            logger.exception("Katalog-Snapshot: Neuaufbau fehlgeschlagen")
+        finally:
+            close_old_connections()
+
+    threading.Thread(target=run, name="catalog-snapshot", daemon=True).start()
+
+
+# ---------- Lesen ----------
+class CatalogSnapshot:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = None  # (ziel, products, brands, meta)
+        self._checked_at = 0.0
+
+    def _load(self, force=False):
+        now = time.monotonic()
+        if not force and self._loaded is not None and now - self._checked_at < 1:
+            return self._loaded
+        link = snapshot_dir() / "current"
+        try:
+            target = os.readlink(link)
+        except OSError:
+            return None
+        with self._lock:
+            self._checked_at = now
+            if self._loaded is None or self._loaded[0] != target:
+                path = link.parent / target
+                try:
+                    self._loaded = (
+                        target,
+                        np.load(path / "products.npy", mmap_mode="r"),
+                        np.load(path / "brands.npy", mmap_mode="r"),
+                        json.loads((path / "meta.json").read_text()),
+                    )
+                except (OSError, ValueError):
+                    logger.warning("Katalog-Snapshot %s unlesbar", path, exc_info=True)
+                    return None
+        return self._loaded
+
+    def fresh(self):
+        """Geladener Snapshot oder None (nicht vorhanden / veraltet -> Neuaufbau anstoßen)."""
+        if np is None or not getattr(settings, "CATALOG_SNAPSHOT_ENABLED", True):
+            return None
+        generation = current_generation()
+        loaded = self._load()
+        if not self._usable(loaded, generation):
+            loaded = self._load(force=True)  # evtl. liegt schon ein neuerer Snapshot bereit
+            if not self._usable(loaded, generation):
+                schedule_rebuild()
+                return None
+        return loaded
+
+    @staticmethod
+    def _usable(loaded, generation):
+        return (loaded is not None and loaded[3]["generation"] == generation
+                and time.time() - loaded[3]["built_at"] <= getattr(settings, "CATALOG_SNAPSHOT_MAX_AGE", 3600))
+
+    def query(self, category=None, brand=None, min_price=None, max_price=None, in_stock=None,
+              ordering=None, limit=None):
+        """IDs der passenden Produkte (Reihenfolge wie gewünscht) oder None, wenn nicht nutzbar."""
+        loaded = self.fresh()
+        if loaded is None:
+            return None
+        _target, products, brands, meta = loaded
+        mask = np.ones(len(products), dtype=bool)
+        if category is not None:
+            path = meta["categories"].get(str(category))
+            if path is None:
+                return []
+            subtree = [int(pk) for pk, p in meta["categories"].items() if p.startswith(path)]
+            mask &= np.isin(products["category"], subtree)
+        if brand is not None:
+            rows = np.zeros(len(products), dtype=bool)
+            rows[brands["row"][brands["brand"] == brand]] = True
+            mask &= rows
+        if min_price is not None:
+            mask &= products["price"] >= _cents(min_price)
+        if max_price is not None:
+            mask &= products["price"] <= _cents(max_price)
+        if in_stock is not None:
+            mask &= products["in_stock"] == in_stock
+        idx = np.flatnonzero(mask)
+        if ordering:
+            column, descending = ORDERINGS[ordering]
+            values = products[column][idx].astype("i8")
+            order = np.lexsort((products["id"][idx], -values if descending else values))
+            idx = idx[order]
+        if limit is not None:
+            idx = idx[:limit]
+        return products["id"][idx].tolist()
+
+    def top(self, column, limit, where=None):
+        """
+        Top-N nach ``column`` (absteigend, bei Gleichstand neuere zuerst) per
+        ``argpartition`` – z. B. Bestseller (``favs``) oder Rabatte (``discount``).
+        """
+        loaded = self.fresh()
+        if loaded is None:
+            return None
+        products = loaded[1]
+        idx = np.arange(len(products)) if where is None else np.flatnonzero(where(products))
+        if not len(idx) or limit <= 0:
+            return []
+        values = products[column][idx]
+        if limit < len(idx):
+            part = np.argpartition(-values, limit - 1)[:limit]
+            # Gleichstand an der Grenze: alle Kandidaten mit dem Grenzwert mitnehmen
+            threshold = values[part].min()
+            part = np.flatnonzero(values >= threshold)
+            idx, values = idx[part], values[part]
+        order = np.lexsort((-products["id"][idx], -products["created"][idx], -values))
+        return products["id"][idx[order[:limit]]].tolist()
+
+
+catalog_snapshot = CatalogSnapshot()
+
+
+def parse_price(value):
+    """'12.5' -> Decimal, ungültig -> ValueError."""
+    try:
+        price = Decimal(value)
+    except (InvalidOperation, TypeError):
+        raise ValueError(value)
+    if not price.is_finite():
+        raise ValueError(value)
+    return price
@@ -0,0 +1,79 @@
+# api/stock.py
+"""
+Denormalisierter Bestand: ``Product.total_stock`` / ``Product.in_stock``.
+
+Wird aus ``Storage`` in einem einzigen UPDATE (korrelierte Subqueries)
+neu berechnet – nicht inkrementell, damit parallele Änderungen nicht zu
+Drift führen. Aufgerufen von den Storage-Signalen (auch beim Checkout,
+der ``Storage.save()`` nutzt) und nach Bulk-Importen (``seed``).
+
+Außerdem: Bestand je Größe für viele Produkte (``size_stock``), gecacht
+pro Produkt unter ``sizes:<pk>`` und von denselben Signalen invalidiert.
+Ohne gemeinsamen Cache erreicht das nur den eigenen Worker – die TTLs sind
+dann auf ``LOCAL_CACHE_MAX_TTL`` gekappt (``core.cache.invalidated_ttl``).
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from core.cache import invalidated_ttl
+
+from .models import Product, Size, Storage
+
+SIZES_KEY = "sizes:all"
+
+
+def refresh_stock(product_ids=None):
+    """Bestandsspalten für die angegebenen (bzw. alle) Produkte neu berechnen."""
+    total = (Storage.objects.filter(product=OuterRef("pk")).order_by()
+             .values("product").annotate(total=Sum("quantity")).values("total"))
+    qs = Product.objects.all() if product_ids is None else Product.objects.filter(pk__in=product_ids)
+    return qs.update(
+        total_stock=Coalesce(Subquery(total), 0),
+        in_stock=Exists(Storage.objects.filter(product=OuterRef("pk"), quantity__gt=0)),
+    )
+
+
+def size_stock_key(product_id):
+    return f"sizes:{product_id}"
+
+
+def all_sizes():
+    """[(id, title)] in Anzeige-Reihenfolge, gecacht (ändert sich praktisch nie)."""
+    sizes = cache.get(SIZES_KEY)
+    if sizes is None:
+        sizes = list(Size.objects.order_by("order", "title").values_list("id", "title"))
+        cache.set(SIZES_KEY, sizes, invalidated_ttl(None))
+    return sizes
+
+
+def size_stock(product_ids):
+    """
+    {product_id: {size_id: menge}} für aktive Produkte; unbekannte/inaktive
+    IDs fehlen. Cache-Misses werden mit einem gruppierten Query geladen.
+    """
+    keys = {size_stock_key(pk): pk for pk in product_ids}
+    cached = cache.get_many(keys)
+    result = {keys[key]: stock for key, stock in cached.items()}
+    missing = [pk for key, pk in keys.items() if key not in cached]
+    if missing:
+        loaded = {}
+        rows = (Product.objects.filter(pk__in=missing, is_active=True).order_by()
+                .values_list("pk", "stocks__size_id").annotate(quantity=Sum("stocks__quantity")))
+        for pk, size_id, quantity in rows:
+            stock = loaded.setdefault(pk, {})
+            if size_id is not None:  # Produkt ganz ohne Storage-Zeilen
+                stock[size_id] = quantity
+        cache.set_many({size_stock_key(pk): stock for pk, stock in loaded.items()},
+                       invalidated_ttl(getattr(settings, "SIZE_STOCK_TTL", 3600)))
+        result.update(loaded)
+    return result
+
+
+def invalidate_size_stock(product_id):
+    cache.delete(size_stock_key(product_id))
+
+
+def invalidate_sizes():
+    cache.delete(SIZES_KEY)
@@ -0,0 +1,70 @@
+# api/storage.py
+"""
+Content-addressed Media-Storage.
+
+Dateien werden unter ``<ordner>/<aa>/<bb>/<hash><ext>`` abgelegt, der Hash
+ist der SHA-256 des Inhalts. Identische Uploads landen auf derselben Datei
+(Deduplizierung), und weil sich der Inhalt einer URL nie ändert, darf sie
+mit ``Cache-Control: immutable`` ausgeliefert werden. Ein deduplizierter
+Upload frischt die mtime der vorhandenen Datei auf – ``gc_media`` verschont
+jüngere Dateien als ``--grace-hours``.
+"""
+import hashlib
+import os
+import re
+import uuid
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+HASH_LENGTH = 32  # 128 Bit reichen gegen Kollisionen
+
+_HASHED_NAME_RE = re.compile(r"^[^/]+/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{%d}(\.[A-Za-z0-9]+)?$" % HASH_LENGTH)
+
+
+def is_content_addressed(name):
+    """True, wenn ``name`` ein Hash-Name ist (Inhalt unveränderlich)."""
+    return bool(_HASHED_NAME_RE.match(name.replace("\\", "/")))
+
+
+def content_hash(content):
+    sha = hashlib.sha256()
+    if hasattr(content, "seek"):
+        content.seek(0)
+    for chunk in content.chunks():
+        sha.update(chunk)
+    if hasattr(content, "seek"):
+        content.seek(0)
+    return sha.hexdigest()[:HASH_LENGTH]
+
+
+def hashed_name(name, digest):
+    """``products/2025/08/foo.JPG`` -> ``products/3f/a2/3fa2….jpg``"""
+    name = name.replace("\\", "/")
+    top = name.split("/", 1)[0] if "/" in name else "files"
+    ext = os.path.splitext(name)[1].lower()
+    return f"{top}/{digest[:2]}/{digest[2:4]}/{digest}{ext}"
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage, die nach Inhalts-Hash speichert und dedupliziert."""
+
+    def get_available_name(self, name, max_length=None):
+        # Kein "_abc123"-Suffix: der endgültige Name entsteht erst in _save().
+        return name
+
+    def _save(self, name, content):
+        target = hashed_name(name, content_hash(content))
+        try:
+            # Dedup: mtime auffrischen, sonst löscht gc_media (--grace-hours) die
+            # Datei womöglich, bevor die neue Referenz committet ist
+            os.utime(self.path(target))
+            return target
+        except FileNotFoundError:
+            pass
+        # Erst unter Temp-Namen schreiben, dann atomar umbenennen – zwei
+        # gleichzeitige identische Uploads überschreiben sich harmlos.
+        tmp = super()._save(f"{os.path.dirname(target)}/.tmp-{uuid.uuid4().hex}", content)
+        os.replace(self.path(tmp), self.path(target))
+        return target
@@ -0,0 +1,290 @@
+# api/suggest.py
+"""
+Prefix-Index für die Autovervollständigung (``/api/products/suggest/``).
+
+Eine sortierte Liste ``(schlüssel, art, id)`` – ``bisect`` findet den
+Bereich aller Schlüssel mit dem gesuchten Präfix in O(log n). Jeder Titel
+wird ab jeder Wortgrenze eingetragen ("air max 90", "max 90", "90"), damit
+auch Wörter in der Mitte gefunden werden. Gewichtet wird nach Beliebtheit
+(Favoriten bzw. Anzahl Produkte). Für kurze oder sehr häufige Präfixe
+wird das Top-k-Ergebnis zwischengespeichert.
+
+- Aufbau beim ersten Zugriff, aus dem Snapshot (``build_suggest_index``)
+  oder aus der DB,
+- Product-/Brand-Änderungen werden nach dem Commit per Signal im eigenen
+  Prozess eingearbeitet (``update_product`` / ``update_brand``),
+- andere Prozesse sehen über ``suggest:gen`` im Cache, dass sich etwas
+  geändert hat, und bauen im Hintergrund neu auf,
+- unabhängig davon wird nach ``SUGGEST_MAX_AGE`` neu aufgebaut – ohne
+  gemeinsamen Cache (LocMem) ist das der einzige Weg, Änderungen anderer
+  Worker zu sehen.
+
+Updates bauen neue Listen und tauschen die Referenzen unter Lock aus;
+Abfragen lesen ohne Lock immer einen vollständigen Stand.
+"""
+import bisect
+import heapq
+import logging
+import pickle
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from .models import Brand, Category, Product
+
+logger = logging.getLogger(__name__)
+
+GENERATION_KEY = "suggest:gen"
+
+PRODUCT, BRAND, CATEGORY = "product", "brand", "category"
+
+MAX_WORDS = 8  # Einstiegspunkte pro Titel
+SHORT_PREFIX = 2  # bis zu dieser Länge immer gemerkt
+SCAN_LIMIT = 500  # mehr Treffer im Bereich -> Ergebnis merken
+MEMO_SIZE = 4096
+MEMO_K = 20  # gemerkt werden die Top-MEMO_K, ausgeliefert höchstens so viele
+
+_WORD_RE = re.compile(r"\w+")
+_END = "\U0010ffff"
+
+
+def normalize(text):
+    text = unicodedata.normalize("NFKD", str(text)).casefold()
+    return " ".join(_WORD_RE.findall("".join(c for c in text if not unicodedata.combining(c))))
+
+
+def index_keys(label):
+    words = normalize(label).split()
+    return {" ".join(words[i:]) for i in range(min(len(words), MAX_WORDS))}
+
+
+class SuggestIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()  # erster Aufbau nur einmal pro Prozess
+        self._entries = []  # sortiert: (schlüssel, art, id)
+        self._items = {}  # (art, id) -> [label, gewicht, schlüssel]
+        self._memo = {}
+        self._generation = None
+        self._checked_at = 0.0
+        self._built_at = 0.0
+        self._rebuilding = False
+
+    # ---------- Aufbau ----------
+    @staticmethod
+    def _load_items():
+        items = {}
+        categories, brands = Counter(), Counter()
+        products = (Product.objects.filter(is_active=True)
+                    .annotate(favs=Count("favorited_by"))
+                    .values_list("id", "title", "category_id", "favs"))
+        for pk, title, category_id, favs in products:
+            weight = 1 + favs
+            items[(PRODUCT, pk)] = (title, weight)
+            categories[category_id] += weight
+        through = Product.brands.through
+        product_weights = {pk: w for (kind, pk), (_t, w) in items.items()}
+        for product_id, brand_id in through.objects.values_list("product_id", "brand_id"):
+            brands[brand_id] += product_weights.get(product_id, 0)
+        for pk, title in Brand.objects.values_list("id", "title"):
+            items[(BRAND, pk)] = (title, 1 + brands[pk])
+        # Oberkategorien bekommen das Gewicht ihres ganzen Teilbaums
+        subtree = Counter()
+        paths = dict(Category.objects.values_list("id", "path"))
+        for category_id, weight in categories.items():
+            for ancestor in paths.get(category_id, "").split(".")[:-1]:
+                subtree[int(ancestor)] += weight
+        for pk, title in Category.objects.values_list("id", "title"):
+            items[(CATEGORY, pk)] = (title, 1 + subtree[pk])
+        return items
+
+    def _install(self, items, generation):
+        entries, table = [], {}
+        for owner, (label, weight) in items.items():
+            keys = index_keys(label)
+            table[owner] = [label, weight, keys]
+            entries.extend((key, *owner) for key in keys)
+        entries.sort()
+        with self._lock:
+            self._entries, self._items, self._memo = entries, table, {}
+            self._generation = generation
+            self._checked_at = self._built_at = time.monotonic()
+
+    def build(self):
+        generation = cache.get(GENERATION_KEY, 0)
+        items = self._load_items()
+        self._install(items, generation)
+        return items, generation
+
+    def save_snapshot(self, path=None):
+        items, generation = self.build()
+        path = Path(path or settings.SUGGEST_SNAPSHOT)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_bytes(pickle.dumps({"generation": generation, "items": items}, pickle.HIGHEST_PROTOCOL))
+        tmp.replace(path)
+        return len(items)
+
+    def _load(self):
+        generation = cache.get(GENERATION_KEY, 0)
+        path = Path(getattr(settings, "SUGGEST_SNAPSHOT", "") or "")
+        if path.is_file():
+            try:
+                snapshot = pickle.loads(path.read_bytes())
+            except Exception:
+                logger.warning("Suggest-Snapshot %s unlesbar", path, exc_info=True)
+            else:
+                if snapshot.get("generation") == generation:
+                    self._install(snapshot["items"], generation)
+                    return
+        self.build()
+
+    def _rebuild_in_background(self):
+        def run():
+            from django.db import close_old_connections
+            try:
+                self.build()
+            except Exception:
+                logger.exception("Suggest-Index: Neuaufbau fehlgeschlagen")
+            finally:
+                self._rebuilding = False
+                close_old_connections()
+
+        self._rebuilding = True
+        threading.Thread(target=run, name="suggest-rebuild", daemon=True).start()
+
+    def _sync(self):
+        if self._generation is None:
+            with self._load_lock:
+                if self._generation is None:  # parallele erste Requests laden nicht alle
+                    self._load()
+            return
+        now = time.monotonic()
+        if now - self._checked_at < getattr(settings, "SUGGEST_SYNC_SECONDS", 5) or self._rebuilding:
+            return
+        self._checked_at = now
+        if (cache.get(GENERATION_KEY, 0) != self._generation
+                or now - self._built_at > getattr(settings, "SUGGEST_MAX_AGE", 300)):
+            self._rebuild_in_background()  # bis dahin wird der alte Index benutzt
+
+    # ---------- Abfrage ----------
+    def _top(self, prefix, k):
+        entries = self._entries
+        lo = bisect.bisect_left(entries, (prefix,))
+        hi = bisect.bisect_left(entries, (prefix + _END,), lo)
+        if hi - lo <= SCAN_LIMIT and len(prefix) > SHORT_PREFIX:
+            owners = {(kind, pk) for _key, kind, pk in entries[lo:hi]}
+            return heapq.nlargest(k, owners, key=self._weight)
+        memo = self._memo.get(prefix)
+        if memo is None:
+            owners = {(kind, pk) for _key, kind, pk in entries[lo:hi]}
+            memo = heapq.nlargest(MEMO_K, owners, key=self._weight)
+            if len(self._memo) >= MEMO_SIZE:
+                self._memo.clear()
+            self._memo[prefix] = memo
+        return memo[:k]
+
+    def _weight(self, owner):
+        item = self._items.get(owner)
+        return (item[1], -len(item[0])) if item else (0, 0)
+
+    def suggest(self, query, limit=10):
+        self._sync()
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        # Leerzeichen am Ende ("air ") = Wort fertig getippt
+        if str(query).endswith(" "):
+            prefix += " "
+        result = []
+        for owner in self._top(prefix, min(limit, MEMO_K)):
+            item = self._items.get(owner)
+            if item:
+                result.append({"type": owner[0], "id": owner[1], "label": item[0]})
+        return result
+
+    # ---------- inkrementelle Updates ----------
+    # arbeiten auf Kopien (entries, items), die _apply danach austauscht
+    @staticmethod
+    def _remove(entries, items, owner):
+        item = items.pop(owner, None)
+        if not item:
+            return set()
+        for key in item[2]:
+            i = bisect.bisect_left(entries, (key, *owner))
+            if i < len(entries) and entries[i] == (key, *owner):
+                del entries[i]
+        return item[2]
+
+    @classmethod
+    def _put(cls, entries, items, owner, label, weight):
+        old_keys = cls._remove(entries, items, owner)
+        keys = index_keys(label)
+        items[owner] = [label, weight, keys]
+        for key in keys:
+            bisect.insort(entries, (key, *owner))
+        return old_keys | keys
+
+    def _forget_memo(self, keys):
+        if keys:
+            self._memo = {p: r for p, r in self._memo.items() if not any(k.startswith(p) for k in keys)}
+
+    def _apply(self, change):
+        if self._generation is None:
+            return  # noch nicht geladen -> wird beim ersten Zugriff frisch aufgebaut
+        with self._lock:
+            entries, items = list(self._entries), dict(self._items)
+            keys = change(entries, items)
+            self._entries, self._items = entries, items
+            self._forget_memo(keys)
+        generation = _bump_generation()
+        if generation == self._generation + 1:
+            self._generation = generation  # sonst hat auch ein anderer Prozess geändert -> Neuaufbau
+
+    def update_product(self, product, deleted=False):
+        def change(entries, items):
+            owner = (PRODUCT, product.pk)
+            if deleted or not product.is_active:
+                return self._remove(entries, items, owner)
+            return self._put(entries, items, owner, product.title, items.get(owner, [None, 1])[1])
+        self._apply(change)
+
+    def update_category(self, category, deleted=False):
+        def change(entries, items):
+            owner = (CATEGORY, category.pk)
+            if deleted:
+                return self._remove(entries, items, owner)
+            return self._put(entries, items, owner, category.title, items.get(owner, [None, 1])[1])
+        self._apply(change)
+
+    def update_brand(self, brand, deleted=False):
+        def change(entries, items):
+            owner = (BRAND, brand.pk)
+            if deleted:
+                return self._remove(entries, items, owner)
+            return self._put(entries, items, owner, brand.title, items.get(owner, [None, 1])[1])
+        self._apply(change)
+
+    def reset(self):
+        with self._lock:
+            self._entries, self._items, self._memo = [], {}, {}
+            self._generation = None
+
+
+def _bump_generation():
+    cache.add(GENERATION_KEY, 0, timeout=None)
+    try:
+        return cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, 1, timeout=None)
+        return 1
+
+
+suggest_index = SuggestIndex()
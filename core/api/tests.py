@@ -1,3 +1,912 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock, skipUnless
+from urllib.parse import quote
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.http import Http404
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from user.models import User
+
+from . import cards, images, snapshot, trending
+from .async_views import _in_worker
+from .feeds import stream_feed, write_gzip_feed
+from .media import serve_media
+from .models import Brand, Category, Favorite, Product, ProductActivity, Size, Storage
+from .renderers import FastJSONParser, FastJSONRenderer, MessagePackParser, MessagePackRenderer
+from .snapshot import catalog_snapshot
+from .stock import SIZES_KEY, all_sizes, refresh_stock, size_stock, size_stock_key
+from .storage import ContentAddressedStorage, is_content_addressed
+from .suggest import SuggestIndex, _bump_generation, normalize, suggest_index
+
+try:
+    import msgpack
+except ImportError:  # optional, wie in api/renderers.py
+    msgpack = None
+
+
+class CatalogMixin:
+    """Kleiner Katalog: zwei Größen, eine Marke, drei aktive und ein inaktives Produkt."""
+
+    def setUp(self):
+        cache.clear()
+        self.sizes = [Size.objects.create(title="S", order=0), Size.objects.create(title="M", order=1)]
+        self.brand = Brand.objects.create(title="Nike")
+        self.category = Category.objects.create(title="Shoes", slug="shoes")
+        self.products = []
+        for i in range(3):
+            product = Product.objects.create(title=f"Shoe {i}", category=self.category,
+                                             new_price=Decimal("10.00") + i, old_price=Decimal("50.00"))
+            product.brands.add(self.brand)
+            Storage.objects.create(product=product, size=self.sizes[0], quantity=i)
+            self.products.append(product)
+        self.inactive = Product.objects.create(title="Old", category=self.category,
+                                               new_price=Decimal("1.00"), is_active=False)
+
+
+# ---------- Feed (api/feeds.py) ----------
+@override_settings(FEED_ROOT=tempfile.mkdtemp())
+class FeedTests(CatalogMixin, TestCase):
+    def test_jsonl_streams_active_products_with_stock_per_size(self):
+        response = self.client.get("/api/products/feed/jsonl/")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        rows = [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row["id"] for row in rows], [p.pk for p in self.products])
+        self.assertEqual(rows[2]["stock"], {"S": 2, "M": 0})
+        self.assertEqual(rows[0]["brands"], ["Nike"])
+        self.assertEqual(rows[0]["new_price"], "10.00")
+        self.assertEqual([row["in_stock"] for row in rows], [False, True, True])
+
+    def test_csv_and_xml_have_header_and_footer(self):
+        csv_text = "".join(stream_feed("csv"))
+        self.assertTrue(csv_text.startswith("id,title,category,new_price,old_price,image,brands,in_stock,stock_S,stock_M"))
+        self.assertEqual(len(csv_text.splitlines()), 1 + len(self.products))
+        xml_text = "".join(stream_feed("xml"))
+        self.assertTrue(xml_text.rstrip().endswith("</catalog>"))
+        self.assertEqual(xml_text.count("<product "), len(self.products))
+
+    def test_unknown_format_is_404(self):
+        self.assertEqual(self.client.get("/api/products/feed/pdf/").status_code, 404)
+
+    def test_gzip_feed_matches_stream_and_is_rebuilt_incrementally(self):
+        path = f"{tempfile.mkdtemp()}/catalog.jsonl.gz"
+        write_gzip_feed("jsonl", path, chunk_size=2)
+        with gzip.open(path, "rt", encoding="utf-8") as fh:
+            self.assertEqual(fh.read(), "".join(stream_feed("jsonl")))
+        Product.objects.filter(pk=self.products[0].pk).update(title="Renamed")
+        write_gzip_feed("jsonl", path, chunk_size=2)
+        with gzip.open(path, "rt", encoding="utf-8") as fh:
+            self.assertIn('"title": "Renamed"', fh.read())
+
+    def feed(self, **extra):
+        response = self.client.get("/api/products/feed/jsonl/", **extra)
+        self.addCleanup(response.close)
+        self.assertIn("Accept-Encoding", response["Vary"])
+        return response, b"".join(response.streaming_content)
+
+    def test_pregenerated_file_only_for_gzip_clients_with_same_urls(self):
+        Product.objects.filter(pk=self.products[0].pk).update(image="products/aa/bb/shoe.jpg")
+        with self.settings(FEED_ROOT=tempfile.mkdtemp(), FEED_BASE_URL="https://shop.example/"):
+            call_command("export_feed", "--format", "jsonl", "--gzip", stderr=io.StringIO())
+            response, body = self.feed(HTTP_ACCEPT_ENCODING="br, gzip")
+            self.assertEqual(response["Content-Encoding"], "gzip")
+            for encoding in ("", "gzip;q=0", "identity"):
+                plain, streamed = self.feed(HTTP_ACCEPT_ENCODING=encoding)
+                self.assertNotIn("Content-Encoding", plain)
+                self.assertEqual(gzip.decompress(body), streamed)
+        self.assertEqual(json.loads(streamed.splitlines()[0])["image"], "https://shop.example/media/products/aa/bb/shoe.jpg")
+
+    def test_stream_without_base_url_uses_request_host(self):
+        Product.objects.filter(pk=self.products[0].pk).update(image="products/aa/bb/shoe.jpg")
+        with self.settings(FEED_BASE_URL=""):
+            _response, body = self.feed()
+            with self.assertRaises(CommandError):
+                call_command("export_feed", "--gzip", stderr=io.StringIO())
+        self.assertEqual(json.loads(body.splitlines()[0])["image"], "http://testserver/media/products/aa/bb/shoe.jpg")
+
+
+class MigrationTestCase(TransactionTestCase):
+    """Migriert ``api`` auf ``migrate_from``, legt Daten über die historischen Modelle an, dann weiter."""
+    migrate_from = migrate_to = None
+
+    def setUp(self):
+        self.executor = MigrationExecutor(connection)
+        self.latest = self.executor.loader.graph.leaf_nodes("api")
+        self.apps = self.migrate(self.migrate_from)
+
+    def tearDown(self):
+        self.migrate(self.latest)
+
+    def migrate(self, targets):
+        targets = [("api", targets)] if isinstance(targets, str) else targets
+        self.executor.loader.build_graph()
+        self.executor.migrate(targets)
+        return self.executor.loader.project_state(targets).apps
+
+
+# ---------- Kategoriebaum (api/models.py Category, api/filters.py) ----------
+@override_settings(CATALOG_SNAPSHOT_ENABLED=False)
+class CategoryTreeTests(CatalogMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.sneakers = Category.objects.create(title="Sneakers", slug="sneakers", parent=self.category)
+        self.running = Category.objects.create(title="Running", slug="running", parent=self.sneakers)
+        self.bags = Category.objects.create(title="Bags", slug="bags")
+        self.runner = Product.objects.create(title="Runner", category=self.running, new_price=Decimal("5.00"))
+        self.bag = Product.objects.create(title="Bag", category=self.bags, new_price=Decimal("5.00"))
+
+    def ids(self, category):
+        response = self.client.get(f"/api/products/?category={category.pk}")
+        self.assertEqual(response.status_code, 200)
+        return sorted(row["id"] for row in response.json())
+
+    def test_paths_and_depth(self):
+        self.assertEqual(self.running.path, f"{self.category.pk:06d}.{self.sneakers.pk:06d}.{self.running.pk:06d}.")
+        self.assertEqual(self.running.depth, 2)
+        self.assertEqual(self.running.ancestor_ids, [self.category.pk, self.sneakers.pk])
+
+    def test_filter_includes_subtree(self):
+        self.assertEqual(self.ids(self.category), sorted([*(p.pk for p in self.products), self.runner.pk]))
+        self.assertEqual(self.ids(self.sneakers), [self.runner.pk])
+        self.assertEqual(self.ids(self.bags), [self.bag.pk])
+
+    def test_filter_is_one_range_query_on_path(self):
+        with self.assertNumQueries(1):
+            sql = str(Product.objects.filter(category__path__startswith=self.sneakers.path).query)
+            list(self.sneakers.get_descendants())
+        self.assertIn("LIKE", sql.upper())
+
+    def test_moving_a_subtree_rewrites_descendant_paths(self):
+        self.sneakers.parent = self.bags
+        self.sneakers.save()
+        self.running.refresh_from_db()
+        self.assertEqual(self.running.path, f"{self.bags.pk:06d}.{self.sneakers.pk:06d}.{self.running.pk:06d}.")
+        self.assertEqual(self.ids(self.bags), sorted([self.bag.pk, self.runner.pk]))
+
+    def test_cannot_move_into_own_subtree(self):
+        self.category.parent = self.running
+        with self.assertRaises(ValueError):
+            self.category.save()
+
+    def test_category_list_counts_active_products_per_subtree(self):
+        counts = {row["id"]: row["product_count"] for row in self.client.get("/api/categories/").json()}
+        self.assertEqual(counts[self.category.pk], 4)  # 3 Schuhe + Runner, ohne inaktives Produkt
+        self.assertEqual(counts[self.sneakers.pk], 1)
+        self.assertEqual(counts[self.bags.pk], 1)
+        Product.objects.create(title="Trail", category=self.running, new_price=Decimal("5.00"))
+        counts = {row["id"]: row["product_count"] for row in self.client.get("/api/categories/").json()}
+        self.assertEqual(counts[self.category.pk], 5)  # Signal hat den Cache geleert
+
+
+class CategoryMigrationTests(MigrationTestCase):
+    migrate_from = "0006_image_variants"
+    migrate_to = "0007c_category_tree_swap"
+
+    def test_strings_become_categories_and_back(self):
+        Product = self.apps.get_model("api", "Product")
+        for title, category in (("A", "Shoes"), ("B", "Shoes"), ("C", " Bags "), ("D", "")):
+            Product.objects.create(title=title, category=category, new_price=Decimal("1.00"))
+
+        apps = self.migrate(self.migrate_to)
+        Category, Product = apps.get_model("api", "Category"), apps.get_model("api", "Product")
+        categories = dict(Category.objects.values_list("title", "pk"))
+        self.assertEqual(set(categories), {"Bags", "Shoes", "Sonstiges"})
+        self.assertEqual(dict(Product.objects.values_list("title", "category_id")),
+                         {"A": categories["Shoes"], "B": categories["Shoes"], "C": categories["Bags"],
+                          "D": categories["Sonstiges"]})
+        self.assertEqual(Category.objects.get(title="Shoes").path, f"{categories['Shoes']:06d}.")
+
+        apps = self.migrate(self.migrate_from)
+        Product = apps.get_model("api", "Product")
+        self.assertEqual(dict(Product.objects.values_list("title", "category")),
+                         {"A": "Shoes", "B": "Shoes", "C": "Bags", "D": "Sonstiges"})
+
+
+# ---------- Bestandssummen (api/stock.py) ----------
+@override_settings(CATALOG_SNAPSHOT_ENABLED=False)
+class StockTotalsTests(CatalogMixin, TestCase):
+    def stock(self, product):
+        product.refresh_from_db()
+        return product.total_stock, product.in_stock
+
+    def test_storage_signals_keep_totals_in_sync(self):
+        product = self.products[0]
+        self.assertEqual(self.stock(product), (0, False))
+        row = Storage.objects.create(product=product, size=self.sizes[1], quantity=4)
+        self.assertEqual(self.stock(product), (4, True))
+        row.quantity = 0
+        row.save()
+        self.assertEqual(self.stock(product), (0, False))
+        small = Storage.objects.get(product=product, size=self.sizes[0])
+        small.quantity = 2
+        small.save()
+        row.delete()
+        self.assertEqual(self.stock(product), (2, True))
+
+    def test_checkout_decrement_updates_totals(self):
+        user = User.objects.create_user("buyer@example.com", "pw-123456", username="buyer")
+        auth = {"HTTP_AUTHORIZATION": f"Bearer {RefreshToken.for_user(user).access_token}"}
+        product = self.products[2]  # 2 Stück in S
+        response = self.client.post("/api/basket/", {"product_id": product.pk, "size_id": self.sizes[0].pk,
+                                                     "quantity": 2}, content_type="application/json", **auth)
+        self.assertLess(response.status_code, 300)
+        response = self.client.post("/api/orders/", {}, content_type="application/json", **auth)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.stock(product), (0, False))
+
+    def test_in_stock_filter_and_ordering(self):
+        response = self.client.get("/api/products/?in_stock=true")
+        self.assertEqual(sorted(row["id"] for row in response.json()), [p.pk for p in self.products[1:]])
+        response = self.client.get("/api/products/?ordering=-in_stock")
+        self.assertEqual(response.json()[-1]["id"], self.products[0].pk)
+
+    def test_refresh_stock_repairs_drift(self):
+        Product.objects.filter(pk=self.products[1].pk).update(total_stock=99, in_stock=False)
+        refresh_stock()
+        self.assertEqual(self.stock(self.products[1]), (1, True))
+
+
+@override_settings(CATALOG_SNAPSHOT_ENABLED=False)
+class SizeStockCacheTests(CatalogMixin, TestCase):
+    def test_size_stock_is_cached_and_invalidated_by_stock_changes(self):
+        a, b = self.products[1], self.products[2]
+        self.assertEqual(size_stock([a.pk, b.pk, self.inactive.pk]),
+                         {a.pk: {self.sizes[0].pk: 1}, b.pk: {self.sizes[0].pk: 2}})
+        with self.assertNumQueries(0):
+            size_stock([a.pk, b.pk])
+        Storage.objects.create(product=a, size=self.sizes[1], quantity=5)
+        self.assertIsNone(cache.get(size_stock_key(a.pk)))
+        self.assertIsNotNone(cache.get(size_stock_key(b.pk)))
+        self.assertEqual(size_stock([a.pk])[a.pk], {self.sizes[0].pk: 1, self.sizes[1].pk: 5})
+
+    def test_deactivated_product_drops_out(self):
+        product = self.products[1]
+        size_stock([product.pk])
+        product.is_active = False
+        product.save()
+        self.assertEqual(size_stock([product.pk]), {})
+
+    def test_new_size_shows_up(self):
+        self.assertEqual([title for _pk, title in all_sizes()], ["S", "M"])
+        Size.objects.create(title="XL", order=2)
+        self.assertEqual([title for _pk, title in all_sizes()], ["S", "M", "XL"])
+
+    def test_ttls_are_capped_without_shared_cache(self):
+        with self.settings(SIZE_STOCK_TTL=3600, LOCAL_CACHE_MAX_TTL=30), \
+                mock.patch("api.stock.cache") as mocked:
+            mocked.get.return_value = None
+            mocked.get_many.return_value = {}
+            all_sizes()
+            size_stock([self.products[1].pk])
+        mocked.set.assert_called_once_with(SIZES_KEY, mock.ANY, 30)
+        self.assertEqual(mocked.set_many.call_args.args[1], 30)
+
+
+class StockTotalsMigrationTests(MigrationTestCase):
+    migrate_from = "0007c_category_tree_swap"
+    migrate_to = "0008_product_stock_totals"
+
+    def test_backfill(self):
+        Category, Product = self.apps.get_model("api", "Category"), self.apps.get_model("api", "Product")
+        Size, Storage = self.apps.get_model("api", "Size"), self.apps.get_model("api", "Storage")
+        category = Category.objects.create(title="Shoes", slug="shoes", path="000001.")
+        small, medium = Size.objects.create(title="S"), Size.objects.create(title="M")
+        stocked, empty, missing = (Product.objects.create(title=t, category=category, new_price=Decimal("1.00"))
+                                   for t in ("stocked", "empty", "missing"))
+        Storage.objects.create(product=stocked, size=small, quantity=3)
+        Storage.objects.create(product=stocked, size=medium, quantity=0)
+        Storage.objects.create(product=empty, size=small, quantity=0)
+
+        Product = self.migrate(self.migrate_to).get_model("api", "Product")
+        self.assertEqual({title: (total, flag) for title, total, flag
+                          in Product.objects.values_list("title", "total_stock", "in_stock")},
+                         {"stocked": (3, True), "empty": (0, False), "missing": (0, False)})
+
+
+# ---------- Async-Homepage (api/async_views.py) ----------
+@override_settings(CATALOG_SNAPSHOT_ENABLED=False)
+class AsyncHomeTests(CatalogMixin, TransactionTestCase):
+    # TransactionTestCase: die Blöcke laufen in Pool-Threads mit eigener DB-Verbindung
+
+    def test_index_matches_sync_view(self):
+        sync = self.client.get("/api/home/index/?best=2&disc=2")
+        response = self.client.get("/api/home/async/index/?best=2&disc=2")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), sync.json())
+        self.assertEqual(set(response.json()), {"head_banner", "brands", "bestsellers", "discounts"})
+
+    def test_single_block_and_errors(self):
+        response = self.client.get("/api/home/async/discounts/?limit=2")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 2)
+        self.assertEqual(self.client.get("/api/home/async/nope/").status_code, 404)
+        self.assertEqual(self.client.get("/api/home/async/discounts/?limit=x").status_code, 400)
+        self.assertEqual(self.client.post("/api/home/async/index/").status_code, 405)
+
+    def test_blocks_run_concurrently_in_pool_threads(self):
+        barrier = threading.Barrier(2, timeout=5)  # hängt, wenn die Blöcke nacheinander liefen
+
+        def block():
+            barrier.wait()
+            return threading.current_thread().name
+
+        async def both():
+            return await asyncio.gather(_in_worker(block), _in_worker(block))
+
+        names = asyncio.run(both())
+        self.assertTrue(all(name.startswith("async-db") for name in names))
+        self.assertNotEqual(names[0], names[1])
+
+
+# ---------- Batch (api/async_views.py) ----------
+@override_settings(CATALOG_SNAPSHOT_ENABLED=False, BATCH_MAX_REQUESTS=5)
+class BatchTests(CatalogMixin, TransactionTestCase):
+    # TransactionTestCase: Teil-Requests laufen in Worker-Threads mit eigener DB-Verbindung
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user("fan@example.com", "pw-123456", username="fan")
+        Favorite.objects.create(user=self.user, product=self.products[1])
+
+    def batch(self, *paths, **extra):
+        query = "&".join(f"r={quote(path, safe='/')}" for path in paths)
+        return self.client.get(f"/api/batch/?{query}", **extra)
+
+    def auth(self, user=None):
+        return {"HTTP_AUTHORIZATION": f"Bearer {RefreshToken.for_user(user or self.user).access_token}"}
+
+    def test_items_in_request_order_with_own_status(self):
+        response = self.batch("/api/categories/", "/api/nope/", "/api/products/?in_stock=true")
+        self.assertEqual(response.status_code, 200)
+        items = response.json()
+        self.assertEqual([item["path"] for item in items],
+                         ["/api/categories/", "/api/nope/", "/api/products/?in_stock=true"])
+        self.assertEqual([item["status"] for item in items], [200, 404, 200])
+        self.assertEqual(sorted(row["id"] for row in items[2]["data"]), [p.pk for p in self.products[1:]])
+
+    def test_anonymous_sub_requests_are_not_authenticated(self):
+        items = self.batch("/api/favorites/", "/api/categories/").json()
+        self.assertEqual([item["status"] for item in items], [401, 200])
+
+    def test_authenticates_once_for_all_sub_requests(self):
+        items = self.batch("/api/favorites/", "/api/user/auth/me/", **self.auth()).json()
+        self.assertEqual([item["status"] for item in items], [200, 200])
+        self.assertEqual(items[0]["data"]["product_ids"], [self.products[1].pk])
+        self.assertEqual(items[1]["data"]["email"], "fan@example.com")
+
+    def test_invalid_token_fails_the_whole_batch(self):
+        response = self.batch("/api/categories/", HTTP_AUTHORIZATION="Bearer broken")
+        self.assertEqual(response.status_code, 401)
+
+    def test_rejected_paths(self):
+        items = self.batch("https://evil.example/api/products/", "/admin/", "/api/batch/?r=/api/categories/").json()
+        self.assertEqual([item["status"] for item in items], [400, 400, 400])
+
+    def test_limits(self):
+        self.assertEqual(self.client.get("/api/batch/").status_code, 400)
+        self.assertEqual(self.batch(*["/api/categories/"] * 6).status_code, 400)
+
+
+# ---------- Trending (api/trending.py) ----------
+@override_settings(TRENDING_WINDOW_HOURS=72, TRENDING_HALF_LIFE_HOURS=12,
+                   TRENDING_WEIGHTS={"views": 1.0, "basket_adds": 5.0})
+class TrendingTests(CatalogMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.now = timezone.now()
+        self.hour = trending.current_hour(self.now)
+        self.addCleanup(trending.activity_buffer.take)
+
+    def activity(self):
+        return {pid: (views, adds) for pid, views, adds
+                in ProductActivity.objects.values_list("product_id", "views", "basket_adds")}
+
+    def log(self, product, age, views=0, basket_adds=0):
+        ProductActivity.objects.create(product=product, hour=self.hour - timedelta(hours=age),
+                                       views=views, basket_adds=basket_adds)
+
+    def test_write_counts_adds_up_when_flushed_twice(self):
+        a, b = self.products[0].pk, self.products[1].pk
+        counts = Counter({(a, self.hour, "views"): 2, (a, self.hour, "basket_adds"): 1, (b, self.hour, "views"): 1})
+        self.assertEqual(trending.write_counts(counts), 2)
+        self.assertEqual(trending.write_counts(Counter({(a, self.hour, "views"): 3})), 1)
+        self.assertEqual(self.activity(), {a: (5, 1), b: (1, 0)})
+
+    def test_fallback_without_on_conflict_also_adds_up(self):
+        pk = self.products[0].pk
+        trending._update_or_create([(pk, self.hour, 2, 0)])
+        trending._update_or_create([(pk, self.hour, 1, 1)])
+        self.assertEqual(self.activity(), {pk: (3, 1)})
+
+    def test_write_counts_skips_deleted_products(self):
+        gone = Product.objects.create(title="Gone", category=self.category, new_price=Decimal("1.00"))
+        gone_pk, kept = gone.pk, self.products[0].pk
+        gone.delete()
+        counts = Counter({(gone_pk, self.hour, "views"): 4, (kept, self.hour, "views"): 1})
+        self.assertEqual(trending.write_counts(counts), 1)
+        self.assertEqual(self.activity(), {kept: (1, 0)})
+
+    def test_compute_top_decays_weights_and_filters(self):
+        a, b, c = self.products
+        self.log(a, age=24, views=10)  # zwei Halbwertszeiten -> 2.5
+        self.log(b, age=0, views=4)
+        self.log(c, age=1, basket_adds=1)  # 5 · 0.5^(1/12)
+        self.log(c, age=72, views=1000)  # außerhalb des Fensters
+        self.log(self.inactive, age=0, views=100)
+        self.assertEqual(trending.compute_top(10, now=self.now),
+                         [(c.pk, round(5 * 0.5 ** (1 / 12), 3)), (b.pk, 4.0), (a.pk, 2.5)])
+        self.assertEqual(trending.compute_top(1, now=self.now)[0][0], c.pk)
+
+    def test_cold_cache_serves_last_list_and_recomputes_in_background(self):
+        with mock.patch.object(trending, "_last_top", [(7, 2.0), (8, 1.0)]), \
+                mock.patch.object(trending, "_start") as start:
+            self.assertEqual(trending.trending_ids(1), [7])
+            self.assertEqual(trending.trending_ids(5), [7, 8])
+        start.assert_called_once_with(trending._recompute_in_thread, name="trending-recompute")
+
+    def test_recompute_fills_cache(self):
+        self.log(self.products[1], age=0, views=3)
+        with mock.patch.object(trending, "_last_top", []), mock.patch.object(trending, "_start") as start:
+            trending.recompute()
+            self.assertEqual(trending.trending_ids(5), [self.products[1].pk])
+        start.assert_not_called()
+
+
+# ---------- Produktkarten-Cache (api/cards.py) ----------
+@override_settings(CATALOG_SNAPSHOT_ENABLED=False)
+class CardCacheTests(CatalogMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.product = self.products[1]
+        self.client.get("/api/products/")
+        self.assertIsNotNone(cache.get(cards.card_key(self.product.pk)))
+
+    def card(self):
+        return next(row for row in self.client.get("/api/products/").json() if row["id"] == self.product.pk)
+
+    def test_product_save_invalidates(self):
+        self.product.new_price = Decimal("99.00")
+        self.product.save()
+        self.assertIsNone(cache.get(cards.card_key(self.product.pk)))
+        self.assertEqual(self.card()["new_price"], "99.00")
+
+    def test_stock_change_invalidates(self):
+        row = Storage.objects.get(product=self.product, size=self.sizes[0])
+        row.quantity = 0
+        row.save()
+        self.assertIsNone(cache.get(cards.card_key(self.product.pk)))
+        self.assertFalse(self.card()["in_stock"])
+
+    def test_new_image_variants_invalidate(self):
+        Product.objects.filter(pk=self.product.pk).update(image="products/aa/bb/new.jpg")
+        data = {"source": "products/aa/bb/new.jpg", "width": 1, "height": 1, "variants": {}}
+        with mock.patch.object(images, "build_variants", return_value=data):
+            images.generate_for_instance("api.Product", self.product.pk, "image")
+        self.assertIsNone(cache.get(cards.card_key(self.product.pk)))
+
+    def test_brand_rename_invalidates_its_products(self):
+        self.brand.title = "Adidas"
+        self.brand.save()
+        self.assertEqual(cache.get_many([cards.card_key(p.pk) for p in self.products]), {})
+        self.assertEqual(self.card()["brands"][0]["title"], "Adidas")
+
+    def test_ttl_is_capped_without_shared_cache(self):
+        cache.clear()
+        with self.settings(PRODUCT_CARD_TTL=3600, LOCAL_CACHE_MAX_TTL=30), \
+                mock.patch.object(cards.cache, "set_many") as set_many:
+            cards.get_cards([self.product])
+            with mock.patch("core.cache.is_shared", return_value=True):
+                cards.get_cards([self.product])
+        self.assertEqual([call.args[1] for call in set_many.call_args_list], [30, 3600])
+
+
+# ---------- Content-addressed Storage (api/storage.py, gc_media) ----------
+class ContentAddressedStorageTests(TestCase):
+    def setUp(self):
+        self.enterContext(override_settings(MEDIA_ROOT=tempfile.mkdtemp()))
+
+    def age(self, name, hours):
+        past = time.time() - hours * 3600
+        os.utime(default_storage.path(name), (past, past))
+
+    def test_name_is_content_hash_with_lowercase_extension(self):
+        name = default_storage.save("products/2025/08/Foo.JPG", ContentFile(b"bild"))
+        self.assertTrue(is_content_addressed(name))
+        self.assertRegex(name, r"^products/([0-9a-f]{2})/([0-9a-f]{2})/\1\2[0-9a-f]{28}\.jpg$")
+        self.assertIsInstance(default_storage, ContentAddressedStorage)
+
+    def test_identical_content_is_stored_once(self):
+        first = default_storage.save("products/a.jpg", ContentFile(b"gleich"))
+        second = default_storage.save("products/b.jpg", ContentFile(b"gleich"))
+        other = default_storage.save("products/c.jpg", ContentFile(b"anders"))
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        self.assertEqual(len(os.listdir(os.path.dirname(default_storage.path(first)))), 1)
+
+    def test_dedup_refreshes_mtime(self):
+        name = default_storage.save("products/a.jpg", ContentFile(b"alt"))
+        self.age(name, 48)
+        default_storage.save("products/b.jpg", ContentFile(b"alt"))
+        self.assertGreater(os.stat(default_storage.path(name)).st_mtime, time.time() - 60)
+
+    def test_gc_keeps_referenced_and_recent_blobs(self):
+        category = Category.objects.create(title="Shoes", slug="shoes")
+        product = Product.objects.create(title="Shoe", category=category, new_price=Decimal("1.00"))
+        referenced = default_storage.save("products/a.jpg", ContentFile(b"referenziert"))
+        Product.objects.filter(pk=product.pk).update(image=referenced)  # ohne Varianten-Signal
+        orphan = default_storage.save("products/b.jpg", ContentFile(b"verwaist"))
+        recent = default_storage.save("products/c.jpg", ContentFile(b"frisch"))
+        reused = default_storage.save("products/d.jpg", ContentFile(b"wieder"))
+        for name in (referenced, orphan, reused):
+            self.age(name, 48)
+        default_storage.save("products/e.jpg", ContentFile(b"wieder"))  # Dedup während gc
+
+        call_command("gc_media", "--grace-hours", "24", stdout=io.StringIO())
+        self.assertEqual({name: default_storage.exists(name) for name in (referenced, orphan, recent, reused)},
+                         {referenced: True, orphan: False, recent: True, reused: True})
+
+
+# ---------- Media-Auslieferung (api/media.py) ----------
+class ServeMediaTests(SimpleTestCase):
+    name = "products/ab/cd/abcd" + "0" * 28 + ".jpg"  # Hash-Name -> ETag = Hash
+
+    def setUp(self):
+        outside = tempfile.mkdtemp()
+        self.root = os.path.join(outside, "media")
+        os.makedirs(os.path.join(self.root, "products/ab/cd"))
+        with open(os.path.join(self.root, self.name), "wb") as fh:
+            fh.write(b"0123456789")
+        with open(os.path.join(outside, "secret.txt"), "w") as fh:
+            fh.write("geheim")
+        self.factory = RequestFactory()
+
+    def serve(self, path=None, **headers):
+        response = serve_media(self.factory.get("/media/x", **headers), path or self.name, document_root=self.root)
+        self.addCleanup(response.close)
+        return response
+
+    def body(self, response):
+        return b"".join(response.streaming_content) if response.streaming else response.content
+
+    def test_full_file_with_validators(self):
+        response = self.serve()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body(response), b"0123456789")
+        self.assertEqual(response["ETag"], '"abcd%s"' % ("0" * 28))
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertIn("immutable", response["Cache-Control"])
+
+    def test_path_traversal_is_rejected(self):
+        for path in ("../secret.txt", "products/../../secret.txt", "products/ab"):
+            with self.assertRaises(Http404):
+                self.serve(path)
+
+    def test_single_range(self):
+        response = self.serve(HTTP_RANGE="bytes=2-5")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual((response["Content-Range"], response["Content-Length"]), ("bytes 2-5/10", "4"))
+        self.assertEqual(self.body(response), b"2345")
+        self.assertEqual(self.body(self.serve(HTTP_RANGE="bytes=-3")), b"789")
+        self.assertEqual(self.serve(HTTP_RANGE="bytes=8-100")["Content-Range"], "bytes 8-9/10")
+
+    def test_unsatisfiable_range(self):
+        response = self.serve(HTTP_RANGE="bytes=10-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], "bytes */10")
+
+    def test_if_range(self):
+        etag = self.serve()["ETag"]
+        self.assertEqual(self.serve(HTTP_RANGE="bytes=0-1", HTTP_IF_RANGE=etag).status_code, 206)
+        stale = self.serve(HTTP_RANGE="bytes=0-1", HTTP_IF_RANGE='"veraltet"')
+        self.assertEqual(stale.status_code, 200)
+        self.assertEqual(self.body(stale), b"0123456789")
+
+    def test_if_none_match(self):
+        response = self.serve(HTTP_IF_NONE_MATCH=self.serve()["ETag"])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+    def test_offload_headers(self):
+        with self.settings(MEDIA_OFFLOAD_HEADER="X-Accel-Redirect", MEDIA_OFFLOAD_PREFIX="/protected-media/"):
+            response = self.serve(HTTP_RANGE="bytes=2-5")
+        self.assertEqual((response.status_code, response.content), (200, b""))
+        self.assertEqual(response["X-Accel-Redirect"], f"/protected-media/{self.name}")
+        self.assertEqual(response["Content-Type"], "image/jpeg")
+        with self.settings(MEDIA_OFFLOAD_HEADER="X-Sendfile"):
+            response = self.serve()
+        self.assertEqual(response["X-Sendfile"], os.path.join(self.root, self.name))
+
+
+# ---------- Bild-Varianten (api/images.py) ----------
+@override_settings(IMAGE_VARIANTS={"card": 400, "detail": 1000})
+class ImageVariantTests(TestCase):
+    def setUp(self):
+        self.enterContext(override_settings(MEDIA_ROOT=tempfile.mkdtemp()))
+
+    def upload(self, mode, color, fmt, name):
+        from PIL import Image
+        buf = io.BytesIO()
+        Image.new(mode, (600, 300), color).save(buf, fmt)
+        return default_storage.save(name, ContentFile(buf.getvalue()))
+
+    def open(self, name):
+        from PIL import Image
+        with default_storage.open(name, "rb") as fh:
+            img = Image.open(fh)
+            img.load()
+        return img
+
+    def test_downscales_but_never_upscales(self):
+        data = images.build_variants(self.upload("RGB", "red", "JPEG", "products/foto.jpg"))
+        self.assertEqual((data["width"], data["height"]), (600, 300))
+        sizes = {label: (v["width"], v["height"]) for label, v in data["variants"].items()}
+        self.assertEqual(sizes, {"card": (400, 200), "detail": (600, 300)})
+        self.assertEqual(self.open(data["variants"]["card"]["src"]).size, (400, 200))
+
+    def test_jpeg_and_webp_siblings(self):
+        data = images.build_variants(self.upload("RGB", "red", "JPEG", "products/foto.jpg"))
+        for variant in data["variants"].values():
+            self.assertTrue(variant["src"].endswith(".jpg") and variant["webp"].endswith(".webp"))
+            self.assertTrue(is_content_addressed(variant["src"]) and is_content_addressed(variant["webp"]))
+            self.assertEqual(self.open(variant["webp"]).format, "WEBP")
+
+    def test_alpha_becomes_png(self):
+        data = images.build_variants(self.upload("RGBA", (255, 0, 0, 128), "PNG", "brands/logo.png"))
+        card = data["variants"]["card"]
+        self.assertTrue(card["src"].endswith(".png"))
+        self.assertEqual(self.open(card["src"]).mode, "RGBA")
+
+    def test_rebuild_keeps_previous_variants_for_gc(self):
+        name = self.upload("RGB", "red", "JPEG", "products/foto.jpg")
+        first = images.build_variants(name)
+        with self.settings(IMAGE_VARIANTS={"card": 300}):
+            second = images.build_variants(name)
+        self.assertNotEqual(first["variants"]["card"]["src"], second["variants"]["card"]["src"])
+        self.assertTrue(default_storage.exists(first["variants"]["card"]["src"]))  # evtl. geteilt -> gc_media
+
+
+# ---------- Katalog-Snapshot (api/snapshot.py) ----------
+class CatalogSnapshotTests(CatalogMixin, TestCase):
+    PARAMS = [
+        "", "category={shoes}", "category={running}", "category={bags}", "brand={nike}", "brand={puma}",
+        "min_price=11", "max_price=11.00", "in_stock=true", "in_stock=false",
+        "ordering=new_price", "ordering=-new_price", "ordering=created_at", "ordering=-created_at",
+        "ordering=in_stock", "ordering=-in_stock", "category={shoes}&in_stock=true&ordering=-new_price",
+        "brand={puma}&min_price=5&max_price=11&ordering=created_at",
+    ]
+
+    def setUp(self):
+        super().setUp()
+        self.enterContext(override_settings(CATALOG_SNAPSHOT_DIR=tempfile.mkdtemp(),
+                                            CATALOG_SNAPSHOT_AUTO_REBUILD=True))
+        catalog_snapshot._loaded = None
+        running = Category.objects.create(title="Running", slug="running", parent=self.category)
+        self.bags = Category.objects.create(title="Bags", slug="bags")
+        self.puma = Brand.objects.create(title="Puma")
+        runner = Product.objects.create(title="Runner", category=running, new_price=Decimal("11.00"))
+        bag = Product.objects.create(title="Bag", category=self.bags, new_price=Decimal("5.00"))
+        Storage.objects.create(product=bag, size=self.sizes[1], quantity=3)
+        for product in (runner, self.products[0]):
+            product.brands.add(self.puma)
+        self.ids = {"shoes": self.category.pk, "running": running.pk, "bags": self.bags.pk,
+                    "nike": self.brand.pk, "puma": self.puma.pk}
+
+    def list_ids(self, query):
+        response = self.client.get(f"/api/products/?{query}")
+        self.assertEqual(response.status_code, 200)
+        return [row["id"] for row in response.json()]
+
+    def test_snapshot_matches_orm(self):
+        with self.settings(CATALOG_SNAPSHOT_ENABLED=False):
+            expected = {query: self.list_ids(query.format(**self.ids)) for query in self.PARAMS}
+        snapshot.build()
+        with mock.patch("api.views.ProductListCreateAPIView.get_queryset") as orm:
+            actual = {query: self.list_ids(query.format(**self.ids)) for query in self.PARAMS}
+        orm.assert_not_called()  # alles aus dem Snapshot
+        self.assertEqual(actual, expected)
+
+    def test_product_change_makes_snapshot_stale_until_rebuilt(self):
+        snapshot.build()
+        cheap = self.products[2]
+        cheap.new_price = Decimal("1.00")
+        with mock.patch.object(snapshot.threading, "Thread") as thread:
+            cheap.save()
+            ids = self.list_ids("ordering=new_price")  # ORM-Weg, Neuaufbau angestoßen
+        self.assertEqual(ids[0], cheap.pk)
+        thread.assert_called_once()
+        self.assertIsNone(catalog_snapshot.query(ordering="new_price"))
+        snapshot.build()  # das, was der Thread tut
+        self.assertEqual(catalog_snapshot.query(ordering="new_price")[0], cheap.pk)
+
+    def test_quantity_change_without_in_stock_flip_keeps_snapshot(self):
+        snapshot.build()
+        row = Storage.objects.get(product=self.products[2], size=self.sizes[0])
+        row.quantity = 7
+        row.save()
+        self.assertIsNotNone(catalog_snapshot.query())
+
+
+# ---------- Renderer/Parser (api/renderers.py) ----------
+@override_settings(CATALOG_SNAPSHOT_ENABLED=False)
+class RendererTests(CatalogMixin, TestCase):
+    data = {
+        "price": Decimal("12.50"), "created": datetime(2025, 8, 1, 12, 30, 15, 123456, tzinfo=dt_timezone.utc),
+        "day": date(2025, 8, 1), "id": uuid.UUID(int=1), "title": "Кроссовки \u2028 €", "nested": [{"n": 1}, None],
+        "flag": True,
+    }
+
+    def test_same_bytes_as_drf(self):
+        self.assertEqual(FastJSONRenderer().render(self.data), JSONRenderer().render(self.data))
+
+    def test_huge_integers_fall_back_to_stdlib(self):
+        big = {"n": 2 ** 70}
+        self.assertEqual(FastJSONRenderer().render(big), JSONRenderer().render(big))
+        self.assertEqual(FastJSONParser().parse(io.BytesIO(b'{"n": 1180591620717411303424}')), big)
+
+    def test_parser(self):
+        self.assertEqual(FastJSONParser().parse(io.BytesIO('{"a": [1, "ä"]}'.encode())), {"a": [1, "ä"]})
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(io.BytesIO(b"{kaputt"))
+
+    @skipUnless(msgpack, "msgpack nicht installiert")
+    def test_msgpack_round_trip(self):
+        packed = MessagePackRenderer().render(self.data)
+        self.assertEqual(MessagePackParser().parse(io.BytesIO(packed)),
+                         json.loads(JSONRenderer().render(self.data)))
+        with self.assertRaises(ParseError):
+            MessagePackParser().parse(io.BytesIO(b"\xc1"))
+
+    @skipUnless(msgpack, "msgpack nicht installiert")
+    def test_content_negotiation(self):
+        as_json = self.client.get("/api/products/")
+        self.assertEqual(as_json["Content-Type"], "application/json")
+        for response in (self.client.get("/api/products/?format=msgpack"),
+                         self.client.get("/api/products/", HTTP_ACCEPT="application/msgpack")):
+            self.assertEqual(response["Content-Type"], "application/msgpack")
+            self.assertEqual(msgpack.unpackb(response.content, raw=False), as_json.json())
+
+    @skipUnless(msgpack, "msgpack nicht installiert")
+    def test_msgpack_request_body(self):
+        response = self.client.post("/api/user/auth/login/", msgpack.packb({"email": "x@example.com", "password": "x"}),
+                                    content_type="application/msgpack")
+        self.assertEqual(response.status_code, 401)  # geparst, nur falsche Zugangsdaten
+
+
+# ---------- Autovervollständigung (api/suggest.py) ----------
+@override_settings(SUGGEST_SNAPSHOT="", SUGGEST_SYNC_SECONDS=0, SUGGEST_MAX_AGE=300)
+class SuggestTests(CatalogMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        suggest_index.reset()
+        self.addCleanup(suggest_index.reset)
+        self.air = Product.objects.create(title="Air Max 90", category=self.category, new_price=Decimal("5.00"))
+        self.user = User.objects.create_user("fan@example.com", "pw-123456", username="fan")
+        Favorite.objects.create(user=self.user, product=self.products[2])
+
+    def labels(self, query, limit=10):
+        return [row["label"] for row in suggest_index.suggest(query, limit)]
+
+    def test_prefix_word_boundaries_and_normalization(self):
+        self.assertEqual(normalize("  Café-Crème 90 "), "cafe creme 90")
+        self.assertIn("Air Max 90", self.labels("air"))
+        self.assertIn("Air Max 90", self.labels("MAX 9"))
+        self.assertEqual(self.labels("air "), ["Air Max 90"])  # Wort fertig getippt
+        self.assertEqual(self.labels("xyz"), [])
+        self.assertNotIn("Old", self.labels("old"))  # inaktiv
+
+    def test_weight_orders_results(self):
+        self.assertEqual(self.labels("shoe", limit=2), ["Shoes", "Shoe 2"])  # Kategorie, dann Favorit
+        types = {row["type"] for row in suggest_index.suggest("ni")}
+        self.assertEqual(types, {"brand"})
+
+    def test_endpoint(self):
+        response = self.client.get("/api/products/suggest/?q=air&limit=1")
+        self.assertEqual(response.json(), [{"type": "product", "id": self.air.pk, "label": "Air Max 90"}])
+        self.assertEqual(self.client.get("/api/products/suggest/?q=air&limit=x").status_code, 400)
+
+    def test_changes_are_applied_after_commit(self):
+        self.labels("ai")  # laden + kurzes Präfix merken
+        with self.captureOnCommitCallbacks(execute=True):
+            self.air.title = "Jordan 1"
+            self.air.save()
+            Product.objects.create(title="Aim High", category=self.category, new_price=Decimal("5.00"))
+        self.assertEqual(self.labels("ai"), ["Aim High"])
+        self.assertEqual(self.labels("jord"), ["Jordan 1"])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.air.is_active = False
+            self.air.save()
+        self.assertEqual(self.labels("jord"), [])
+
+    def test_foreign_generation_triggers_background_rebuild(self):
+        index = SuggestIndex()
+        index.suggest("air")
+        _bump_generation()  # Änderung in einem anderen Prozess
+        with mock.patch.object(index, "_rebuild_in_background") as rebuild:
+            self.assertIn("Air Max 90", self.labels_of(index, "air"))  # alter Stand bis zum Neuaufbau
+        rebuild.assert_called_once()
+
+    def test_max_age_triggers_rebuild_without_generation_change(self):
+        index = SuggestIndex()
+        index.suggest("air")
+        index._built_at -= 301
+        with mock.patch.object(index, "_rebuild_in_background") as rebuild:
+            index.suggest("air")
+        rebuild.assert_called_once()
+
+    def test_snapshot_with_current_generation_is_loaded_without_queries(self):
+        path = Path(tempfile.mkdtemp()) / "suggest.pickle"
+        self.assertEqual(SuggestIndex().save_snapshot(path), 6)  # 4 aktive Produkte, Marke, Kategorie
+        with self.settings(SUGGEST_SNAPSHOT=path), self.assertNumQueries(0):
+            self.assertEqual(self.labels_of(SuggestIndex(), "air"), ["Air Max 90"])
+        _bump_generation()
+        with self.settings(SUGGEST_SNAPSHOT=path), CaptureQueriesContext(connection) as queries:
+            SuggestIndex().suggest("air")
+        self.assertTrue(queries.captured_queries)  # veralteter Snapshot -> Neuaufbau aus der DB
+
+    @staticmethod
+    def labels_of(index, query):
+        return [row["label"] for row in index.suggest(query)]
+
+
+# ---------- Mehrere Produktkarten (ProductBatchAPIView) ----------
+@override_settings(PRODUCT_BATCH_MAX_IDS=5)
+class ProductBatchTests(CatalogMixin, TestCase):
+    def get(self, ids, **extra):
+        return self.client.get(f"/api/products/batch/?ids={ids}", **extra)
+
+    def ids_of(self, response):
+        self.assertEqual(response.status_code, 200)
+        return [card["id"] for card in response.json()]
+
+    def test_order_kept_missing_inactive_and_duplicates_skipped(self):
+        first, second, third = (p.pk for p in self.products)
+        response = self.get(f"{third},999999,{first},{self.inactive.pk},{third},{second}")
+        self.assertEqual(self.ids_of(response), [third, first, second])
+
+    def test_invalid_or_too_many_ids(self):
+        self.assertEqual(self.get("1,x").status_code, 400)
+        self.assertEqual(self.get("1,2,3,4,5,6").status_code, 400)
+        self.assertEqual(self.ids_of(self.get("")), [])
+
+    def test_query_count_does_not_grow_with_ids(self):
+        def count(ids):
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                self.get(ids)
+            return len(queries.captured_queries)
+
+        one = count(str(self.products[0].pk))
+        self.assertEqual(count(",".join(str(p.pk) for p in self.products)), one)
+
+    def test_same_cards_and_favorites_as_list(self):
+        user = User.objects.create_user("fav@example.com", "pw-123456", username="fav")
+        Favorite.objects.create(user=user, product=self.products[1])
+        auth = {"HTTP_AUTHORIZATION": f"Bearer {RefreshToken.for_user(user).access_token}"}
+        cards_by_id = {card["id"]: card for card in self.get(
+            ",".join(str(p.pk) for p in self.products), **auth).json()}
+        self.assertEqual([cards_by_id[p.pk]["is_favorite"] for p in self.products], [False, True, False])
+        listed = {card["id"]: card for card in self.client.get("/api/products/", **auth).json()}
+        self.assertEqual(cards_by_id[self.products[1].pk], listed[self.products[1].pk])
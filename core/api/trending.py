@@ -0,0 +1,252 @@
+# api/trending.py
+"""
+Write-Behind-Zähler für Produktaufrufe und Warenkorb-Adds plus Trending-Ranking.
+
+``record_view``/``record_basket_add`` zählen nur im Prozessspeicher (Counter
+unter Lock, kein DB-Zugriff im Request). Ein Timer-Thread pro Prozess tauscht
+alle ``TRENDING_FLUSH_SECONDS`` den Puffer aus, bei ``TRENDING_BUFFER_MAX``
+Einträgen tut das schon der aufrufende Request; geschrieben wird immer im
+Hintergrund in ``ProductActivity`` (eine Zeile pro Produkt und Stunde) – als
+ein addierendes ``INSERT ... ON CONFLICT DO UPDATE`` pro 500 Zeilen. Beim
+Beenden des Prozesses wird der Rest geschrieben (nur solange
+``TRENDING_ENABLED`` gilt – unter ``manage.py test`` ist es aus, sonst träfe
+der Flush die schon abgebaute Test-DB); bei einem harten Absturz gehen
+höchstens die Zählungen eines Intervalls verloren.
+
+Nach einem Flush wird im selben Hintergrund-Thread das Ranking neu berechnet
+und werden alte Stundenzeilen gelöscht (über alle Worker höchstens einmal pro
+Intervall, Cache-Lock):
+
+    score = Σ (views · w_views + basket_adds · w_adds) · 0.5 ^ (Alter in h / Halbwertszeit)
+
+über die Stunden in ``TRENDING_WINDOW_HOURS``. Das ist eine gruppierte Query,
+das Gewicht pro Stunde steht als ``CASE`` im SQL. Die Top ``TRENDING_SIZE``
+liegen unter ``trending:top`` im Cache; inaktive Produkte fallen beim nächsten
+Neuberechnen heraus. Fehlt der Eintrag, bekommt der Request die zuletzt in
+diesem Prozess gesehene Liste (bzw. eine leere) und das Neuberechnen läuft im
+Hintergrund – nie im Request.
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Case, ExpressionWrapper, F, FloatField, Sum, Value, When
+from django.utils import timezone
+
+from .models import Product, ProductActivity
+
+logger = logging.getLogger(__name__)
+
+TOP_KEY = "trending:top"
+RECOMPUTE_LOCK_KEY = "trending:recompute-lock"
+KINDS = ("views", "basket_adds")
+DEFAULT_WEIGHTS = {"views": 1.0, "basket_adds": 5.0}
+UPSERT_BATCH = 500
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def current_hour(now=None):
+    return (now or timezone.now()).replace(minute=0, second=0, microsecond=0)
+
+
+# ---------- Zählen ----------
+class ActivityBuffer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = Counter()  # (product_id, stunde, art) -> n
+        self._timer_pid = None
+
+    def add(self, product_id, kind):
+        if not _setting("TRENDING_ENABLED", True):
+            return
+        self._ensure_timer()
+        with self._lock:
+            self._counts[(product_id, current_hour(), kind)] += 1
+            if len(self._counts) < _setting("TRENDING_BUFFER_MAX", 5000):
+                return
+            counts = self._take_locked()
+        _start(_flush_in_thread, counts, name="trending-flush")
+
+    def take(self):
+        with self._lock:
+            return self._take_locked()
+
+    def _take_locked(self):
+        counts, self._counts = self._counts, Counter()
+        return counts
+
+    def _ensure_timer(self):
+        if self._timer_pid == os.getpid():
+            return
+        with self._lock:
+            if self._timer_pid != os.getpid():  # auch nach einem Fork: Threads werden nicht vererbt
+                self._timer_pid = os.getpid()
+                _start(self._run_timer, name="trending-timer")
+
+    def _run_timer(self):
+        while True:
+            time.sleep(_setting("TRENDING_FLUSH_SECONDS", 30))
+            counts = self.take()
+            if counts:
+                _flush_in_thread(counts)
+
+
+def _start(target, *args, name):
+    threading.Thread(target=target, args=args, name=name, daemon=True).start()
+
+
+activity_buffer = ActivityBuffer()
+
+
+def record_view(product_id):
+    activity_buffer.add(product_id, "views")
+
+
+def record_basket_add(product_id):
+    activity_buffer.add(product_id, "basket_adds")
+
+
+# ---------- Schreiben ----------
+def flush(counts=None):
+    """Puffer (bzw. ``counts``) schreiben und das Ranking neu berechnen. Gibt die Anzahl Zeilen zurück."""
+    if counts is None:
+        counts = activity_buffer.take()
+    written = write_counts(counts) if counts else 0
+    if written and cache.add(RECOMPUTE_LOCK_KEY, 1, timeout=_setting("TRENDING_FLUSH_SECONDS", 30)):
+        recompute()
+        prune()
+    return written
+
+
+def _flush_in_thread(counts):
+    close_old_connections()
+    try:
+        flush(counts)
+    except Exception:
+        logger.exception("Trending: Flush fehlgeschlagen (%d Einträge verworfen)", len(counts))
+    finally:
+        close_old_connections()
+
+
+def _recompute_in_thread():
+    close_old_connections()
+    try:
+        recompute()
+    except Exception:
+        logger.exception("Trending: Neuberechnung fehlgeschlagen")
+    finally:
+        close_old_connections()
+
+
+def write_counts(counts):
+    rows = {}
+    for (product_id, hour, kind), n in counts.items():
+        rows.setdefault((product_id, hour), Counter())[kind] += n
+    # Zwischendurch gelöschte Produkte würden am Fremdschlüssel scheitern
+    existing = set(Product.objects.filter(pk__in={pid for pid, _hour in rows}).values_list("pk", flat=True))
+    rows = [(pid, hour, c["views"], c["basket_adds"]) for (pid, hour), c in rows.items() if pid in existing]
+    if connection.vendor in ("postgresql", "sqlite"):
+        _upsert(rows)
+    else:
+        _update_or_create(rows)
+    return len(rows)
+
+
+def _upsert(rows):
+    qn = connection.ops.quote_name
+    table = qn(ProductActivity._meta.db_table)
+    views, adds = qn("views"), qn("basket_adds")
+    adapt = connection.ops.adapt_datetimefield_value
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), UPSERT_BATCH):
+            chunk = rows[start:start + UPSERT_BATCH]
+            cursor.execute(
+                f"INSERT INTO {table} ({qn('product_id')}, {qn('hour')}, {views}, {adds}) VALUES "
+                + ", ".join(["(%s, %s, %s, %s)"] * len(chunk))
+                + f" ON CONFLICT ({qn('product_id')}, {qn('hour')}) DO UPDATE SET "
+                  f"{views} = {table}.{views} + EXCLUDED.{views}, {adds} = {table}.{adds} + EXCLUDED.{adds}",
+                [value for pid, hour, v, a in chunk for value in (pid, adapt(hour), v, a)],
+            )
+
+
+def _update_or_create(rows):
+    # Backends ohne ON CONFLICT: zeilenweise (langsamer, aber ebenfalls addierend)
+    for pid, hour, v, a in rows:
+        with transaction.atomic():
+            updated = ProductActivity.objects.filter(product_id=pid, hour=hour).update(
+                views=F("views") + v, basket_adds=F("basket_adds") + a)
+            if not updated:
+                ProductActivity.objects.create(product_id=pid, hour=hour, views=v, basket_adds=a)
+
+
+@atexit.register
+def _flush_on_exit():
+    counts = activity_buffer.take()
+    if counts and _setting("TRENDING_ENABLED", True):
+        try:
+            write_counts(counts)
+        except Exception:
+            logger.exception("Trending: Flush beim Beenden fehlgeschlagen")
+
+
+# ---------- Ranking ----------
+def compute_top(limit, now=None):
+    """[(product_id, score), ...] absteigend; nur aktive Produkte mit Aktivität im Fenster."""
+    newest = current_hour(now)
+    window = _setting("TRENDING_WINDOW_HOURS", 72)
+    half_life = _setting("TRENDING_HALF_LIFE_HOURS", 12)
+    weights = {**DEFAULT_WEIGHTS, **_setting("TRENDING_WEIGHTS", {})}
+    decay = Case(
+        *[When(hour=newest - timedelta(hours=age), then=Value(0.5 ** (age / half_life)))
+          for age in range(window)],
+        default=Value(0.0), output_field=FloatField(),
+    )
+    activity = ExpressionWrapper(
+        F("views") * Value(float(weights["views"])) + F("basket_adds") * Value(float(weights["basket_adds"])),
+        output_field=FloatField(),
+    )
+    rows = (ProductActivity.objects
+            .filter(hour__gt=newest - timedelta(hours=window), product__is_active=True)
+            .values("product_id")
+            .annotate(score=Sum(decay * activity))
+            .order_by("-score", "-product_id")[:limit])
+    return [(row["product_id"], round(row["score"], 3)) for row in rows]
+
+
+_last_top = []  # zuletzt gesehenes Ranking dieses Prozesses (Ersatz bei kaltem Cache)
+
+
+def recompute():
+    global _last_top
+    top = compute_top(_setting("TRENDING_SIZE", 100))
+    cache.set(TOP_KEY, top, timeout=_setting("TRENDING_TTL", 15 * 60))
+    _last_top = top
+    return top
+
+
+def prune():
+    """Stundenzeilen außerhalb von ``TRENDING_RETENTION_DAYS`` löschen."""
+    retention = _setting("TRENDING_RETENTION_DAYS", 30)
+    return ProductActivity.objects.filter(hour__lt=timezone.now() - timedelta(days=retention)).delete()[0]
+
+
+def trending_ids(limit):
+    global _last_top
+    top = cache.get(TOP_KEY)
+    if top is None:  # kalter Cache / keine Flushes mehr -> im Hintergrund, solange alte Liste
+        if cache.add(RECOMPUTE_LOCK_KEY, 1, timeout=_setting("TRENDING_FLUSH_SECONDS", 30)):
+            _start(_recompute_in_thread, name="trending-recompute")
+        top = _last_top
+    else:
+        _last_top = top
+    return [pid for pid, _score in top[:limit]]
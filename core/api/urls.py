@@ -1,7 +1,11 @@
 from django.urls import path
 from .views import (
     # Products
-    ProductListCreateAPIView, ProductDetailAPIView,
+    ProductListCreateAPIView, ProductDetailAPIView, ProductFeedAPIView, ProductSuggestAPIView,
+    ProductSizeMatrixAPIView, ProductBatchAPIView,
+
+    # Categories
+    CategoryListAPIView,
 
     # Favorites
     FavoriteListAPIView, FavoriteToggleAPIView,
@@ -14,16 +18,24 @@ from .views import (
 
     # Home blocks
     HomeHeadBannerAPIView, HomeMiddleBannersAPIView, HomeCatalogBannersAPIView,
-    PopularBrandsAPIView, BestsellerProductsAPIView, DiscountedProductsAPIView,
+    PopularBrandsAPIView, BestsellerProductsAPIView, DiscountedProductsAPIView, TrendingProductsAPIView,
 
     # Home index (kompakt)
     HomeIndexAPIView,
 )
+from .async_views import home_index_async, home_block_async, batch_async
 
 urlpatterns = [
     # --- Products ---
     path('products/', ProductListCreateAPIView.as_view(), name='product-list'),
+    path('products/batch/', ProductBatchAPIView.as_view(), name='product-batch'),
+    path('products/sizes/', ProductSizeMatrixAPIView.as_view(), name='product-sizes'),
+    path('products/suggest/', ProductSuggestAPIView.as_view(), name='product-suggest'),
     path('products/<int:pk>/', ProductDetailAPIView.as_view(), name='product-detail'),
+    path('products/feed/<str:fmt>/', ProductFeedAPIView.as_view(), name='product-feed'),
+
+    # --- Categories ---
+    path('categories/', CategoryListAPIView.as_view(), name='category-list'),
 
     # --- Favorites ---
     path('favorites/', FavoriteListAPIView.as_view(), name='favorite-list'),
@@ -44,7 +56,15 @@ urlpatterns = [
     path('home/popular-brands/', PopularBrandsAPIView.as_view(), name='home-popular-brands'),
     path('home/bestsellers/', BestsellerProductsAPIView.as_view(), name='home-bestsellers'),
     path('home/discounts/', DiscountedProductsAPIView.as_view(), name='home-discounts'),
+    path('home/trending/', TrendingProductsAPIView.as_view(), name='home-trending'),
 
     # --- Home-Index ---
     path('home/index/', HomeIndexAPIView.as_view(), name='home-index'),
+
+    # --- Async (ASGI): Blöcke parallel ---
+    path('home/async/index/', home_index_async, name='home-index-async'),
+    path('home/async/<str:block>/', home_block_async, name='home-block-async'),
+
+    # --- Batch: mehrere GET-Endpunkte in einem Request ---
+    path('batch/', batch_async, name='batch'),
 ]
\ No newline at end of file
@@ -1,5 +1,10 @@
-from django.db.models import Count, F
+from pathlib import Path
+
+from django.conf import settings
+from django.http import FileResponse, StreamingHttpResponse
+from django.db.models import prefetch_related_objects
 from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_vary_headers
 from rest_framework import generics, status
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated, AllowAny
@@ -7,18 +12,27 @@ from rest_framework.response import Response
 from rest_framework.exceptions import ValidationError
 from django_filters.rest_framework import DjangoFilterBackend
 
+from core import metrics
+
 from .models import (
-    Product, Basket, BasketItem, Favorite, Banner, Brand,
-    ProductImage, Storage, Size, Order
+    Product, Basket, BasketItem, Favorite, Storage, Size, Category
 )
 from .serializers import (
     ProductSerializer, ProductListSerializer, ProductDetailSerializer,
     BasketSerializer, FavoriteSerializer,
-    BannerSerializer, BrandSerializer,
+    BannerSerializer, BrandSerializer, CategorySerializer,
     OrderSerializer, OrderDetailSerializer
 )
-from .filters import ProductFilter
+from .filters import ProductFilter, StableOrderingFilter
 from .choices import BannerLocation
+from .feeds import FEED_FORMATS, accepts_gzip, stream_feed
+from .suggest import suggest_index
+from .categories import category_counts
+from .stock import all_sizes, size_stock
+from .cards import product_stubs
+from .snapshot import ORDERINGS as SNAPSHOT_ORDERINGS, catalog_snapshot, parse_price
+from .trending import record_basket_add, record_view
+from .home import banners_qs, head_banner_qs, popular_brands_qs, bestsellers_qs, discounts_qs, trending_qs
 
 
 # ---------- HOMEPAGE INDEX ----------
@@ -30,24 +44,10 @@ class HomeIndexAPIView(APIView):
         bs_lim = int(request.query_params.get('best', 12))
         d_lim = int(request.query_params.get('disc', 12))
 
-        head_banner = Banner.objects.filter(
-            is_active=True, location=BannerLocation.HEAD
-        ).order_by('-id')[:1]
-
-        brands = (Brand.objects
-                  .annotate(product_count=Count('products'))
-                  .order_by('-product_count', 'title')[:b_lim])
-
-        bestsellers = (Product.objects.filter(is_active=True)
-                       .annotate(fav_count=Count('favorited_by'))
-                       .order_by('-fav_count', '-created_at')[:bs_lim])
-
-        discounts = (Product.objects.filter(
-                        is_active=True,
-                        old_price__isnull=False,
-                        new_price__lt=F('old_price'))
-                     .annotate(discount_amount=F('old_price') - F('new_price'))
-                     .order_by('-discount_amount', '-created_at')[:d_lim])
+        head_banner = head_banner_qs()
+        brands = popular_brands_qs(b_lim)
+        bestsellers = bestsellers_qs(bs_lim)
+        discounts = discounts_qs(d_lim)
 
         return Response({
             "head_banner": BannerSerializer(head_banner, many=True, context={'request': request}).data,
@@ -64,12 +64,45 @@ class ProductListCreateAPIView(generics.ListCreateAPIView):
     GET: gefilterte Liste
     POST: neues Produkt anlegen
     """
-    queryset = Product.objects.filter(is_active=True).prefetch_related("brands", "images", "stocks")
+    # Brands werden nur für nicht gecachte Karten nachgeladen (api/cards.py),
+    # Verfügbarkeit steht in Product.in_stock -> kein stocks-Prefetch
+    queryset = Product.objects.filter(is_active=True).order_by("id")
     serializer_class = ProductListSerializer
-    filter_backends = [DjangoFilterBackend]
+    filter_backends = [DjangoFilterBackend, StableOrderingFilter]
     filterset_class = ProductFilter
+    ordering_fields = ["new_price", "created_at", "in_stock"]
     permission_classes = [AllowAny]
 
+    # Parameter, die der Katalog-Snapshot selbst beantworten kann
+    SNAPSHOT_PARAMS = {"category", "brand", "min_price", "max_price", "in_stock", "ordering", "format"}
+    BOOLEANS = {"true": True, "True": True, "false": False, "False": False}  # wie NullBooleanSelect
+
+    def list(self, request, *args, **kwargs):
+        ids = self.snapshot_ids(request.query_params)
+        if ids is None:
+            return super().list(request, *args, **kwargs)
+        # IDs aus dem mmap-Snapshot, Karten aus dem Cache -> im Normalfall ohne Produkt-Query
+        return Response(self.get_serializer(product_stubs(ids), many=True).data)
+
+    def snapshot_ids(self, params):
+        """Gefilterte/sortierte IDs aus dem Snapshot oder None (ORM-Weg, auch für Validierungsfehler)."""
+        if not set(params) <= self.SNAPSHOT_PARAMS:
+            return None
+        try:
+            options = {
+                "category": int(params["category"]) if params.get("category") else None,
+                "brand": int(params["brand"]) if params.get("brand") else None,
+                "min_price": parse_price(params["min_price"]) if params.get("min_price") else None,
+                "max_price": parse_price(params["max_price"]) if params.get("max_price") else None,
+                "in_stock": self.BOOLEANS[params["in_stock"]] if params.get("in_stock") else None,
+            }
+        except (KeyError, ValueError):
+            return None
+        ordering = params.get("ordering") or None
+        if ordering is not None and ordering not in SNAPSHOT_ORDERINGS:
+            return None
+        return catalog_snapshot.query(ordering=ordering, **options)
+
 
 class ProductDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
     """
@@ -79,6 +112,125 @@ class ProductDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = ProductDetailSerializer
     permission_classes = [AllowAny]
 
+    def retrieve(self, request, *args, **kwargs):
+        response = super().retrieve(request, *args, **kwargs)
+        record_view(int(kwargs['pk']))  # nur im Speicher, s. api/trending.py
+        return response
+
+
+def parse_ids(request, limit):
+    """``?ids=3,1,2`` -> [3, 1, 2] (Reihenfolge bleibt, Duplikate raus), sonst 400."""
+    raw = [part for part in request.query_params.get('ids', '').split(',') if part.strip()]
+    try:
+        ids = list(dict.fromkeys(int(part) for part in raw))
+    except ValueError:
+        raise ValidationError({'ids': 'comma-separated integers expected'})
+    if len(ids) > limit:
+        raise ValidationError({'ids': f'at most {limit} ids'})
+    return ids
+
+
+class ProductBatchAPIView(APIView):
+    """
+    Mehrere Produktkarten auf einmal ("zuletzt angesehen", geteilte Wunschlisten):
+    ``?ids=5,2,9`` (max. ``PRODUCT_BATCH_MAX_IDS``), Antwort in der angefragten
+    Reihenfolge. Fehlende oder inaktive IDs werden übersprungen.
+
+    Gleiche Karten wie in der Liste (Karten-Cache, ``is_favorite`` mit einer
+    Query) – die Anzahl Queries hängt nicht von der Anzahl IDs ab.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        ids = parse_ids(request, getattr(settings, 'PRODUCT_BATCH_MAX_IDS', 100))
+        data = ProductListSerializer(product_stubs(ids), many=True, context={'request': request}).data
+        # is_active steht in der (bei jedem Speichern invalidierten) Karte
+        return Response([card for card in data if card['is_active']])
+
+
+class ProductSizeMatrixAPIView(APIView):
+    """
+    Größen-Verfügbarkeit für viele Produkte (Größenauswahl im Katalog-Grid):
+    ``?ids=1,2,3`` (max. ``SIZE_MATRIX_MAX_IDS``). Antwort kompakt als Matrix::
+
+        {"sizes": [{"id": 1, "title": "S"}, ...],
+         "products": {"1": [3, 0, ...], ...}}   # Menge je Größe, Spalten wie "sizes"
+
+    Unbekannte oder inaktive Produkte fehlen in "products".
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        ids = parse_ids(request, getattr(settings, 'SIZE_MATRIX_MAX_IDS', 300))
+        sizes = all_sizes()
+        stock = size_stock(ids)
+        return Response({
+            'sizes': [{'id': size_id, 'title': title} for size_id, title in sizes],
+            'products': {
+                str(pk): [stock[pk].get(size_id, 0) for size_id, _title in sizes]
+                for pk in ids if pk in stock
+            },
+        })
+
+
+class ProductFeedAPIView(APIView):
+    """
+    Kompletter Katalog als Feed (csv / jsonl / xml) für Marktplätze.
+    Liegt eine vorgenerierte gzip-Datei (``manage.py export_feed --gzip``)
+    in ``FEED_ROOT`` und akzeptiert der Client gzip, wird diese ausgeliefert,
+    sonst wird gestreamt.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request, fmt):
+        if fmt not in FEED_FORMATS:
+            return Response({'detail': 'Unknown feed format'}, status=status.HTTP_404_NOT_FOUND)
+
+        pregenerated = Path(settings.FEED_ROOT) / f"catalog.{fmt}.gz"
+        if accepts_gzip(request.META.get('HTTP_ACCEPT_ENCODING', '')) and pregenerated.exists():
+            response = FileResponse(open(pregenerated, 'rb'), content_type=FEED_FORMATS[fmt])
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response = StreamingHttpResponse(stream_feed(fmt, request), content_type=FEED_FORMATS[fmt])
+        patch_vary_headers(response, ('Accept-Encoding',))  # Caches dürfen die gzip-Datei nicht an alle geben
+        response['Content-Disposition'] = f'inline; filename="catalog.{fmt}"'
+        return response
+
+
+class ProductSuggestAPIView(APIView):
+    """
+    Vorschläge für das Suchfeld: ``?q=<präfix>&limit=10``.
+    Kommt komplett aus dem Prefix-Index im Speicher (api/suggest.py), ohne DB.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 10)), 20))
+        except ValueError:
+            raise ValidationError({'limit': 'must be an integer'})
+        return Response(suggest_index.suggest(request.query_params.get('q', ''), limit))
+
+
+# ---------- CATEGORIES ----------
+class CategoryListAPIView(APIView):
+    """
+    Kategoriebaum (nach Pfad sortiert, d. h. Eltern vor Kindern) mit
+    gecachten Produktzahlen inkl. Unterkategorien. ``?root=<id>``: nur Teilbaum.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        qs = Category.objects.all()
+        root = request.query_params.get('root')
+        if root:
+            root = get_object_or_404(Category, pk=root) if root.isdigit() else None
+            if root is None:
+                raise ValidationError({'root': 'must be an integer'})
+            qs = root.get_descendants()
+        data = CategorySerializer(qs, many=True, context={'request': request, 'counts': category_counts()}).data
+        return Response(data)
+
 
 # ---------- FAVORITES ----------
 class FavoriteListAPIView(APIView):
@@ -114,6 +266,7 @@ class FavoriteToggleAPIView(APIView):
 # ---------- BASKET ----------
 class BasketAPIView(APIView):
     permission_classes = [IsAuthenticated]
+    db_primary = True  # Warenkorb immer vom Primary (s. core/db_router.py)
 
     def _get_or_create_basket(self, user):
         basket, _ = Basket.objects.get_or_create(user=user)
@@ -121,6 +274,7 @@ class BasketAPIView(APIView):
 
     def get(self, request):
         basket = self._get_or_create_basket(request.user)
+        prefetch_related_objects([basket], "items__product", "items__size")
         return Response(BasketSerializer(basket, context={'request': request}).data, status=status.HTTP_200_OK)
 
     def post(self, request):
@@ -141,6 +295,7 @@ class BasketAPIView(APIView):
         if not created:
             item.quantity += qty
             item.save()
+        record_basket_add(product.pk)
 
         return Response({'detail': 'Added to basket'}, status=status.HTTP_200_OK)
 
@@ -171,6 +326,7 @@ class OrderListCreateAPIView(generics.ListCreateAPIView):
     """
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated]
+    db_primary = True  # Checkout liest Bestand/Warenkorb vom Primary
 
     def get_queryset(self):
         return (self.request.user.orders
@@ -180,6 +336,7 @@ class OrderListCreateAPIView(generics.ListCreateAPIView):
     def perform_create(self, serializer):
         basket = Basket.objects.filter(user=self.request.user).prefetch_related("items").first()
         if not basket or not basket.items.exists():
+            metrics.record_checkout("empty_basket")
             raise ValidationError("Basket is empty")
 
         order = serializer.save(user=self.request.user)
@@ -187,6 +344,8 @@ class OrderListCreateAPIView(generics.ListCreateAPIView):
         for item in basket.items.all():
             stock = Storage.objects.filter(product=item.product, size=item.size).first()
             if stock and stock.quantity < item.quantity:
+                metrics.record_checkout("out_of_stock")
+                metrics.record_stock_out()
                 raise ValidationError(f"Nicht genug Bestand für {item.product}")
             if stock:
                 stock.quantity -= item.quantity
@@ -200,6 +359,7 @@ class OrderListCreateAPIView(generics.ListCreateAPIView):
             )
 
         basket.items.all().delete()
+        metrics.record_checkout("success")
         return order
 
 
@@ -220,7 +380,7 @@ class HomeHeadBannerAPIView(APIView):
     permission_classes = [AllowAny]
 
     def get(self, request):
-        qs = Banner.objects.filter(is_active=True, location=BannerLocation.HEAD).order_by('-id')[:1]
+        qs = head_banner_qs()
         return Response(BannerSerializer(qs, many=True, context={'request': request}).data)
 
 
@@ -229,7 +389,7 @@ class HomeMiddleBannersAPIView(APIView):
 
     def get(self, request):
         limit = int(request.query_params.get('limit', 10) or 10)
-        qs = Banner.objects.filter(is_active=True, location=BannerLocation.MIDDLE).order_by('-id')[:limit]
+        qs = banners_qs(BannerLocation.MIDDLE, limit)
         return Response(BannerSerializer(qs, many=True, context={'request': request}).data)
 
 
@@ -238,7 +398,7 @@ class HomeCatalogBannersAPIView(APIView):
 
     def get(self, request):
         limit = int(request.query_params.get('limit', 10) or 10)
-        qs = Banner.objects.filter(is_active=True, location=BannerLocation.CATALOG).order_by('-id')[:limit]
+        qs = banners_qs(BannerLocation.CATALOG, limit)
         return Response(BannerSerializer(qs, many=True, context={'request': request}).data)
 
 
@@ -247,8 +407,7 @@ class PopularBrandsAPIView(APIView):
 
     def get(self, request):
         limit = int(request.query_params.get('limit', 4) or 4)
-        qs = (Brand.objects.annotate(product_count=Count('products'))
-              .order_by('-product_count', 'title')[:limit])
+        qs = popular_brands_qs(limit)
         return Response(BrandSerializer(qs, many=True, context={'request': request}).data)
 
 
@@ -257,9 +416,7 @@ class BestsellerProductsAPIView(APIView):
 
     def get(self, request):
         limit = int(request.query_params.get('limit', 12) or 12)
-        qs = (Product.objects.filter(is_active=True)
-              .annotate(fav_count=Count('favorited_by'))
-              .order_by('-fav_count', '-created_at')[:limit])
+        qs = bestsellers_qs(limit)
         return Response(ProductListSerializer(qs, many=True, context={'request': request}).data)
 
 
@@ -268,7 +425,15 @@ class DiscountedProductsAPIView(APIView):
 
     def get(self, request):
         limit = int(request.query_params.get('limit', 12) or 12)
-        qs = (Product.objects.filter(is_active=True, old_price__isnull=False, new_price__lt=F('old_price'))
-              .annotate(discount_amount=F('old_price') - F('new_price'))
-              .order_by('-discount_amount', '-created_at')[:limit])
-        return Response(ProductListSerializer(qs, many=True, context={'request': request}).data)
\ No newline at end of file
+        qs = discounts_qs(limit)
+        return Response(ProductListSerializer(qs, many=True, context={'request': request}).data)
+
+
+class TrendingProductsAPIView(APIView):
+    """Gerade gefragte Produkte (zerfallender Score aus Aufrufen/Warenkorb-Adds, s. api/trending.py)."""
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        limit = int(request.query_params.get('limit', 12) or 12)
+        qs = trending_qs(limit)
+        return Response(ProductListSerializer(qs, many=True, context={'request': request}).data)
@@ -8,9 +8,17 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
 
 import os
+import time
 
-from django.core.asgi import get_asgi_application
+_started = time.perf_counter()
+
+from django.core.asgi import get_asgi_application  # noqa: E402
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
 application = get_asgi_application()
+
+# Warm-up vor dem ersten Request (bzw. vor dem Fork mit --preload), s. core/warmup.py
+from core.warmup import on_startup  # noqa: E402
+
+on_startup(setup_ms=(time.perf_counter() - _started) * 1000)
@@ -0,0 +1,57 @@
+# core/cache.py
+"""
+Cache-Backends, die Treffer/Fehlschläge pro Request mitzählen (für Log und
+Metriken, s. core/instrumentation.py). Sonst identisch mit den Django-Backends.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import BaseCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.redis import RedisCache
+
+from .instrumentation import count_cache
+
+_MISSING = object()
+
+
+def is_shared(alias="default"):
+    """False für prozesslokale Caches (LocMem): Zähler, Generationen und Locks gelten dort nur pro Worker."""
+    return not isinstance(caches[alias], LocMemCache)
+
+
+def invalidated_ttl(ttl, alias="default"):
+    """
+    TTL für Einträge, die per Signal gelöscht werden. Ohne gemeinsamen Cache
+    erreicht das Löschen nur den eigenen Worker – dort wird auf
+    ``LOCAL_CACHE_MAX_TTL`` gekappt (``None`` = ohne Ablauf zählt als länger).
+    """
+    if is_shared(alias):
+        return ttl
+    cap = getattr(settings, "LOCAL_CACHE_MAX_TTL", 60)
+    return cap if ttl is None else min(ttl, cap)
+
+
+class CacheStatsMixin:
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version)
+        if value is _MISSING:
+            count_cache(0, 1)
+            return default
+        count_cache(1, 0)
+        return value
+
+    def get_many(self, keys, version=None):
+        if super().get_many.__func__ is BaseCache.get_many:
+            return super().get_many(keys, version)  # ruft self.get() pro Key -> dort schon gezählt
+        keys = list(keys)
+        found = super().get_many(keys, version)
+        count_cache(len(found), len(keys) - len(found))
+        return found
+
+
+class InstrumentedRedisCache(CacheStatsMixin, RedisCache):
+    pass
+
+
+class InstrumentedLocMemCache(CacheStatsMixin, LocMemCache):
+    pass
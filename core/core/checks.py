@@ -0,0 +1,18 @@
+# core/checks.py
+"""System-Checks für Einstellungen, die nur mit gemeinsamem Cache funktionieren."""
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+from .cache import is_shared
+
+
+@register(Tags.caches, Tags.database)
+def replica_sticky_cache(app_configs, **kwargs):
+    if not getattr(settings, "DATABASE_REPLICAS", []) or is_shared():
+        return []
+    return [Error(
+        "DATABASE_REPLICAS ist gesetzt, der Cache aber prozesslokal (LocMem).",
+        hint="REDIS_URL setzen: die Read-your-writes-Markierung (REPLICA_STICKY_SECONDS) "
+             "muss für alle Worker sichtbar sein.",
+        id="core.E001",
+    )]
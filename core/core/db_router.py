@@ -0,0 +1,62 @@
+# core/db_router.py
+"""
+Primary/Replica-Routing.
+
+- Schreibzugriffe, Migrationen und alles innerhalb von ``transaction.atomic``
+  gehen immer auf ``default`` (Primary).
+- Lesezugriffe gehen nur dann auf eine Replica, wenn die
+  ``ReplicaRoutingMiddleware`` den Request freigegeben hat (GET/HEAD, View
+  ohne ``db_primary = True``, User nicht "sticky" nach eigenem Schreiben).
+  Management-Commands, Signale usw. lesen damit standardmäßig vom Primary.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_use_replica = ContextVar("use_replica", default=False)
+
+
+def replicas():
+    return getattr(settings, "DATABASE_REPLICAS", [])
+
+
+def set_use_replica(value):
+    """Gibt ein Token für ``reset_use_replica`` zurück."""
+    return _use_replica.set(bool(value))
+
+
+def reset_use_replica(token):
+    _use_replica.reset(token)
+
+
+@contextmanager
+def use_primary():
+    """Erzwingt Primary-Lesezugriffe im Block (z. B. Read-after-Write in einem GET)."""
+    token = _use_replica.set(False)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        aliases = replicas()
+        if not aliases or not _use_replica.get():
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(aliases)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas spiegeln den Primary, Objekte aus beiden dürfen sich referenzieren.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
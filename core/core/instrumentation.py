@@ -0,0 +1,206 @@
+# core/instrumentation.py
+"""
+SQL- und Zeitmessung pro Request.
+
+``QueryInstrumentationMiddleware`` legt pro Request ein ``RequestStats`` in
+einer ContextVar ab. Ein Execute-Wrapper, der an jede neue DB-Verbindung
+gehängt wird, zählt darin Queries und DB-Zeit – auch in Worker-Threads
+(``sync_to_async`` kopiert den Kontext mit). Ergebnis: ``Server-Timing``-
+Header, ``X-Query-Count`` und eine strukturierte Logzeile pro Request.
+Cache-Treffer zählen die Backends aus core/cache.py mit; alles zusammen geht
+zusätzlich an die Prometheus-Metriken (core/metrics.py). Request-ID
+(``X-Request-ID``) und User-ID landen in allen Logzeilen des Requests
+(core/logs.py).
+"""
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from . import metrics
+from .logs import request_id_from, request_id_var, user_id_var
+
+logger = logging.getLogger("core.perf")
+
+_current = ContextVar("request_stats", default=None)
+_serializer_depth = ContextVar("serializer_depth", default=0)
+
+_IN_LIST_RE = re.compile(r"\((?:\s*%s\s*,)+\s*%s\s*\)")
+_NUMBER_RE = re.compile(r"\b\d+\b")
+
+
+def normalize_sql(sql):
+    """Gleiche Query-Form -> gleicher String (IN-Listen und Zahl-Literale zusammengefasst)."""
+    return _NUMBER_RE.sub("?", _IN_LIST_RE.sub("(%s...)", sql))
+
+
+class RequestStats:
+    __slots__ = ("started", "queries", "spans", "cache_hits", "cache_misses")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = []  # (sql, params, dauer_ms, alias)
+        self.spans = Counter()  # name -> ms
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    @property
+    def db_ms(self):
+        return sum(q[2] for q in self.queries)
+
+    def add_span(self, name, ms):
+        self.spans[name] += ms
+
+    def analyze(self):
+        shapes = Counter(normalize_sql(q[0]) for q in self.queries)
+        exact = Counter((q[0], repr(q[1])) for q in self.queries)
+        threshold = getattr(settings, "N_PLUS_ONE_THRESHOLD", 5)
+        return {
+            "duplicates": sum(n - 1 for n in exact.values() if n > 1),
+            "n_plus_one": [
+                {"count": n, "sql": shape[:300]}
+                for shape, n in shapes.most_common(3) if n >= threshold
+            ],
+        }
+
+
+def current_stats():
+    return _current.get()
+
+
+def count_cache(hits, misses):
+    stats = _current.get()
+    if stats is not None:
+        stats.cache_hits += hits
+        stats.cache_misses += misses
+
+
+@contextmanager
+def span(name):
+    """Zeit eines Abschnitts (z. B. "serialize") dem aktuellen Request zuschreiben."""
+    stats = _current.get()
+    if stats is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.add_span(name, (time.perf_counter() - started) * 1000)
+
+
+def _query_wrapper(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries.append((sql, params, (time.perf_counter() - started) * 1000,
+                              context["connection"].alias))
+
+
+def _attach(connection):
+    if _query_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_query_wrapper)
+
+
+def _on_connection_created(sender, connection, **kwargs):
+    _attach(connection)
+
+
+def install():
+    connection_created.connect(_on_connection_created, dispatch_uid="core.instrumentation")
+    for conn in connections.all(initialized_only=True):
+        _attach(conn)
+
+
+class TimedSerializerMixin:
+    """
+    Misst die Zeit in ``to_representation`` als Span "serialize". Verschachtelte
+    Serializer zählen nicht doppelt (nur die äußerste Ebene wird gemessen).
+    """
+
+    def to_representation(self, instance):
+        depth = _serializer_depth.get()
+        if depth or _current.get() is None:
+            token = _serializer_depth.set(depth + 1)
+            try:
+                return super().to_representation(instance)
+            finally:
+                _serializer_depth.reset(token)
+        token = _serializer_depth.set(1)
+        try:
+            with span("serialize"):
+                return super().to_representation(instance)
+        finally:
+            _serializer_depth.reset(token)
+
+
+class QueryInstrumentationMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        install()
+
+    def __call__(self, request):
+        stats = RequestStats()
+        request_id = request_id_from(request)
+        token = _current.set(stats)
+        id_tokens = request_id_var.set(request_id), user_id_var.set(None)
+        try:
+            try:
+                with metrics.in_flight(request.method):
+                    response = self.get_response(request)
+            finally:
+                _current.reset(token)
+            response["X-Request-ID"] = request_id
+            self.report(request, response, stats)
+        finally:
+            request_id_var.reset(id_tokens[0])
+            user_id_var.reset(id_tokens[1])
+        return response
+
+    def report(self, request, response, stats):
+        total_ms = (time.perf_counter() - stats.started) * 1000
+        db_ms = stats.db_ms
+        count = len(stats.queries)
+        analysis = stats.analyze()
+        budget = getattr(settings, "REQUEST_QUERY_BUDGET", None)
+        over_budget = budget is not None and count > budget
+
+        if getattr(settings, "SERVER_TIMING_HEADER", True):
+            parts = [f'db;dur={db_ms:.1f};desc="{count} queries"']
+            parts += [f"{name};dur={ms:.1f}" for name, ms in stats.spans.items()]
+            parts.append(f"total;dur={total_ms:.1f}")
+            response["Server-Timing"] = ", ".join(parts)
+            response["X-Query-Count"] = str(count)
+            if over_budget:
+                response["X-Query-Budget-Exceeded"] = f"{count}>{budget}"
+
+        record = {
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "duration_ms": round(total_ms, 2),
+            "queries": count,
+            "db_ms": round(db_ms, 2),
+            "duplicates": analysis["duplicates"],
+            "n_plus_one": analysis["n_plus_one"],
+            "spans": {name: round(ms, 2) for name, ms in stats.spans.items()},
+            "cache": {"hits": stats.cache_hits, "misses": stats.cache_misses},
+            "over_budget": over_budget,
+        }
+        metrics.observe_request(request, response, stats, total_ms)
+        user = getattr(request, "user", None)  # von DRF nach der Authentifizierung gesetzt
+        if user_id_var.get() is None and user is not None and user.is_authenticated:
+            user_id_var.set(user.pk)
+        level = logging.WARNING if over_budget or analysis["n_plus_one"] else logging.INFO
+        logger.log(level, "%s %s %s %.1fms %dq", request.method, request.path, response.status_code,
+                   total_ms, count, extra={"data": record})
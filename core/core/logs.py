@@ -0,0 +1,133 @@
+# core/logs.py
+"""
+Strukturiertes Logging ohne I/O im Request-Thread.
+
+- ``QueueLogHandler`` legt Records nur in eine begrenzte Queue
+  (``put_nowait``); ein ``QueueListener``-Thread formatiert und schreibt sie
+  (Datei per ``WatchedFileHandler`` oder stderr). Nach einem Fork (gunicorn
+  ``--preload``) startet jeder Prozess beim ersten Record seinen eigenen
+  Listener.
+- Überlauf: Ab ``high_water`` (Anteil der Queue) wird unterhalb von WARNING nur
+  noch jeder ``1/sample_rate``-te Record behalten; ist die Queue voll, wird
+  verworfen. Die Zahl verworfener Records wird höchstens einmal pro Sekunde
+  als Warnung nachgereicht (ungefähr, ohne Lock gezählt).
+- ``JSONFormatter``: eine JSON-Zeile pro Record mit Zeit, Level, Logger,
+  Nachricht, ``request_id``/``user_id`` des aktuellen Requests (ContextVars,
+  gesetzt von der Instrumentierungs-Middleware bzw. der JWT-Authentifizierung)
+  und den Feldern aus ``extra={"data": {...}}``.
+"""
+import json
+import logging
+import os
+import queue
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, WatchedFileHandler
+
+request_id_var = ContextVar("request_id", default=None)
+user_id_var = ContextVar("user_id", default=None)
+
+_REQUEST_ID_RE = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+
+def request_id_from(request):
+    """``X-Request-ID`` vom Proxy übernehmen, wenn plausibel, sonst eine neue ID."""
+    incoming = request.META.get("HTTP_X_REQUEST_ID", "")
+    return incoming if _REQUEST_ID_RE.match(incoming) else uuid.uuid4().hex
+
+
+def set_user_id(user_id):
+    user_id_var.set(user_id)
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+            "user_id": getattr(record, "user_id", None),
+            "process": record.process,
+            "thread": record.threadName,
+        }
+        data = getattr(record, "data", None)
+        if isinstance(data, dict):
+            entry.update(data)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class QueueLogHandler(QueueHandler):
+    def __init__(self, filename=None, maxsize=10000, high_water=0.8, sample_rate=0.1):
+        self.target = WatchedFileHandler(filename, encoding="utf-8") if filename else logging.StreamHandler(sys.stderr)
+        self.target.setFormatter(JSONFormatter())
+        self.maxsize = maxsize
+        self.high_water = int(maxsize * high_water)
+        self.sample_rate = sample_rate
+        self.dropped = 0
+        self._notice_at = 0.0
+        self.listener = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        super().__init__(queue.Queue(maxsize))
+        self._start()
+
+    def _start(self):
+        self.queue = queue.Queue(self.maxsize)
+        self.listener = QueueListener(self.queue, self.target)
+        self.listener.start()
+        self._pid = os.getpid()
+
+    def prepare(self, record):
+        # Läuft im aufrufenden Thread: Kontext mitnehmen, Nachricht und Traceback einfrieren
+        record.request_id = request_id_var.get()
+        record.user_id = user_id_var.get()
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        if self._pid != os.getpid():
+            with self._start_lock:
+                if self._pid != os.getpid():  # geforkter Worker: Listener-Thread existiert hier nicht
+                    self._start()
+        if (record.levelno < logging.WARNING and self.queue.qsize() >= self.high_water
+                and random.random() >= self.sample_rate):
+            self.dropped += 1
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            return
+        if self.dropped and time.monotonic() - self._notice_at >= 1:
+            self._notice_at = time.monotonic()
+            dropped, self.dropped = self.dropped, 0
+            notice = logging.LogRecord(__name__, logging.WARNING, __file__, 0,
+                                       "%d Log-Records verworfen (Queue voll / Sampling)", (dropped,), None)
+            try:
+                self.queue.put_nowait(self.prepare(notice))
+            except queue.Full:
+                self.dropped += dropped
+
+    def close(self):
+        # logging.shutdown() beim Beenden: restliche Records noch schreiben
+        if self.listener is not None and self._pid == os.getpid():
+            self.listener.stop()
+            self.listener = None
+        self.target.close()
+        super().close()
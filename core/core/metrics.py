@@ -0,0 +1,128 @@
+# core/metrics.py
+"""
+Prometheus-Metriken (optional, ``prometheus_client``).
+
+Pro View (URL-Name) werden Latenz, Antwortgröße, Queries und Cache-Treffer
+erfasst – die Werte kommen aus ``RequestStats`` der Instrumentierungs-
+Middleware –, dazu laufende Requests, Checkout-Ergebnisse und Bestandsfehler.
+Teil-Requests von ``/api/batch/`` werden zusätzlich unter ihrer eigenen
+View erfasst. Ausgabe im Text-Format unter ``/metrics`` – nur mit
+``METRICS_TOKEN`` als Bearer-Token; ohne Token ist der Endpunkt gesperrt,
+außer ``METRICS_PUBLIC = True`` (z. B. nur intern erreichbar).
+
+Mehrere gunicorn-Worker: ``PROMETHEUS_MULTIPROC_DIR`` vor dem Start auf ein
+leeres Verzeichnis setzen (bei jedem Deploy leeren); jeder Prozess schreibt
+dann seine Werte per mmap dorthin und ``/metrics`` aggregiert über alle. In
+``gunicorn.conf.py`` zusätzlich::
+
+    def child_exit(server, worker):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
+
+Ohne ``prometheus_client`` (oder mit ``METRICS_ENABLED = False``) sind alle
+Funktionen No-ops und ``/metrics`` liefert 404.
+"""
+import os
+from contextlib import nullcontext
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.utils.crypto import constant_time_compare
+
+try:
+    import prometheus_client
+    from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, multiprocess
+except ImportError:  # pragma: no cover - optional
+    prometheus_client = None
+
+METHODS = {"GET", "HEAD", "OPTIONS", "POST", "PUT", "PATCH", "DELETE"}
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+if prometheus_client is not None:
+    REQUEST_LATENCY = Histogram("http_request_duration_seconds", "Request-Dauer pro View",
+                                ["view", "method", "status"], buckets=LATENCY_BUCKETS)
+    IN_PROGRESS = Gauge("http_requests_in_progress", "Laufende Requests", ["method"],
+                        multiprocess_mode="livesum")
+    RESPONSE_SIZE = Histogram("http_response_size_bytes", "Größe des Antwort-Bodys (ohne Streaming)",
+                              ["view"], buckets=SIZE_BUCKETS)
+    DB_QUERIES = Histogram("http_db_queries", "SQL-Queries pro Request", ["view"], buckets=QUERY_BUCKETS)
+    DB_DURATION = Histogram("http_db_duration_seconds", "DB-Zeit pro Request", ["view"],
+                            buckets=LATENCY_BUCKETS)
+    CACHE_REQUESTS = Counter("app_cache_requests", "Cache-Lookups pro View", ["view", "result"])
+    CHECKOUTS = Counter("shop_checkouts", "Checkout-Versuche nach Ergebnis", ["outcome"])
+    STOCK_OUTS = Counter("shop_stock_outs", "Checkouts, die am Bestand gescheitert sind")
+
+
+def enabled():
+    return prometheus_client is not None and getattr(settings, "METRICS_ENABLED", True)
+
+
+def _method(method):
+    return method if method in METHODS else "other"
+
+
+def view_label(request):
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unresolved"  # 404 o. Ä. – keine beliebigen Pfade als Label
+    return match.view_name or match._func_path
+
+
+def in_flight(method):
+    if not enabled():
+        return nullcontext()
+    return IN_PROGRESS.labels(_method(method)).track_inprogress()
+
+
+def observe_request(request, response, stats, total_ms):
+    if not enabled():
+        return
+    view = view_label(request)
+    REQUEST_LATENCY.labels(view, _method(request.method), str(response.status_code)).observe(total_ms / 1000)
+    if not response.streaming:
+        RESPONSE_SIZE.labels(view).observe(len(response.content))
+    DB_QUERIES.labels(view).observe(len(stats.queries))
+    DB_DURATION.labels(view).observe(stats.db_ms / 1000)
+    if stats.cache_hits:
+        CACHE_REQUESTS.labels(view, "hit").inc(stats.cache_hits)
+    if stats.cache_misses:
+        CACHE_REQUESTS.labels(view, "miss").inc(stats.cache_misses)
+
+
+def observe_batch_item(match, status, seconds):
+    """Latenz eines Teil-Requests aus ``/api/batch/`` unter dessen eigener View."""
+    if enabled():
+        REQUEST_LATENCY.labels(match.view_name or match._func_path, "GET", str(status)).observe(seconds)
+
+
+def record_checkout(outcome):
+    """outcome: success, empty_basket, out_of_stock."""
+    if enabled():
+        CHECKOUTS.labels(outcome).inc()
+
+
+def record_stock_out():
+    if enabled():
+        STOCK_OUTS.inc()
+
+
+def _registry():
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return prometheus_client.REGISTRY
+
+
+def metrics_view(request):
+    if not enabled():
+        raise Http404
+    token = getattr(settings, "METRICS_TOKEN", None)
+    if not token and not getattr(settings, "METRICS_PUBLIC", False):
+        return HttpResponse(status=403)
+    if token and not constant_time_compare(request.META.get("HTTP_AUTHORIZATION", ""), f"Bearer {token}"):
+        return HttpResponse(status=401)
+    return HttpResponse(prometheus_client.generate_latest(_registry()),
+                        content_type=prometheus_client.CONTENT_TYPE_LATEST)
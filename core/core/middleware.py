@@ -0,0 +1,75 @@
+# core/middleware.py
+import hashlib
+
+import jwt
+from django.conf import settings
+from django.core.cache import cache
+from django.urls import Resolver404, resolve
+
+from .db_router import replicas, reset_use_replica, set_use_replica
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Gibt sichere Requests (GET/HEAD) für Replica-Lesezugriffe frei.
+
+    Nach einem erfolgreichen schreibenden Request bleibt der Client für
+    ``REPLICA_STICKY_SECONDS`` auf dem Primary (read-your-writes). Views mit
+    ``db_primary = True`` (Warenkorb, Checkout) lesen immer vom Primary.
+
+    Die Markierung liegt im Cache und muss für alle Worker sichtbar sein –
+    mit ``DATABASE_REPLICAS`` ist ein gemeinsamer Cache (Redis) Pflicht
+    (System-Check ``core.E001``, core/checks.py).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not replicas():
+            return self.get_response(request)
+
+        # Setzen und Zurücksetzen im selben Kontext, direkt um get_response
+        token = set_use_replica(self.use_replica(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            reset_use_replica(token)
+
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            cache.set(self.sticky_key(request), 1, getattr(settings, "REPLICA_STICKY_SECONDS", 10))
+        return response
+
+    def use_replica(self, request):
+        if request.method not in SAFE_METHODS:
+            return False
+        try:
+            view_func = resolve(request.path_info, getattr(request, "urlconf", None)).func
+        except Resolver404:
+            view_func = None
+        view_class = getattr(view_func, "view_class", None) or getattr(view_func, "cls", None)
+        return (not getattr(view_class or view_func, "db_primary", False)
+                and not cache.get(self.sticky_key(request)))
+
+    @staticmethod
+    def sticky_key(request):
+        """
+        Pro User (user_id aus dem JWT, ohne Signaturprüfung – es geht nur ums
+        Routing), sonst pro IP.
+        """
+        auth = request.META.get("HTTP_AUTHORIZATION", "")
+        if auth.startswith("Bearer "):
+            try:
+                payload = jwt.decode(auth[7:], options={"verify_signature": False})
+                user_id = payload.get(settings.SIMPLE_JWT.get("USER_ID_CLAIM", "user_id"))
+                if user_id is not None:
+                    return f"db-sticky:user:{user_id}"
+            except jwt.PyJWTError:
+                pass
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated:  # Session (Admin)
+            return f"db-sticky:user:{user.pk}"
+        addr = request.META.get("REMOTE_ADDR", "")
+        return "db-sticky:ip:" + hashlib.sha1(addr.encode()).hexdigest()
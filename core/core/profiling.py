@@ -0,0 +1,160 @@
+# core/profiling.py
+"""
+Profiling einzelner Requests auf Anforderung (nur Staff).
+
+Mit Header ``X-Profile: 1`` läuft der Request unter ``cProfile`` –
+inklusive View, Serialisierung und Rendern. Bewusst kein Query-Parameter:
+der würde z. B. die Produktliste vom Snapshot- auf den ORM-Weg zwingen und
+damit anderen Code messen als im Normalbetrieb. Erlaubt nur für
+Staff-User (Admin-Session oder JWT) und höchstens ``PROFILE_MAX_PER_WINDOW``
+Mal pro ``PROFILE_WINDOW_SECONDS`` (Cache-Zähler), pro Prozess außerdem nie
+zwei gleichzeitig. Über alle Worker gilt die Grenze nur mit gemeinsamem
+Cache (Redis); mit LocMem zählt jeder Prozess für sich, bei N Workern sind
+also bis zu N × ``PROFILE_MAX_PER_WINDOW`` Profile pro Fenster möglich.
+
+Abgelegt wird unter ``PROFILE_DIR``:
+
+- ``<id>.prof``: pstats-Dump (``snakeviz``, ``python -m pstats``)
+- ``<id>.json``: Request, Dauer, Spans, alle SQL-Queries mit Zeiten und die
+  teuersten Funktionen
+
+Die ID steht im Response-Header ``X-Profile-Id``; Ausgabe mit
+``manage.py show_profile <id>``.
+"""
+import cProfile
+import io
+import json
+import logging
+import pstats
+import secrets
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .instrumentation import current_stats
+
+logger = logging.getLogger("core.perf")
+
+_running = threading.Lock()  # cProfile pro Prozess nur einmal gleichzeitig
+TOP_FUNCTIONS = 40
+
+
+def profile_dir():
+    return Path(settings.PROFILE_DIR)
+
+
+def _requested(request):
+    return request.META.get("HTTP_X_PROFILE") == "1"
+
+
+def _staff_user(request):
+    """Staff-User aus Admin-Session oder JWT, sonst None."""
+    user = getattr(request, "user", None)
+    if user is None or not user.is_authenticated:
+        from user.authentication import CachedJWTAuthentication
+        try:
+            result = CachedJWTAuthentication().authenticate(request)
+        except Exception:  # ungültiges Token -> nicht profilen, die View antwortet selbst
+            return None
+        user = result[0] if result is not None else None
+    return user if user is not None and user.is_staff else None
+
+
+def _take_slot():
+    window = getattr(settings, "PROFILE_WINDOW_SECONDS", 60)
+    key = f"profile:window:{int(time.time() // window)}"
+    cache.add(key, 0, timeout=window * 2)
+    try:
+        count = cache.incr(key)
+    except ValueError:
+        return False
+    return count <= getattr(settings, "PROFILE_MAX_PER_WINDOW", 5)
+
+
+def _top_functions(profiler):
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:TOP_FUNCTIONS]
+    return [
+        {"function": f"{filename}:{line}({name})", "calls": nc, "tottime_ms": round(tt * 1000, 3),
+         "cumtime_ms": round(ct * 1000, 3)}
+        for (filename, line, name), (_cc, nc, tt, ct, _callers) in rows
+    ]
+
+
+def _save(profile_id, profiler, request, user, response, duration_ms):
+    root = profile_dir()
+    root.mkdir(parents=True, exist_ok=True)
+    profiler.dump_stats(root / f"{profile_id}.prof")
+    stats = current_stats()
+    queries = stats.queries if stats is not None else []
+    record = {
+        "id": profile_id,
+        "method": request.method,
+        "path": request.get_full_path(),
+        "status": response.status_code,
+        "user": user.pk,
+        "duration_ms": round(duration_ms, 2),
+        "db_ms": round(sum(q[2] for q in queries), 2),
+        "spans": {name: round(ms, 2) for name, ms in stats.spans.items()} if stats is not None else {},
+        "queries": [{"sql": sql, "params": repr(params)[:500], "ms": round(ms, 3), "db": alias}
+                    for sql, params, ms, alias in queries],
+        "functions": _top_functions(profiler),
+    }
+    (root / f"{profile_id}.json").write_text(json.dumps(record, ensure_ascii=False, indent=1))
+    _cleanup(root)
+
+
+def _cleanup(root):
+    keep = getattr(settings, "PROFILE_KEEP", 200)
+    files = sorted(root.glob("*.json"), key=lambda path: path.stat().st_mtime, reverse=True)
+    for path in files[keep:]:
+        path.unlink(missing_ok=True)
+        path.with_suffix(".prof").unlink(missing_ok=True)
+
+
+class ProfilingMiddleware:
+    """Nach ``AuthenticationMiddleware`` einhängen (braucht ``request.user`` und ``RequestStats``)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not (getattr(settings, "PROFILING_ENABLED", True) and _requested(request)):
+            return self.get_response(request)
+        user = _staff_user(request)
+        if user is None:
+            return self.get_response(request)
+        skipped = None
+        if not _running.acquire(blocking=False):
+            skipped = "busy"
+        elif not _take_slot():
+            _running.release()
+            skipped = "rate-limit"
+        if skipped:
+            response = self.get_response(request)
+            response["X-Profile-Skipped"] = skipped
+            return response
+        try:
+            profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{secrets.token_hex(4)}"
+            profiler = cProfile.Profile()
+            started = time.perf_counter()
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+            duration_ms = (time.perf_counter() - started) * 1000
+            try:
+                _save(profile_id, profiler, request, user, response, duration_ms)
+            except OSError:
+                logger.exception("Profil %s konnte nicht gespeichert werden", profile_id)
+                return response
+            response["X-Profile-Id"] = profile_id
+            logger.info("Profil %s: %s %.1fms", profile_id, request.path, duration_ms,
+                        extra={"data": {"profile_id": profile_id, "duration_ms": round(duration_ms, 2)}})
+            return response
+        finally:
+            _running.release()
@@ -1,3 +1,6 @@
+import os
+import sys
+from importlib.util import find_spec
 from pathlib import Path
 from datetime import timedelta
 
@@ -32,11 +35,14 @@ INSTALLED_APPS = [
 
 # --- Middleware ---
 MIDDLEWARE = [
+    "core.instrumentation.QueryInstrumentationMiddleware",  # Server-Timing, Query-Zähler, N+1-Erkennung
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "core.profiling.ProfilingMiddleware",  # X-Profile: 1 für Staff (core/profiling.py)
+    "core.middleware.ReplicaRoutingMiddleware",  # Lesezugriffe -> Replica (core/db_router.py)
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -70,9 +76,31 @@ DATABASES = {
         "PASSWORD": "admin1234",
         "HOST": "localhost",
         "PORT": "5432",
+        "CONN_MAX_AGE": 60,          # Verbindungen wiederverwenden (auch in den async Worker-Threads)
+        "CONN_HEALTH_CHECKS": True,
     }
 }
 
+# Read-Replica optional per ENV, z. B. lokal zum Testen auf denselben Server zeigen lassen:
+#   DB_REPLICA_HOST=localhost python manage.py runserver
+if os.environ.get("DB_REPLICA_HOST"):
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "HOST": os.environ["DB_REPLICA_HOST"],
+        "PORT": os.environ.get("DB_REPLICA_PORT", DATABASES["default"]["PORT"]),
+        "NAME": os.environ.get("DB_REPLICA_NAME", DATABASES["default"]["NAME"]),
+        "TEST": {"MIRROR": "default"},
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != "default"]
+DATABASE_ROUTERS = ["core.db_router.PrimaryReplicaRouter"]
+REPLICA_STICKY_SECONDS = 10  # nach eigenem Schreiben so lange vom Primary lesen
+
+ASGI_APPLICATION = "core.asgi.application"
+ASYNC_DB_WORKERS = 8  # Threads (= max. DB-Verbindungen) für parallele Queries in api/async_views.py
+BATCH_MAX_REQUESTS = 20  # Teil-Requests pro /api/batch/
+WARMUP_ON_STARTUP = True  # core/wsgi.py / core/asgi.py -> core/warmup.py
+WARMUP_DATABASE = True  # auch DB-/Cache-Schritte (ContentTypes, Größen, Kategorien, Suggest ...)
+
 # --- Passwortrichtlinien ---
 AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},
@@ -87,7 +115,7 @@ AUTH_USER_MODEL = "user.User"
 # --- DRF + Filter + JWT ---
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "user.authentication.CachedJWTAuthentication",  # JWT + gecachter User (user/authentication.py)
     ),
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.AllowAny",
@@ -96,6 +124,25 @@ REST_FRAMEWORK = {
     "DEFAULT_FILTER_BACKENDS": (
         "django_filters.rest_framework.DjangoFilterBackend",
     ),
+    # orjson-Renderer/-Parser (api/renderers.py), MessagePack nur wenn installiert
+    "DEFAULT_RENDERER_CLASSES": (
+        "api.renderers.FastJSONRenderer",
+        *(("api.renderers.MessagePackRenderer",) if find_spec("msgpack") else ()),
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "api.renderers.FastJSONParser",
+        *(("api.renderers.MessagePackParser",) if find_spec("msgpack") else ()),
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
+    # Anzahl Reverse-Proxys vor Django; 0 -> REMOTE_ADDR, X-Forwarded-For wird ignoriert
+    "NUM_PROXIES": int(os.environ.get("NUM_PROXIES", 0)),
+    # Token-Buckets für Login/Registrierung/Refresh (user/throttling.py)
+    "DEFAULT_THROTTLE_RATES": {
+        "auth_ip": "30/min",
+        "auth_email": "10/hour",
+    },
 }
 
 SIMPLE_JWT = {
@@ -107,8 +154,71 @@ SIMPLE_JWT = {
     "ALGORITHM": "HS256",
     "AUTH_TOKEN_CLASSES": ("rest_framework_simplejwt.tokens.AccessToken",),
     "UPDATE_LAST_LOGIN": True,
+    "TOKEN_REFRESH_SERIALIZER": "user.token.FilteredTokenRefreshSerializer",  # Bloom-Filter vor der Blacklist
 }
 
+# Token-Blacklist-Filter (user/blacklist.py); Pruning: manage.py prune_tokens (Cron)
+TOKEN_BLACKLIST_SYNC_SECONDS = 2          # spätestens so oft neue Sperren anderer Worker nachladen
+TOKEN_BLACKLIST_REBUILD_SECONDS = 3600
+TOKEN_BLACKLIST_RESCAN_ROWS = 1000        # so viele IDs unter max_id erneut lesen (verspätete Commits)
+TOKEN_BLACKLIST_FILTER_CAPACITY = 100_000
+
+# --- Request-Instrumentierung (core/instrumentation.py) ---
+SERVER_TIMING_HEADER = True   # Server-Timing / X-Query-Count im Response
+REQUEST_QUERY_BUDGET = 30     # mehr Queries pro Request -> Warnung + X-Query-Budget-Exceeded
+N_PLUS_ONE_THRESHOLD = 5      # gleiche Query-Form so oft -> als N+1 gemeldet
+
+# --- Logging (core/logs.py): JSON-Zeilen, geschrieben von einem Listener-Thread ---
+LOG_FILE = os.environ.get("LOG_FILE")  # leer -> stderr
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "queue": {
+            "()": "core.logs.QueueLogHandler",
+            "filename": LOG_FILE,
+            "maxsize": 10000,  # Records in der Queue, darüber wird verworfen
+            "high_water": 0.8,  # ab diesem Füllstand ...
+            "sample_rate": 0.1,  # ... nur noch 10 % der Records unter WARNING
+        },
+    },
+    "root": {"handlers": ["queue"], "level": LOG_LEVEL},
+    "loggers": {
+        "django": {"handlers": ["queue"], "level": LOG_LEVEL, "propagate": False},
+    },
+}
+
+# --- Profiling auf Anforderung (core/profiling.py, nur Staff) ---
+PROFILING_ENABLED = True
+PROFILE_DIR = BASE_DIR / "profiles"  # <id>.prof + <id>.json; manage.py show_profile <id>
+PROFILE_MAX_PER_WINDOW = 5  # höchstens so viele Profile ...
+PROFILE_WINDOW_SECONDS = 60  # ... pro Zeitfenster (alle Worker zusammen – nur mit Redis;
+                             # mit LocMem zählt jeder Worker selbst: N Worker -> N x MAX_PER_WINDOW)
+PROFILE_KEEP = 200  # ältere Profile werden gelöscht
+
+# --- Prometheus-Metriken (core/metrics.py, optional prometheus_client) ---
+# Mehrere Worker: PROMETHEUS_MULTIPROC_DIR setzen, s. core/metrics.py
+METRICS_ENABLED = True
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")  # /metrics nur mit "Authorization: Bearer <token>"
+METRICS_PUBLIC = False  # True -> /metrics ohne Token (nur wenn der Pfad nicht öffentlich erreichbar ist)
+
+# --- Cache ---
+# Ohne REDIS_URL: lokaler Speicher pro Prozess. Mit Redis teilen sich alle
+# Worker Replica-Stickiness, User-Cache usw.
+if os.environ.get("REDIS_URL"):
+    CACHES = {"default": {"BACKEND": "core.cache.InstrumentedRedisCache",  # zählt Treffer (core/cache.py)
+                          "LOCATION": os.environ["REDIS_URL"]}}
+else:
+    CACHES = {"default": {"BACKEND": "core.cache.InstrumentedLocMemCache"}}
+
+# Ohne Redis erreicht eine Signal-Invalidierung nur den eigenen Worker: Produktkarten,
+# Größen usw. (core.cache.invalidated_ttl) leben dann höchstens so lange
+LOCAL_CACHE_MAX_TTL = 60
+
+AUTH_USER_CACHE_TTL = 60        # Sekunden im gemeinsamen Cache (0 = aus; ohne Redis immer aus)
+AUTH_USER_CACHE_LOCAL_TTL = 5   # Sekunden im Prozess-Cache (max. Verzögerung für andere Worker)
+
 # --- Internationalisierung ---
 LANGUAGE_CODE = "ru"
 TIME_ZONE = "Asia/Bishkek"
@@ -122,6 +232,61 @@ STATIC_ROOT = BASE_DIR / "staticfiles"    # für collectstatic (Prod)
 
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "Media"           # wenn Ordner so heißt, lassen; sonst "media"
+MEDIA_CACHE_MAX_AGE = 3600                # für alte, nicht hash-benannte Dateien
+MEDIA_SERVE = True                        # MEDIA_ROOT über api.media.serve_media ausliefern (auch ohne DEBUG)
+MEDIA_OFFLOAD_HEADER = None               # "X-Accel-Redirect" (nginx) oder "X-Sendfile" (Apache) -> Proxy überträgt
+MEDIA_OFFLOAD_PREFIX = "/protected-media/"  # internal location im Proxy für X-Accel-Redirect
+
+STORAGES = {
+    # Uploads nach Inhalts-Hash -> Deduplizierung + unveränderliche URLs (api/storage.py)
+    "default": {"BACKEND": "api.storage.ContentAddressedStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+
+# --- Bild-Varianten (api/images.py) ---
+IMAGE_VARIANTS = {"card": 400, "detail": 1000, "zoom": 2000}  # Name -> max. Breite in px
+IMAGE_VARIANT_WORKERS = 2
+
+# --- Katalog-Feed ---
+FEED_ROOT = BASE_DIR / "feeds"            # vorgenerierte catalog.<fmt>.gz (manage.py export_feed --gzip)
+FEED_BASE_URL = os.environ.get("FEED_BASE_URL", "")  # z. B. "https://shop.example" – Bild-URLs im Feed
+
+# --- Kategorien (api/categories.py) ---
+CATEGORY_COUNTS_TTL = 300  # Sekunden; Produktänderungen invalidieren sofort
+
+# --- Produktkarten-Cache (api/cards.py) ---
+PRODUCT_CARD_TTL = 60 * 60  # mit Redis; ohne: LOCAL_CACHE_MAX_TTL
+
+# --- Größen-Matrix (api/stock.py) ---
+SIZE_STOCK_TTL = 60 * 60  # Storage-Änderungen invalidieren sofort (ohne Redis: LOCAL_CACHE_MAX_TTL)
+SIZE_MATRIX_MAX_IDS = 300
+PRODUCT_BATCH_MAX_IDS = 100  # /api/products/batch/
+
+# --- Trending (api/trending.py) ---
+TRENDING_ENABLED = sys.argv[1:2] != ["test"]  # manage.py test: kein Puffer/Timer (Flush nach dem Abbau der Test-DB)
+TRENDING_FLUSH_SECONDS = 30  # Zähler-Puffer pro Prozess so oft in ProductActivity schreiben (Timer-Thread)
+TRENDING_BUFFER_MAX = 5000  # ... oder ab so vielen (Produkt, Stunde, Art)-Einträgen
+TRENDING_WINDOW_HOURS = 72
+TRENDING_HALF_LIFE_HOURS = 12
+TRENDING_WEIGHTS = {"views": 1.0, "basket_adds": 5.0}
+TRENDING_SIZE = 100  # so viele Produkte im vorberechneten Ranking
+TRENDING_TTL = 15 * 60  # ohne Flushes wird danach im Hintergrund neu berechnet
+TRENDING_RETENTION_DAYS = 30  # ältere Stundenzeilen werden gelöscht
+
+# --- Snapshots (nicht im Repo) ---
+SNAPSHOT_ROOT = BASE_DIR / "snapshots"
+
+# Katalog-Snapshot für DB-freie Listen (api/snapshot.py, manage.py build_catalog_snapshot)
+CATALOG_SNAPSHOT_ENABLED = True
+CATALOG_SNAPSHOT_DIR = SNAPSHOT_ROOT / "catalog"
+CATALOG_SNAPSHOT_MAX_AGE = 60 * 60  # Sekunden; danach ORM + Neuaufbau (frische Favoritenzahlen)
+CATALOG_SNAPSHOT_AUTO_REBUILD = True  # veraltet -> ein Worker baut im Hintergrund neu
+CATALOG_SNAPSHOT_REBUILD_INTERVAL = 30  # höchstens so oft (Sekunden)
+
+# --- Autovervollständigung (api/suggest.py) ---
+SUGGEST_SNAPSHOT = SNAPSHOT_ROOT / "suggest.pickle"  # manage.py build_suggest_index
+SUGGEST_SYNC_SECONDS = 5  # so oft wird suggest:gen im Cache geprüft
+SUGGEST_MAX_AGE = 300  # spätestens dann Neuaufbau (ohne Redis sieht ein Worker fremde Änderungen nur so)
 
 # --- Sonstiges ---
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
\ No newline at end of file
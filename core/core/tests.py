@@ -0,0 +1,365 @@
+import io
+import json
+import logging
+import queue
+import tempfile
+from pathlib import Path
+from unittest import mock, skipUnless
+
+import jwt
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api.stock import SIZES_KEY
+from user.models import User
+
+from . import checks, metrics, warmup
+from .db_router import PrimaryReplicaRouter, reset_use_replica, set_use_replica, use_primary
+from .instrumentation import RequestStats, normalize_sql
+from .logs import JSONFormatter, QueueLogHandler, request_id_var, user_id_var
+from .middleware import ReplicaRoutingMiddleware
+
+
+def record(level=logging.INFO, msg="hallo", **attrs):
+    entry = logging.LogRecord("test", level, __file__, 1, msg, None, None)
+    entry.__dict__.update(attrs)
+    return entry
+
+
+# ---------- Logging über die Queue (core/logs.py) ----------
+class QueueLogHandlerTests(SimpleTestCase):
+    def make_handler(self, **kwargs):
+        handler = QueueLogHandler(**kwargs)
+        handler.listener.stop()  # nichts abarbeiten -> Queue läuft voll
+        handler.target = logging.StreamHandler(io.StringIO())
+        self.addCleanup(handler.target.close)
+        return handler
+
+    def drain(self, handler):
+        records = []
+        while True:
+            try:
+                records.append(handler.queue.get_nowait())
+            except queue.Empty:
+                return records
+
+    def test_below_high_water_everything_is_queued(self):
+        handler = self.make_handler(maxsize=10, high_water=0.5, sample_rate=0)
+        for _ in range(5):
+            handler.handle(record())
+        self.assertEqual(handler.queue.qsize(), 5)
+        self.assertEqual(handler.dropped, 0)
+
+    def test_above_high_water_info_is_sampled_warnings_kept(self):
+        handler = self.make_handler(maxsize=10, high_water=0.5, sample_rate=0)
+        for _ in range(5):
+            handler.handle(record())
+        for _ in range(3):
+            handler.handle(record())  # sample_rate 0 -> alle verworfen
+        self.assertEqual(handler.dropped, 3)
+        handler.handle(record(logging.WARNING, "wichtig"))
+        queued = [r.getMessage() for r in self.drain(handler)]
+        self.assertEqual(queued[5:], ["wichtig", "3 Log-Records verworfen (Queue voll / Sampling)"])
+
+    def test_sample_rate_keeps_a_fraction(self):
+        handler = self.make_handler(maxsize=1000, high_water=0.0, sample_rate=0.25)
+        with mock.patch("core.logs.random.random", side_effect=[0.1, 0.3, 0.5, 0.2] * 25), \
+                mock.patch("core.logs.time.monotonic", return_value=0.5):  # keine Verworfen-Meldung
+            for _ in range(100):
+                handler.handle(record())
+        self.assertEqual(handler.queue.qsize(), 50)
+        self.assertEqual(handler.dropped, 50)
+
+    def test_full_queue_drops_and_reports_count_later(self):
+        handler = self.make_handler(maxsize=3, high_water=1.0)
+        for _ in range(5):
+            handler.handle(record(logging.ERROR))
+        self.assertEqual(handler.dropped, 2)
+        self.drain(handler)
+        with mock.patch("core.logs.time.monotonic", return_value=10**6):
+            handler.handle(record(logging.ERROR, "danach"))
+        queued = self.drain(handler)
+        self.assertEqual([r.getMessage() for r in queued],
+                         ["danach", "2 Log-Records verworfen (Queue voll / Sampling)"])
+        self.assertEqual(handler.dropped, 0)
+
+    def test_restarts_listener_after_fork(self):
+        handler = self.make_handler(maxsize=10)
+        old_queue = handler.queue
+        handler._pid = -1  # wie in einem geforkten Kind
+        handler.handle(record())
+        self.addCleanup(handler.listener.stop)
+        self.assertIsNot(handler.queue, old_queue)
+
+
+class JSONFormatterTests(SimpleTestCase):
+    def test_context_and_extra_data(self):
+        request_token, user_token = request_id_var.set("req-1"), user_id_var.set(7)
+        self.addCleanup(request_id_var.reset, request_token)
+        self.addCleanup(user_id_var.reset, user_token)
+        handler = QueueLogHandler()
+        handler.listener.stop()
+        self.addCleanup(handler.target.close)
+        prepared = handler.prepare(record(data={"status": 200}))
+        entry = json.loads(JSONFormatter().format(prepared))
+        self.assertEqual((entry["request_id"], entry["user_id"], entry["status"]), ("req-1", 7, 200))
+        self.assertEqual(entry["level"], "INFO")
+
+
+# ---------- Profiling auf Anforderung (core/profiling.py) ----------
+@override_settings(PROFILING_ENABLED=True, PROFILE_MAX_PER_WINDOW=2, PROFILE_WINDOW_SECONDS=3600)
+class ProfilingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.profile_dir = Path(tempfile.mkdtemp())
+        self.enterContext(override_settings(PROFILE_DIR=self.profile_dir))
+        self.staff = User.objects.create_user("staff@example.com", "pw-123456", username="staff", is_staff=True)
+        self.customer = User.objects.create_user("kunde@example.com", "pw-123456", username="kunde")
+
+    def get(self, user, path="/api/categories/", **extra):
+        token = RefreshToken.for_user(user).access_token
+        return self.client.get(path, HTTP_AUTHORIZATION=f"Bearer {token}", **extra)
+
+    def test_staff_gets_profile_with_unchanged_body(self):
+        plain = self.get(self.staff)
+        response = self.get(self.staff, HTTP_X_PROFILE="1")
+        self.assertEqual(response.content, plain.content)
+        profile_id = response["X-Profile-Id"]
+        self.assertTrue((self.profile_dir / f"{profile_id}.prof").exists())
+        record = json.loads((self.profile_dir / f"{profile_id}.json").read_text())
+        self.assertEqual((record["path"], record["status"], record["user"]), ("/api/categories/", 200, self.staff.pk))
+
+    def test_non_staff_is_not_profiled(self):
+        response = self.get(self.customer, HTTP_X_PROFILE="1")
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("X-Profile-Id", response)
+        self.assertEqual(list(self.profile_dir.iterdir()), [])
+
+    def test_query_parameter_is_ignored(self):
+        response = self.get(self.staff, path="/api/categories/?_profile=1")
+        self.assertNotIn("X-Profile-Id", response)
+
+    def test_cap_per_window(self):
+        responses = [self.get(self.staff, HTTP_X_PROFILE="1") for _ in range(3)]
+        self.assertEqual(["X-Profile-Id" in r for r in responses], [True, True, False])
+        self.assertEqual(responses[2]["X-Profile-Skipped"], "rate-limit")
+        self.assertEqual(responses[2].content, responses[0].content)
+
+
+# ---------- Replica-Routing (core/db_router.py, core/middleware.py) ----------
+@override_settings(DATABASE_REPLICAS=["replica"], REPLICA_STICKY_SECONDS=10)
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.routed = []
+
+        def view(request):  # statt einer Query: wohin würde gelesen?
+            self.routed.append(PrimaryReplicaRouter().db_for_read(User))
+            return HttpResponse(status=201 if request.method == "POST" else 200)
+
+        self.middleware = ReplicaRoutingMiddleware(view)
+
+    def call(self, method, path, user_id=None):
+        extra = {}
+        if user_id is not None:
+            extra["HTTP_AUTHORIZATION"] = "Bearer " + jwt.encode({"user_id": user_id}, "x" * 32, algorithm="HS256")
+        self.middleware(getattr(self.factory, method)(path, **extra))
+        return self.routed[-1]
+
+    def test_reads_go_to_replica_writes_to_primary(self):
+        self.assertEqual(self.call("get", "/api/products/"), "replica")
+        self.assertEqual(self.call("post", "/api/products/"), "default")
+        self.assertEqual(PrimaryReplicaRouter().db_for_write(User), "default")
+
+    def test_read_after_write_is_pinned_to_primary(self):
+        self.call("post", "/api/favorites/", user_id=7)
+        self.assertEqual(self.call("get", "/api/products/", user_id=7), "default")
+        self.assertEqual(self.call("get", "/api/products/", user_id=8), "replica")  # andere User nicht
+
+    def test_db_primary_views_read_from_primary(self):
+        self.assertEqual(self.call("get", "/api/basket/"), "default")
+
+    def test_flag_is_reset_after_the_request(self):
+        self.call("get", "/api/products/")
+        self.assertEqual(PrimaryReplicaRouter().db_for_read(User), "default")
+
+    def test_use_primary_and_atomic_blocks_override(self):
+        router = PrimaryReplicaRouter()
+        token = set_use_replica(True)
+        self.addCleanup(reset_use_replica, token)
+        self.assertEqual(router.db_for_read(User), "replica")
+        with use_primary():
+            self.assertEqual(router.db_for_read(User), "default")
+        with mock.patch.object(connection, "in_atomic_block", True):
+            self.assertEqual(router.db_for_read(User), "default")
+
+    def test_system_check_requires_shared_cache(self):
+        self.assertEqual([e.id for e in checks.replica_sticky_cache(None)], ["core.E001"])
+        with mock.patch.object(checks, "is_shared", return_value=True):
+            self.assertEqual(checks.replica_sticky_cache(None), [])
+
+
+# ---------- Request-Instrumentierung (core/instrumentation.py) ----------
+@override_settings(SERVER_TIMING_HEADER=True, REQUEST_QUERY_BUDGET=30, N_PLUS_ONE_THRESHOLD=3)
+class InstrumentationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_query_count_and_server_timing_headers(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/categories/", HTTP_X_REQUEST_ID="req-abc-123")
+        self.assertEqual(response["X-Query-Count"], str(len(queries.captured_queries)))
+        self.assertGreater(len(queries.captured_queries), 0)
+        self.assertRegex(response["Server-Timing"], r'^db;dur=[\d.]+;desc="\d+ queries", .*total;dur=[\d.]+$')
+        self.assertEqual(response["X-Request-ID"], "req-abc-123")
+        self.assertNotIn("X-Query-Budget-Exceeded", response)
+
+    def test_budget_exceeded_is_flagged_and_logged(self):
+        with self.settings(REQUEST_QUERY_BUDGET=0), self.assertLogs("core.perf", "WARNING") as logs:
+            response = self.client.get("/api/categories/")
+        count = response["X-Query-Count"]
+        self.assertEqual(response["X-Query-Budget-Exceeded"], f"{count}>0")
+        self.assertTrue(logs.records[0].data["over_budget"])
+
+    def test_headers_can_be_disabled(self):
+        with self.settings(SERVER_TIMING_HEADER=False):
+            response = self.client.get("/api/categories/")
+        self.assertNotIn("Server-Timing", response)
+        self.assertNotIn("X-Query-Count", response)
+
+    def test_n_plus_one_detection(self):
+        stats = RequestStats()
+        for pk in range(3):
+            stats.queries.append((f'SELECT * FROM "api_brand" WHERE "id" = {pk}', (), 0.1, "default"))
+        stats.queries.append(('SELECT 1 WHERE "id" IN (%s, %s)', (1, 2), 0.1, "default"))
+        stats.queries.append(('SELECT 1 WHERE "id" IN (%s, %s)', (1, 2), 0.1, "default"))
+        analysis = stats.analyze()
+        self.assertEqual(analysis["duplicates"], 1)
+        self.assertEqual(analysis["n_plus_one"], [{"count": 3, "sql": 'SELECT * FROM "api_brand" WHERE "id" = ?'}])
+
+    def test_normalize_sql(self):
+        self.assertEqual(normalize_sql('SELECT 1 FROM t WHERE id IN (%s, %s, %s) LIMIT 21'),
+                         "SELECT ? FROM t WHERE id IN (%s...) LIMIT ?")
+
+
+# ---------- Warm-up beim Worker-Start (core/warmup.py) ----------
+class WarmupTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        # close_all() würde die Verbindung der Test-Transaktion schließen
+        patcher = mock.patch.object(warmup.connections, "close_all")
+        self.close_all = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_runs_every_step_and_primes_caches(self):
+        timings = warmup.warm_up()
+        self.assertEqual(list(timings), [name for name, _step, _db in warmup.STEPS])
+        self.assertTrue(all(isinstance(ms, float) for ms in timings.values()))
+        self.assertIsNotNone(cache.get(SIZES_KEY))
+        self.close_all.assert_called_once()
+
+    def test_without_database_no_queries(self):
+        with self.assertNumQueries(0):
+            timings = warmup.warm_up(database=False)
+        self.assertEqual(list(timings), [name for name, _step, needs_db in warmup.STEPS if not needs_db])
+
+    def test_failing_step_is_reported_and_does_not_stop_the_rest(self):
+        def broken():
+            raise RuntimeError("kaputt")
+
+        steps = [("broken", broken, False), ("urls", warmup._urls, False)]
+        with mock.patch.object(warmup, "STEPS", steps), self.assertLogs("core.startup", "WARNING"):
+            timings = warmup.warm_up()
+        self.assertEqual(timings["errors"], {"broken": "RuntimeError: kaputt"})
+        self.assertIn("urls", timings)
+        self.close_all.assert_called_once()
+
+    def test_on_startup_logs_setup_and_step_times(self):
+        with mock.patch.object(warmup, "warm_up", return_value={"urls": 1.5}) as warm_up, \
+                self.assertLogs("core.startup", "INFO") as logs:
+            record = warmup.on_startup(12.345)
+        warm_up.assert_called_once_with(database=True)
+        self.assertEqual((record["event"], record["setup_ms"], record["steps"]), ("startup", 12.35, {"urls": 1.5}))
+        self.assertEqual(logs.records[0].data, record)
+        with self.settings(WARMUP_ON_STARTUP=False):
+            self.assertIsNone(warmup.on_startup(1.0))
+
+    def test_command_json_output(self):
+        out = io.StringIO()
+        call_command("warmup", "--no-db", "--json", stdout=out)
+        result = json.loads(out.getvalue())
+        self.assertEqual(result["errors"], {})
+        self.assertIn("serializers", result["steps"])
+        self.assertNotIn("sizes", result["steps"])
+
+
+# ---------- Prometheus-Metriken (core/metrics.py) ----------
+@skipUnless(metrics.prometheus_client, "prometheus_client nicht installiert")
+@override_settings(METRICS_ENABLED=True, METRICS_TOKEN=None, METRICS_PUBLIC=False)
+class MetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def sample(self, name, **labels):
+        return metrics.prometheus_client.REGISTRY.get_sample_value(name, labels) or 0
+
+    def test_endpoint_is_closed_without_token(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+        with self.settings(METRICS_PUBLIC=True):
+            self.assertEqual(self.client.get("/metrics").status_code, 200)
+        with self.settings(METRICS_ENABLED=False, METRICS_PUBLIC=True):
+            self.assertEqual(self.client.get("/metrics").status_code, 404)
+
+    def test_endpoint_requires_matching_bearer_token(self):
+        with self.settings(METRICS_TOKEN="geheim"):
+            self.assertEqual(self.client.get("/metrics").status_code, 401)
+            self.assertEqual(self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer falsch").status_code, 401)
+            response = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer geheim")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"http_request_duration_seconds", response.content)
+
+    def test_request_is_observed_under_its_view_name(self):
+        labels = {"view": "category-list", "method": "GET", "status": "200"}
+        before = self.sample("http_request_duration_seconds_count", **labels)
+        queries_before = self.sample("http_db_queries_count", view="category-list")
+        self.client.get("/api/categories/")
+        self.assertEqual(self.sample("http_request_duration_seconds_count", **labels), before + 1)
+        self.assertEqual(self.sample("http_db_queries_count", view="category-list"), queries_before + 1)
+        self.assertEqual(self.sample("http_requests_in_progress", method="GET"), 0)
+
+    def test_unknown_paths_share_one_label(self):
+        labels = {"view": "unresolved", "method": "GET", "status": "404"}
+        before = self.sample("http_request_duration_seconds_count", **labels)
+        self.client.get("/gibt-es-nicht-1/")
+        self.client.get("/gibt-es-nicht-2/")
+        self.assertEqual(self.sample("http_request_duration_seconds_count", **labels), before + 2)
+
+    def test_empty_basket_checkout_is_counted(self):
+        user = User.objects.create_user("m@example.com", "pw-123456", username="m")
+        token = RefreshToken.for_user(user).access_token
+        before = self.sample("shop_checkouts_total", outcome="empty_basket")
+        self.client.post("/api/orders/", {}, content_type="application/json", HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.assertEqual(self.sample("shop_checkouts_total", outcome="empty_basket"), before + 1)
+
+    def test_stock_out_and_batch_item(self):
+        before = self.sample("shop_stock_outs_total")
+        metrics.record_stock_out()
+        self.assertEqual(self.sample("shop_stock_outs_total"), before + 1)
+        labels = {"view": "home-banner-head", "method": "GET", "status": "200"}
+        before = self.sample("http_request_duration_seconds_count", **labels)
+        metrics.observe_batch_item(mock.Mock(view_name="home-banner-head"), 200, 0.01)
+        self.assertEqual(self.sample("http_request_duration_seconds_count", **labels), before + 1)
+
+    def test_disabled_is_a_no_op(self):
+        before = self.sample("shop_stock_outs_total")
+        with self.settings(METRICS_ENABLED=False):
+            metrics.record_stock_out()
+            with metrics.in_flight("GET"):
+                pass
+        self.assertEqual(self.sample("shop_stock_outs_total"), before)
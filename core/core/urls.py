@@ -1,13 +1,19 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
-from django.conf.urls.static import static
+
+from api.media import serve_media
+from core.metrics import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('api.urls')),
     path('api/user/', include('user.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
 
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+if settings.DEBUG or settings.MEDIA_SERVE:
+    urlpatterns += [
+        re_path(r'^%s(?P<path>.*)$' % settings.MEDIA_URL.lstrip('/'), serve_media,
+                {'document_root': settings.MEDIA_ROOT}, name='media'),
+    ]
\ No newline at end of file
@@ -0,0 +1,171 @@
+# core/warmup.py
+"""
+Aufwärmen eines Workers vor dem ersten Request.
+
+Ohne Warm-up bezahlt der erste Request pro Worker für den Import von
+URLconf/Views/Serializern, das Kompilieren der URL-Regexe, die Model-Meta-
+Caches, ContentTypes, den JWT-Backend-Setup und die App-Caches (Größen,
+Kategorien, Katalog-Snapshot, Suggest-Index, Blacklist-Filter).
+
+``warm_up()`` erledigt das und gibt die Dauer pro Schritt zurück. In
+``core/wsgi.py``/``core/asgi.py`` läuft es beim Laden der Anwendung – mit
+``gunicorn --preload`` also einmal im Master vor dem Fork; danach werden die
+DB-Verbindungen geschlossen, damit kein Kind einen geerbten Socket benutzt.
+Manuell bzw. in CI: ``manage.py warmup``.
+"""
+import logging
+import threading
+import time
+from importlib import import_module
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+from django.urls import URLResolver, get_resolver
+
+logger = logging.getLogger("core.startup")
+
+SERIALIZER_MODULES = ("api.serializers", "user.serializers")
+
+
+def _imports():
+    import_module(settings.ROOT_URLCONF)  # zieht Views, Serializer, Filter ... nach
+    import_module("api.async_views")
+
+
+def _walk(resolver):
+    for pattern in resolver.url_patterns:
+        pattern.pattern.regex  # kompiliert und cacht den Regex
+        if isinstance(pattern, URLResolver):
+            _walk(pattern)
+
+
+def _urls():
+    resolver = get_resolver()
+    resolver._populate()  # reverse()-Tabellen
+    _walk(resolver)
+
+
+def _models():
+    for model in apps.get_models():
+        model._meta.get_fields()
+
+
+def _serializers():
+    from rest_framework.serializers import BaseSerializer
+
+    for name in SERIALIZER_MODULES:
+        module = import_module(name)
+        for cls in vars(module).values():
+            if not (isinstance(cls, type) and issubclass(cls, BaseSerializer) and cls.__module__ == name):
+                continue
+            try:
+                cls().fields  # Feldaufbau inkl. Model-Introspektion
+            except Exception:  # z. B. Serializer, die einen Context brauchen
+                logger.debug("Warm-up: %s übersprungen", cls.__name__, exc_info=True)
+    from api.cards import _card_serializer
+    _card_serializer().fields
+
+
+def _jwt():
+    from rest_framework_simplejwt.settings import api_settings
+    from rest_framework_simplejwt.state import token_backend
+
+    api_settings.AUTH_TOKEN_CLASSES  # importiert die Token-Klassen
+    token_backend.decode(token_backend.encode({"warmup": True}))
+
+
+def _contenttypes():
+    from django.contrib.contenttypes.models import ContentType
+    ContentType.objects.get_for_models(*apps.get_models())
+
+
+def _blacklist():
+    from user.blacklist import blacklist_filter
+    blacklist_filter.might_be_blacklisted("warmup")
+
+
+def _sizes():
+    from api.stock import all_sizes
+    all_sizes()
+
+
+def _categories():
+    from api.categories import category_counts
+    category_counts()
+
+
+def _catalog_snapshot():
+    from api.snapshot import catalog_snapshot, np
+    if np is not None:
+        catalog_snapshot._load(force=True)  # nur mmap öffnen, kein Neuaufbau-Thread im Master
+
+
+def _suggest():
+    from api.suggest import suggest_index
+    suggest_index.suggest("a")
+
+
+# (Name, Funktion, braucht DB/Cache)
+STEPS = [
+    ("imports", _imports, False),
+    ("urls", _urls, False),
+    ("models", _models, False),
+    ("serializers", _serializers, False),
+    ("jwt", _jwt, False),
+    ("contenttypes", _contenttypes, True),
+    ("blacklist", _blacklist, True),
+    ("sizes", _sizes, True),
+    ("categories", _categories, True),
+    ("catalog_snapshot", _catalog_snapshot, False),
+    ("suggest", _suggest, True),
+]
+
+
+def warm_up(database=True):
+    """
+    Führt alle Schritte aus. Gibt ``{name: ms}`` zurück; fehlgeschlagene Schritte
+    stehen unter ``"errors"`` (ein Fehler bricht das Warm-up nicht ab).
+    """
+    timings, errors = {}, {}
+    try:
+        for name, step, needs_db in STEPS:
+            if needs_db and not database:
+                continue
+            started = time.perf_counter()
+            try:
+                step()
+            except Exception as exc:
+                logger.warning("Warm-up: Schritt %s fehlgeschlagen", name, exc_info=True)
+                errors[name] = f"{type(exc).__name__}: {exc}"
+            timings[name] = round((time.perf_counter() - started) * 1000, 2)
+    finally:
+        connections.close_all()  # vor dem Fork keine offenen Verbindungen vererben
+    if errors:
+        timings["errors"] = errors
+    return timings
+
+
+def on_startup(setup_ms):
+    """Aus core/wsgi.py und core/asgi.py: Warm-up + eine Logzeile mit Setup- und Schrittzeiten."""
+    if not getattr(settings, "WARMUP_ON_STARTUP", True):
+        return None
+    result = {}
+
+    def run():
+        result.update(warm_up(database=getattr(settings, "WARMUP_DATABASE", True)))
+
+    # Eigener Thread: ASGI-Server laden die App teils im Event-Loop, dort wäre ORM-Zugriff verboten
+    started = time.perf_counter()
+    thread = threading.Thread(target=run, name="warmup")
+    thread.start()
+    thread.join()
+    record = {
+        "event": "startup",
+        "setup_ms": round(setup_ms, 2),
+        "warmup_ms": round((time.perf_counter() - started) * 1000, 2),
+        "steps": result,
+    }
+    logger.info("startup: setup %.1fms, warm-up %.1fms", record["setup_ms"], record["warmup_ms"],
+                extra={"data": record})
+    return record
@@ -0,0 +1,123 @@
+# user/authentication.py
+"""
+JWT-Authentifizierung mit gecachtem User.
+
+Statt bei jedem Request ``User.objects.get(pk=...)`` auszuführen, wird der
+User in zwei Stufen gecacht:
+
+1. Prozess-Cache (``AUTH_USER_CACHE_LOCAL_TTL``, wenige Sekunden)
+2. gemeinsamer Django-Cache, Schlüssel ``auth:user:<id>:<version>``
+   (``AUTH_USER_CACHE_TTL``)
+
+Die Version pro User liegt ebenfalls im Django-Cache und wird bei jeder
+Änderung am User hochgezählt (s. ``user/signals.py``) – alte Einträge
+werden damit ungültig, im eigenen Prozess sofort, in anderen Prozessen
+spätestens nach der lokalen TTL. Eine Deaktivierung oder ein
+Passwortwechsel wirkt also erst nach bis zu ``AUTH_USER_CACHE_LOCAL_TTL``
+Sekunden überall. Bei einem Miss geht es wie gewohnt an die DB.
+
+Der Cache ist nur mit gemeinsamem Cache (Redis) aktiv: mit LocMem sähen
+andere Worker die neue Version nie und authentifizierten einen gesperrten
+User bis zum Ablauf von ``AUTH_USER_CACHE_TTL`` weiter. Ohne Redis wird der
+User deshalb bei jedem Request aus der DB geladen.
+"""
+import pickle
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from core.cache import is_shared
+from core.logs import set_user_id
+
+_local = {}  # user_id -> (läuft_ab, pickled_user)
+_local_lock = threading.Lock()
+
+
+def _version_key(user_id):
+    return f"auth:user-ver:{user_id}"
+
+
+def _user_key(user_id, version):
+    return f"auth:user:{user_id}:{version}"
+
+
+def invalidate_user(user_id):
+    """Alle gecachten Kopien des Users verwerfen (Version hochzählen)."""
+    with _local_lock:
+        _local.pop(str(user_id), None)
+    key = _version_key(user_id)
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:  # zwischenzeitlich evicted
+        cache.set(key, 1, timeout=None)
+
+
+def clear_local_cache():
+    with _local_lock:
+        _local.clear()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def authenticate(self, request):
+        result = super().authenticate(request)
+        if result is not None:
+            set_user_id(result[0].pk)  # für die Logzeilen dieses Requests (core/logs.py)
+        return result
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        if not self._cache_enabled():
+            return super().get_user(validated_token)
+        user = self._cached_user(user_id)
+        if user is None:
+            return self._load_and_cache(user_id, validated_token)
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN and \
+                validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+        return user
+
+    @staticmethod
+    def _cache_enabled():
+        return getattr(settings, "AUTH_USER_CACHE_TTL", 60) > 0 and is_shared()
+
+    def _cached_user(self, user_id):
+        entry = _local.get(str(user_id))
+        if entry is not None and entry[0] > time.monotonic():
+            # Jede Anfrage bekommt eine eigene Instanz (Views dürfen request.user verändern).
+            return pickle.loads(entry[1])
+
+        version = cache.get(_version_key(user_id), 0)
+        user = cache.get(_user_key(user_id, version))
+        if user is not None:
+            self._store_local(user_id, user)
+        return user
+
+    def _load_and_cache(self, user_id, validated_token):
+        version = cache.get(_version_key(user_id), 0)
+        user = super().get_user(validated_token)  # DB + Prüfungen
+        cache.set(_user_key(user_id, version), user, getattr(settings, "AUTH_USER_CACHE_TTL", 60))
+        self._store_local(user_id, user)
+        return user
+
+    @staticmethod
+    def _store_local(user_id, user):
+        ttl = getattr(settings, "AUTH_USER_CACHE_LOCAL_TTL", 5)
+        if ttl <= 0:
+            return
+        with _local_lock:
+            _local[str(user_id)] = (time.monotonic() + ttl, pickle.dumps(user, pickle.HIGHEST_PROTOCOL))
@@ -0,0 +1,140 @@
+# user/blacklist.py
+"""
+Bloom-Filter vor der Token-Blacklist.
+
+``RefreshToken.check_blacklist`` fragt bei jedem Refresh die Tabelle
+``BlacklistedToken`` ab – fast immer mit dem Ergebnis "nicht gesperrt".
+Der Filter beantwortet diesen Normalfall aus dem Speicher; nur bei einem
+(möglichen) Treffer geht es an die DB. Ein Bloom-Filter hat keine falschen
+Negative, solange er alle gesperrten JTIs kennt:
+
+- neue Sperren im eigenen Prozess werden sofort eingetragen,
+- andere Prozesse erhöhen ``auth:blacklist-gen`` im Cache; ändert sich der
+  Wert, werden neue Zeilen nachgeladen. Weil IDs nicht in ID-Reihenfolge
+  committet werden müssen (lange Transaktion holt sich die ID früher), wird
+  ab ``max_id - TOKEN_BLACKLIST_RESCAN_ROWS`` gelesen statt ab ``max_id``,
+- zusätzlich wird spätestens alle ``TOKEN_BLACKLIST_SYNC_SECONDS``
+  nachgeladen (Absicherung, falls kein gemeinsamer Cache konfiguriert ist),
+- nach ``TOKEN_BLACKLIST_REBUILD_SECONDS`` oder bei voller Kapazität wird
+  der Filter neu aufgebaut (entfernt geprunte JTIs).
+
+Nachladen baut eine Kopie und ersetzt ``(Filter, max_id)`` als ein Tupel;
+Leser sehen also immer einen vollständigen Stand ohne Lock.
+"""
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+GENERATION_KEY = "auth:blacklist-gen"
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate=0.001):
+        self.capacity = max(int(capacity), 1)
+        self.size = max(8, int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def copy(self):
+        clone = BloomFilter.__new__(BloomFilter)
+        clone.capacity, clone.size, clone.hashes, clone.count = self.capacity, self.size, self.hashes, self.count
+        clone.bits = bytearray(self.bits)
+        return clone
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, value):
+        for pos in self._positions(value):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(value))
+
+
+class BlacklistFilter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state = None  # (BloomFilter, max_id) – nur als Ganzes ersetzen
+        self._generation = None
+        self._synced_at = 0.0
+        self._built_at = 0.0
+
+    def might_be_blacklisted(self, jti):
+        self._sync()
+        bloom, _max_id = self._state
+        return jti in bloom
+
+    def add(self, jti):
+        """Sperre aus dem eigenen Prozess sofort eintragen und andere Prozesse benachrichtigen."""
+        with self._lock:
+            if self._state is not None:
+                self._state[0].add(jti)  # Bits werden nur gesetzt, gleichzeitige Leser stört das nicht
+        cache.add(GENERATION_KEY, 0, timeout=None)
+        try:
+            cache.incr(GENERATION_KEY)
+        except ValueError:
+            cache.set(GENERATION_KEY, 1, timeout=None)
+
+    def reset(self):
+        with self._lock:
+            self._state = None
+
+    def _sync(self):
+        now = time.monotonic()
+        generation = cache.get(GENERATION_KEY, 0)
+        if (self._state is not None and generation == self._generation
+                and now - self._synced_at < getattr(settings, "TOKEN_BLACKLIST_SYNC_SECONDS", 2)):
+            return
+        with self._lock:
+            rebuild = (
+                self._state is None
+                or now - self._built_at > getattr(settings, "TOKEN_BLACKLIST_REBUILD_SECONDS", 3600)
+                or self._state[0].count >= self._state[0].capacity
+            )
+            if rebuild:
+                self._rebuild(now)
+            else:
+                self._load_new_rows()
+            self._generation = generation
+            self._synced_at = now
+
+    def _rows(self, after_id=0):
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+        return (BlacklistedToken.objects.filter(id__gt=after_id)
+                .order_by("id").values_list("id", "token__jti").iterator(chunk_size=5000))
+
+    def _rebuild(self, now):
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+        count = BlacklistedToken.objects.count()
+        capacity = max(getattr(settings, "TOKEN_BLACKLIST_FILTER_CAPACITY", 100_000), count * 2)
+        bloom, max_id = BloomFilter(capacity), 0
+        for row_id, jti in self._rows():
+            bloom.add(jti)
+            max_id = row_id
+        self._state, self._built_at = (bloom, max_id), now
+
+    def _load_new_rows(self):
+        bloom, max_id = self._state
+        rescan = getattr(settings, "TOKEN_BLACKLIST_RESCAN_ROWS", 1000)
+        rows = list(self._rows(max(max_id - rescan, 0)))
+        if not rows:
+            return
+        bloom = bloom.copy()
+        for row_id, jti in rows:
+            if jti not in bloom:  # Rescan-Fenster: bekannte JTIs nicht doppelt zählen
+                bloom.add(jti)
+            max_id = max(max_id, row_id)
+        self._state = (bloom, max_id)
+
+
+blacklist_filter = BlacklistFilter()
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+from rest_framework_simplejwt.utils import aware_utcnow
+
+
+class Command(BaseCommand):
+    help = (
+        "Löscht abgelaufene OutstandingTokens (und damit ihre BlacklistedTokens) in kleinen "
+        "Chunks – für Cron gedacht, z. B. stündlich."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=5000)
+        parser.add_argument("--pause", type=float, default=0.1, help="Sekunden Pause zwischen Chunks")
+        parser.add_argument("--max-chunks", type=int, default=0, help="0 = bis alles gelöscht ist")
+
+    def handle(self, *args, chunk_size, pause, max_chunks, **options):
+        cutoff = aware_utcnow()
+        expired = OutstandingToken.objects.filter(expires_at__lte=cutoff).order_by("id")
+        total = chunks = 0
+        while True:
+            ids = list(expired.values_list("id", flat=True)[:chunk_size])
+            if not ids:
+                break
+            # Kurze Transaktionen: keine langen Locks auf den Token-Tabellen
+            with transaction.atomic():
+                deleted, _ = OutstandingToken.objects.filter(id__in=ids).delete()
+            total += len(ids)
+            chunks += 1
+            if max_chunks and chunks >= max_chunks:
+                break
+            if pause:
+                time.sleep(pause)
+        self.stdout.write(f"{total} abgelaufene Tokens in {chunks} Chunks gelöscht")
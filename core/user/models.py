@@ -36,6 +36,7 @@ class User(AbstractBaseUser, PermissionsMixin):
     username = models.CharField(max_length=150, blank=True, null=True)
     phone_number = models.CharField(max_length=32, blank=True, null=True)
     avatar = models.ImageField(upload_to="avatars/%Y/%m/", blank=True, null=True)
+    avatar_variants = models.JSONField(default=dict, blank=True, editable=False)  # s. api/images.py
     address = models.CharField(max_length=255, blank=True)
 
     is_active = models.BooleanField(default=True)
@@ -2,15 +2,19 @@ from django.contrib.auth import get_user_model
 from rest_framework import serializers
 from rest_framework.validators import UniqueValidator
 
+from api.fields import ImageVariantsField
+from core.instrumentation import TimedSerializerMixin
+
 User = get_user_model()
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     avatar_url = serializers.SerializerMethodField()
+    avatar_variants = ImageVariantsField()
 
     class Meta:
         model = User
-        fields = ("id", "email", "username", "phone_number", "address", "avatar", "avatar_url")
+        fields = ("id", "email", "username", "phone_number", "address", "avatar", "avatar_url", "avatar_variants")
         read_only_fields = ("id",)
 
     def get_avatar_url(self, obj):
@@ -0,0 +1,25 @@
+# user/signals.py
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+from .authentication import invalidate_user
+from .blacklist import blacklist_filter
+
+
+def _user_changed(sender, instance, **kwargs):
+    # MeAPIView.patch, Admin-Änderungen, Deaktivierung, Passwortwechsel ...
+    invalidate_user(instance.pk)
+
+
+def _token_blacklisted(sender, instance, created, **kwargs):
+    if created:
+        blacklist_filter.add(instance.token.jti)
+
+
+def connect():
+    """Wird in UserConfig.ready() aufgerufen."""
+    User = get_user_model()
+    post_save.connect(_user_changed, sender=User, dispatch_uid="user-cache:save")
+    post_delete.connect(_user_changed, sender=User, dispatch_uid="user-cache:delete")
+    post_save.connect(_token_blacklisted, sender=BlacklistedToken, dispatch_uid="token-blacklist:filter")
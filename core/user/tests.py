@@ -1,3 +1,219 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import authentication, throttling
+from .blacklist import GENERATION_KEY, BlacklistFilter, BloomFilter, blacklist_filter
+from .models import User
+
+
+def blacklist_row(jti, row_id=None):
+    token = OutstandingToken.objects.create(jti=jti, token="-", expires_at=timezone.now() + timedelta(days=1))
+    return BlacklistedToken.objects.create(id=row_id, token=token)
+
+
+# ---------- Bloom-Filter vor der Blacklist (user/blacklist.py) ----------
+class BloomFilterTests(TestCase):
+    def test_no_false_negatives(self):
+        bloom = BloomFilter(1000)
+        values = [f"jti-{i}" for i in range(1000)]
+        for value in values:
+            bloom.add(value)
+        self.assertTrue(all(value in bloom for value in values))
+
+    def test_false_positive_rate_near_target(self):
+        bloom = BloomFilter(5000, error_rate=0.01)
+        for i in range(5000):
+            bloom.add(f"in-{i}")
+        rate = sum(f"out-{i}" in bloom for i in range(20000)) / 20000
+        self.assertLess(rate, 0.03)
+
+    def test_copy_is_independent(self):
+        bloom = BloomFilter(100)
+        clone = bloom.copy()
+        clone.add("x")
+        self.assertNotIn("x", bloom)
+        self.assertIn("x", clone)
+
+
+class BlacklistFilterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.filter = BlacklistFilter()
+
+    def bump(self):
+        cache.add(GENERATION_KEY, 0, timeout=None)
+        cache.incr(GENERATION_KEY)
+
+    def test_loads_existing_rows(self):
+        blacklist_row("a")
+        self.assertTrue(self.filter.might_be_blacklisted("a"))
+        self.assertFalse(self.filter.might_be_blacklisted("b"))
+
+    def test_generation_bump_loads_new_rows(self):
+        self.assertFalse(self.filter.might_be_blacklisted("late"))
+        blacklist_row("late")
+        self.bump()
+        self.assertTrue(self.filter.might_be_blacklisted("late"))
+
+    def test_row_committed_below_watermark_is_found(self):
+        # lange Transaktion: kleinere ID wird erst nach einer größeren sichtbar
+        blacklist_row("first", row_id=100)
+        self.assertTrue(self.filter.might_be_blacklisted("first"))
+        blacklist_row("slow", row_id=50)
+        self.bump()
+        self.assertTrue(self.filter.might_be_blacklisted("slow"))
+        self.assertEqual(self.filter._state[0].count, 2)  # Rescan zählt "first" nicht doppelt
+
+    def test_time_based_sync_without_generation_bump(self):
+        self.filter.might_be_blacklisted("warm")
+        blacklist_row("quiet")
+        with self.settings(TOKEN_BLACKLIST_SYNC_SECONDS=0):
+            self.assertTrue(self.filter.might_be_blacklisted("quiet"))
+
+
+class RefreshBlacklistTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        blacklist_filter.reset()
+        self.user = User.objects.create_user("a@example.com", "pw-123456", username="a")
+
+    def refresh(self, token):
+        return self.client.post("/api/user/auth/refresh/", {"refresh": str(token)}, content_type="application/json")
+
+    def test_refresh_skips_blacklist_table_when_filter_says_no(self):
+        token = RefreshToken.for_user(self.user)
+        self.refresh(token)  # Filter aufbauen
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.refresh(token).status_code, 200)
+        self.assertFalse([q for q in queries.captured_queries if "token_blacklist" in q["sql"]])
+
+    def test_blacklisted_token_is_rejected(self):
+        token = RefreshToken.for_user(self.user)
+        self.assertEqual(self.refresh(token).status_code, 200)
+        token.blacklist()
+        response = self.refresh(token)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()["code"], "token_not_valid")
+
+
+# ---------- Token-Bucket (user/throttling.py) ----------
+class TokenBucketMathTests(TestCase):
+    def test_full_bucket_then_refill(self):
+        state = None
+        for _ in range(3):
+            allowed, tokens, state = throttling._take(state, 3, 1.0, 100.0)
+            self.assertTrue(allowed)
+        self.assertEqual(tokens, 0)
+        allowed, tokens, state = throttling._take(state, 3, 1.0, 100.5)
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(tokens, 0.5)
+        allowed, tokens, state = throttling._take(state, 3, 1.0, 101.0)
+        self.assertTrue(allowed)
+
+    def test_refill_is_capped_at_capacity(self):
+        self.assertEqual(throttling._refill((0, 0.0), 5, 1.0, 1000.0), 5)
+
+    def test_consume_returns_wait_until_next_token(self):
+        cache.clear()
+        with mock.patch.object(throttling.time, "time", return_value=1000.0):
+            results = [throttling.consume("t:wait", 2, 0.5) for _ in range(3)]
+        self.assertEqual([allowed for allowed, _wait in results], [True, True, False])
+        self.assertAlmostEqual(results[2][1], 2.0)  # 1 Token bei 0.5/s
+
+    def test_local_fallback_when_cache_fails(self):
+        throttling._local_buckets.clear()
+        with mock.patch.object(throttling, "cache") as broken, \
+                mock.patch.object(throttling.time, "time", return_value=1000.0):
+            broken.get.side_effect = ConnectionError
+            results = [throttling.consume("t:down", 2, 1.0)[0] for _ in range(3)]
+        self.assertEqual(results, [True, True, False])
+        self.assertIn("t:down", throttling._local_buckets)
+
+    def test_local_buckets_are_bounded(self):
+        throttling._local_buckets.clear()
+        with mock.patch.object(throttling, "LOCAL_MAX_BUCKETS", 10):
+            for i in range(50):
+                throttling._consume_local(f"t:{i}", 3, 0.001, 1000.0 + i)
+        self.assertLessEqual(len(throttling._local_buckets), 10)
+        self.assertIn("t:49", throttling._local_buckets)  # die neuesten bleiben
+
+
+class AuthThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.rest_framework = {**settings.REST_FRAMEWORK,
+                               "DEFAULT_THROTTLE_RATES": {"auth_ip": "2/min", "auth_email": "100/min"}}
+
+    def login(self, **extra):
+        return self.client.post("/api/user/auth/login/", {"email": "x@example.com", "password": "wrong"},
+                                content_type="application/json", **extra)
+
+    def test_ip_bucket_returns_429_with_retry_after(self):
+        with self.settings(REST_FRAMEWORK=self.rest_framework):
+            statuses = [self.login().status_code for _ in range(3)]
+            response = self.login()
+        self.assertEqual(statuses[:2], [401, 401])
+        self.assertEqual(response.status_code, 429)
+        self.assertIn("Retry-After", response)
+
+    def test_spoofed_forwarded_for_does_not_open_new_bucket(self):
+        with self.settings(REST_FRAMEWORK=self.rest_framework):
+            statuses = [self.login(HTTP_X_FORWARDED_FOR=f"10.0.0.{i}").status_code for i in range(3)]
+        self.assertEqual(statuses[-1], 429)
+
+
+# ---------- Gecachter JWT-User (user/authentication.py) ----------
+class CachedUserTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        authentication.clear_local_cache()
+        self.addCleanup(authentication.clear_local_cache)
+        self.user = User.objects.create_user("c@example.com", "pw-123456", username="c")
+        self.auth = {"HTTP_AUTHORIZATION": f"Bearer {RefreshToken.for_user(self.user).access_token}"}
+
+    def me(self):
+        return self.client.get("/api/user/auth/me/", **self.auth)
+
+    def user_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.me().status_code, 200)
+        return [q for q in queries.captured_queries if 'FROM "user_user"' in q["sql"]]
+
+    def test_shared_cache_skips_user_lookup(self):
+        with mock.patch.object(authentication, "is_shared", return_value=True):
+            self.me()
+            authentication.clear_local_cache()  # zweite Stufe: gemeinsamer Cache
+            self.assertEqual(self.user_queries(), [])
+
+    def test_without_shared_cache_user_is_loaded_every_time(self):
+        self.me()
+        self.assertEqual(len(self.user_queries()), 1)
+        version = cache.get(authentication._version_key(self.user.pk), 0)
+        self.assertIsNone(cache.get(authentication._user_key(self.user.pk, version)))
+
+    def test_deactivated_user_is_rejected_after_caching(self):
+        with mock.patch.object(authentication, "is_shared", return_value=True):
+            self.assertEqual(self.me().status_code, 200)
+            self.user.is_active = False
+            self.user.save()
+            self.assertEqual(self.me().status_code, 401)
 
-# Create your tests here.
+    def test_password_change_bumps_version(self):
+        version_key = authentication._version_key(self.user.pk)
+        with mock.patch.object(authentication, "is_shared", return_value=True):
+            self.me()
+            version = cache.get(version_key)
+            self.assertIsNotNone(cache.get(authentication._user_key(self.user.pk, version)))
+            self.user.set_password("new-pw-123456")
+            self.user.save()
+            self.assertEqual(cache.get(version_key), version + 1)
+            self.assertIsNone(authentication.CachedJWTAuthentication()._cached_user(self.user.pk))
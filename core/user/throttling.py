@@ -0,0 +1,157 @@
+# user/throttling.py
+"""
+Token-Bucket-Throttling für Login, Registrierung und Token-Refresh.
+
+Läuft in ``APIView.check_throttles`` – also vor dem Serializer und damit vor
+dem (absichtlich teuren) Passwort-Hashing. Abgelehnte Requests kosten nur
+einen Cache-Zugriff und bekommen ``429`` + ``Retry-After``.
+
+Buckets liegen im Django-Cache. Mit Redis teilen sich alle Worker einen
+Bucket, Lesen-Verbrauchen-Schreiben läuft atomar als Lua-Skript (parallele
+Requests können dasselbe Token nicht mehrfach ausgeben). Mit dem lokalen
+Cache (LocMem) gilt der Bucket pro Prozess und ist per Lock geschützt. Ist
+der Cache nicht erreichbar, wird auf einen prozesslokalen Bucket
+ausgewichen (höchstens ``LOCAL_MAX_BUCKETS`` Einträge). Raten kommen aus
+``REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"]`` (z. B. ``"auth_ip": "20/min"`` =
+20 Tokens, voll nach einer Minute).
+"""
+import logging
+import threading
+import time
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.redis import RedisCache
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle, SimpleRateThrottle
+
+logger = logging.getLogger(__name__)
+
+LOCAL_MAX_BUCKETS = 10000
+
+_local_buckets = {}  # key -> ((tokens, aktualisiert), wieder_voll_um)
+_local_lock = threading.Lock()
+_cache_lock = threading.Lock()  # get+set auf dem prozesslokalen Cache
+
+# KEYS[1] = Bucket; ARGV = Kapazität, Rate (Tokens/s), jetzt, TTL -> {erlaubt, Tokens danach}
+_REDIS_CONSUME = """
+local capacity, rate, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens, updated = tonumber(state[1]), tonumber(state[2])
+if tokens == nil or updated == nil then tokens, updated = capacity, now end
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local allowed = 0
+if tokens >= 1 then tokens = tokens - 1; allowed = 1 end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[4]))
+return {allowed, tostring(tokens)}
+"""
+
+
+def _refill(state, capacity, rate, now):
+    tokens, updated = state if state else (capacity, now)
+    return min(capacity, tokens + (now - updated) * rate)
+
+
+def _take(state, capacity, rate, now):
+    """(erlaubt, Tokens danach, neuer Zustand)"""
+    tokens = _refill(state, capacity, rate, now)
+    allowed = tokens >= 1
+    if allowed:
+        tokens -= 1
+    return allowed, tokens, (tokens, now)
+
+
+def _consume_redis(backend, key, capacity, rate, now, ttl):
+    client = backend._cache.get_client(key, write=True)
+    allowed, tokens = client.eval(_REDIS_CONSUME, 1, backend.make_and_validate_key(key),
+                                  capacity, rate, now, ttl)
+    return bool(allowed), float(tokens)
+
+
+def _consume_local(key, capacity, rate, now):
+    with _local_lock:
+        entry = _local_buckets.get(key)
+        allowed, tokens, state = _take(entry[0] if entry else None, capacity, rate, now)
+        _local_buckets[key] = (state, now + (capacity - tokens) / rate)
+        if len(_local_buckets) > LOCAL_MAX_BUCKETS:
+            _prune_local(now)
+    return allowed, tokens
+
+
+def _prune_local(now):
+    # Wieder volle Buckets sind gleichbedeutend mit "nicht vorhanden"; reicht das nicht, die ältesten weg
+    for key in [key for key, (_state, full_at) in _local_buckets.items() if full_at <= now]:
+        del _local_buckets[key]
+    if len(_local_buckets) > LOCAL_MAX_BUCKETS:
+        oldest = sorted(_local_buckets, key=lambda key: _local_buckets[key][0][1])
+        for key in oldest[:len(_local_buckets) - LOCAL_MAX_BUCKETS // 2]:
+            del _local_buckets[key]
+
+
+def consume(key, capacity, rate):
+    """
+    Nimmt ein Token aus dem Bucket ``key``.
+    Gibt (erlaubt, sekunden_bis_zum_nächsten_token) zurück.
+    """
+    now = time.time()
+    ttl = int(capacity / rate) + 1
+    backend = caches["default"]
+    try:
+        if isinstance(backend, RedisCache):
+            allowed, tokens = _consume_redis(backend, key, capacity, rate, now, ttl)
+        else:
+            with _cache_lock:
+                allowed, tokens, state = _take(cache.get(key), capacity, rate, now)
+                cache.set(key, state, ttl)
+    except Exception:  # Cache weg -> lokaler Fallback statt alle Logins zu blockieren
+        logger.warning("Throttle-Cache nicht erreichbar, nutze lokalen Bucket", exc_info=True)
+        allowed, tokens = _consume_local(key, capacity, rate, now)
+    return allowed, 0 if allowed else (1 - tokens) / rate
+
+
+class TokenBucketThrottle(BaseThrottle):
+    scope = None
+
+    def __init__(self):
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+        self.capacity, self.rate = None, None
+        if rate:
+            num, period = SimpleRateThrottle.parse_rate(None, rate)
+            self.capacity, self.rate = num, num / period
+        self._wait = None
+
+    def get_ident_key(self, request, view):
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        if self.capacity is None:
+            return True
+        ident = self.get_ident_key(request, view)
+        if ident is None:
+            return True
+        allowed, self._wait = consume(f"throttle:{self.scope}:{ident}", self.capacity, self.rate)
+        return allowed
+
+    def wait(self):
+        return self._wait
+
+
+class AuthIPThrottle(TokenBucketThrottle):
+    """Pro Client-IP (über Login, Registrierung und Refresh gemeinsam)."""
+    scope = "auth_ip"
+
+    def get_ident_key(self, request, view):
+        # REMOTE_ADDR bzw. die vom letzten vertrauenswürdigen Proxy eingetragene Adresse
+        # (REST_FRAMEWORK["NUM_PROXIES"]) – nie ein frei vom Client gesetzter X-Forwarded-For
+        return self.get_ident(request)
+
+
+class AuthEmailThrottle(TokenBucketThrottle):
+    """Pro E-Mail-Adresse – bremst verteiltes Credential-Stuffing auf ein Konto."""
+    scope = "auth_email"
+
+    def get_ident_key(self, request, view):
+        if request.method != "POST":
+            return None
+        email = request.data.get("email") if hasattr(request.data, "get") else None
+        return str(email).strip().lower() if email else None
@@ -1,4 +1,21 @@
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .blacklist import blacklist_filter
+
+
+class FilteredRefreshToken(RefreshToken):
+    """Fragt die Blacklist-Tabelle nur, wenn der Bloom-Filter einen möglichen Treffer meldet."""
+
+    def check_blacklist(self):
+        if blacklist_filter.might_be_blacklisted(self.payload[api_settings.JTI_CLAIM]):
+            super().check_blacklist()
+
+
+class FilteredTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = FilteredRefreshToken
+
 
 class EmailTokenObtainPairSerializer(TokenObtainPairSerializer):
     username_field = "email"
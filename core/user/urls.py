@@ -1,11 +1,12 @@
 from django.urls import path
-from .views import RegisterAPIView, EmailTokenObtainPairView, MeAPIView, LogoutAPIView
-from rest_framework_simplejwt.views import TokenRefreshView
+from .views import (
+    RegisterAPIView, EmailTokenObtainPairView, ThrottledTokenRefreshView, MeAPIView, LogoutAPIView,
+)
 
 urlpatterns = [
     path("auth/register/", RegisterAPIView.as_view(), name="auth_register"),
     path("auth/login/", EmailTokenObtainPairView.as_view(), name="auth_login"),
-    path("auth/refresh/", TokenRefreshView.as_view(), name="auth_refresh"),
+    path("auth/refresh/", ThrottledTokenRefreshView.as_view(), name="auth_refresh"),
     path("auth/me/", MeAPIView.as_view(), name="auth_me"),
     path("auth/logout/", LogoutAPIView.as_view(), name="auth_logout"),
 ]
\ No newline at end of file
@@ -3,15 +3,17 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
-from rest_framework_simplejwt.views import TokenObtainPairView
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from rest_framework_simplejwt.tokens import RefreshToken
 
 from .serializers import UserSerializer, UserRegisterSerializer
-from .token import EmailTokenObtainPairSerializer  # <- FIX: token.py, nicht tokens.py
+from .token import EmailTokenObtainPairSerializer, FilteredRefreshToken  # <- FIX: token.py, nicht tokens.py
+from .throttling import AuthIPThrottle, AuthEmailThrottle
 
 
 class RegisterAPIView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [AuthIPThrottle, AuthEmailThrottle]  # vor dem Passwort-Hashing
 
     def post(self, request):
         ser = UserRegisterSerializer(data=request.data, context={"request": request})
@@ -32,6 +34,11 @@ class RegisterAPIView(APIView):
 class EmailTokenObtainPairView(TokenObtainPairView):
     permission_classes = [AllowAny]
     serializer_class = EmailTokenObtainPairSerializer
+    throttle_classes = [AuthIPThrottle, AuthEmailThrottle]  # vor dem Passwort-Hashing
+
+
+class ThrottledTokenRefreshView(TokenRefreshView):
+    throttle_classes = [AuthIPThrottle]
 
 
 class MeAPIView(APIView):
@@ -65,7 +72,7 @@ class LogoutAPIView(APIView):
         if not refresh:
             return Response({"detail": "refresh token required"}, status=status.HTTP_400_BAD_REQUEST)
         try:
-            token = RefreshToken(refresh)
+            token = FilteredRefreshToken(refresh)
             token.blacklist()
         except Exception:
             return Response({"detail": "invalid or expired refresh token"}, status=status.HTTP_400_BAD_REQUEST)